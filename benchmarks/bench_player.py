@@ -0,0 +1,184 @@
+import os
+import sys
+import random
+import argparse
+import statistics
+import subprocess
+from time import perf_counter
+from typing import Callable, Optional
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT_PATH)
+
+# pylint: disable=wrong-import-position
+from PyQt6.QtCore import Qt, QEventLoop, QTimer, QUrl, QStandardPaths
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QApplication
+
+from generate_media import generateMedia
+
+REPEATS = 5
+TIMEOUT = 5000
+# a seek has landed once a frame this close to the target is presented
+FRAME_TOLERANCE = 1000
+
+COLD_START_SCRIPT = '''
+import sys
+from time import perf_counter
+start = perf_counter()
+from PyQt6.QtCore import QStandardPaths
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+app.setApplicationName('VideoPlayerBenchmark')
+QStandardPaths.setTestModeEnabled(True)
+from main import VideoWindow
+window = VideoWindow()
+window.resize(640, 480)
+window.show()
+app.processEvents()
+print(perf_counter() - start)
+'''
+
+
+def waitForFrame(window, trigger: Callable, target: Optional[int] = None) -> Optional[float]:
+    loop = QEventLoop()
+    result = []
+
+    def frameChanged(frame):
+        if not frame.isValid():
+            return
+        if target is not None and abs(frame.startTime() // 1000 - target) > FRAME_TOLERANCE:
+            return
+        result.append(perf_counter() - start)
+        loop.quit()
+
+    sink = window.videoSink
+    sink.videoFrameChanged.connect(frameChanged)
+    QTimer.singleShot(TIMEOUT, loop.quit)
+    start = perf_counter()
+    trigger()
+    if not result:
+        loop.exec()
+    sink.videoFrameChanged.disconnect(frameChanged)
+    return result[0] if result else None
+
+
+def settle(milliseconds: int = 200):
+    loop = QEventLoop()
+    QTimer.singleShot(milliseconds, loop.quit)
+    loop.exec()
+
+
+def median(values: list) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values) * 1000, 3) if values else None
+
+
+def benchmarkColdStart(repeats: int) -> list:
+    environment = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    times = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], cwd=ROOT_PATH,
+                                env=environment, capture_output=True, text=True, check=True)
+        times.append(float(output.stdout.strip().splitlines()[-1]))
+    return times
+
+
+def benchmarkWindow(repeats: int) -> list:
+    from main import VideoWindow  # pylint: disable=import-outside-toplevel
+    times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        window = VideoWindow()
+        window.resize(640, 480)
+        window.show()
+        QApplication.processEvents()
+        times.append(perf_counter() - start)
+        window.close()
+        window.deleteLater()
+    return times
+
+
+def benchmarkFirstFrame(window, mediaPath: str, repeats: int) -> list:
+    times = []
+    for _ in range(repeats):
+        window.mediaPlayer.setSource(QUrl())
+        # a stored position would turn the load into a load and a seek
+        window.resumeStore.setPosition(window.resumeStore.fingerprint(mediaPath), 0)
+        times.append(waitForFrame(window, lambda: window.playFromFile(mediaPath)))
+    return times
+
+
+def benchmarkRewind(window, repeats: int) -> list:
+    rewindStep = window._rewindStep  # pylint: disable=protected-access
+    duration = window.mediaPlayer.duration()
+    times = []
+    for index in range(repeats * 2):
+        # forward and back again so the position stays inside the file
+        key, step = (Qt.Key.Key_L, rewindStep) if index % 2 == 0 else (Qt.Key.Key_J, -rewindStep)
+        target = min(max(window.mediaPlayer.position() + step, 0), duration)
+        times.append(waitForFrame(window, lambda key=key: QTest.keyClick(window, key), target))
+    return times
+
+
+def benchmarkSliderSeek(window, repeats: int) -> list:
+    slider = window.controlPanel.positionSlider
+    duration = window.mediaPlayer.duration()
+    randomGenerator = random.Random(0)
+
+    def releaseSlider(target: int):
+        slider.setValue(target)
+        slider.sliderReleased.emit()
+
+    times = []
+    for _ in range(repeats):
+        target = randomGenerator.randrange(0, max(duration - 2000, 1))
+        times.append(waitForFrame(window, lambda target=target: releaseSlider(target), target))
+    return times
+
+
+def benchmarkPlayback(mediaPath: str, repeats: int) -> dict:
+    from main import VideoWindow  # pylint: disable=import-outside-toplevel
+    window = VideoWindow()
+    window.resize(640, 480)
+    window.show()
+    results = {'timeToFirstFrame': benchmarkFirstFrame(window, mediaPath, repeats)}
+    # seeks are measured paused so frames of the running playback are not mistaken for them
+    window.pause()
+    settle()
+    results['rewindSeek'] = benchmarkRewind(window, repeats)
+    results['sliderSeek'] = benchmarkSliderSeek(window, repeats)
+    window.close()
+    return results
+
+
+def runPlayerBenchmarks(repeats: int = REPEATS, mediaPath: Optional[str] = None) -> dict:
+    results = {
+        'startup.cold': {'value': median(benchmarkColdStart(repeats)), 'unit': 'ms'},
+        'startup.window': {'value': median(benchmarkWindow(repeats)), 'unit': 'ms'}
+    }
+    mediaPath = mediaPath or generateMedia()
+    if mediaPath is None:
+        print('ffmpeg is not available, playback benchmarks are skipped', file=sys.stderr)
+        return results
+    for name, times in benchmarkPlayback(mediaPath, repeats).items():
+        results[f'player.{name}'] = {'value': median(times), 'unit': 'ms'}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Player startup, first frame and seek benchmark')
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--media', help='media file to play instead of the generated one')
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    app.setApplicationName('VideoPlayerBenchmark')
+    QStandardPaths.setTestModeEnabled(True)
+    for name, result in runPlayerBenchmarks(args.repeats, args.media).items():
+        print(f'{name:>24} {result["value"]!s:>10} {result["unit"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import random
+import argparse
+from time import perf_counter
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# pylint: disable=wrong-import-position
+from PyQt6.QtCore import QStandardPaths
+from PyQt6.QtWidgets import QApplication
+
+from main import PlayList
+
+SIZES = (100, 1_000, 10_000, 100_000)
+OPERATIONS = 2_000
+
+
+def filePaths(size: int):
+    return [f'/media/video_{i:06}.mp4' for i in range(size)]
+
+
+def fillPlaylist(playList: PlayList, size: int):
+    playList.model.addFiles(filePaths(size))
+
+
+def benchmarkAdd(size: int) -> float:
+    playList = PlayList()
+    paths = filePaths(size)
+    start = perf_counter()
+    playList.model.addFiles(paths)
+    return (perf_counter() - start) / size
+
+
+def benchmarkNext(size: int) -> float:
+    playList = PlayList()
+    fillPlaylist(playList, size)
+    start = perf_counter()
+    for _ in range(OPERATIONS):
+        playList.next()
+    return (perf_counter() - start) / OPERATIONS
+
+
+def benchmarkDeleteAndNext(size: int) -> float:
+    playList = PlayList()
+    fillPlaylist(playList, size)
+    randomGenerator = random.Random(size)
+    operations = min(OPERATIONS, size // 2)
+    start = perf_counter()
+    for _ in range(operations):
+        playList.model.removeRow(randomGenerator.randrange(playList.count()))
+        playList.next()
+    return (perf_counter() - start) / operations
+
+
+def runPlaylistBenchmarks(sizes=SIZES) -> dict:
+    results = {}
+    for size in sizes:
+        for name, benchmark in (('add', benchmarkAdd), ('next', benchmarkNext),
+                                ('deleteAndNext', benchmarkDeleteAndNext)):
+            results[f'playlist.{name}[{size}]'] = {
+                'value': round(benchmark(size) * 1e6, 3), 'unit': 'us'}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Playlist navigation scaling benchmark')
+    parser.add_argument('sizes', nargs='*', type=int, default=SIZES)
+    args = parser.parse_args()
+
+    _ = QApplication(sys.argv)
+    # the playlist's caches must not end up in the user's data directory
+    QStandardPaths.setTestModeEnabled(True)
+    print(f'{"entries":>10} {"add, us":>10} {"next, us":>10} {"delete+next, us":>16}')
+    for size in args.sizes:
+        print(f'{size:>10} {benchmarkAdd(size) * 1e6:>10.2f} {benchmarkNext(size) * 1e6:>10.2f} '
+              f'{benchmarkDeleteAndNext(size) * 1e6:>16.2f}')
+
+
+if __name__ == '__main__':
+    main()
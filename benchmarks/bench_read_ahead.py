@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+from time import perf_counter
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# pylint: disable=wrong-import-position
+from PyQt6.QtCore import QIODevice
+from PyQt6.QtWidgets import QApplication
+
+from read_ahead import ReadAheadDevice
+
+FILE_SIZE = 48 << 20
+BLOCK_SIZE = 64 << 10
+# a slow network mount: every request waits for a round trip, then for the bandwidth
+LATENCY = 0.005
+BANDWIDTH = 40 << 20
+# the decoder consumes a 12 MiB/s stream
+BITRATE = 12 << 20
+SEEKS = (0.3, 0.7, 0.2)
+
+
+def throttle(length: int):
+    time.sleep(LATENCY + length / BANDWIDTH)
+
+
+class ThrottledFile:
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'rb', buffering=0)  # pylint: disable=consider-using-with
+
+    def readAt(self, offset: int, length: int) -> bytes:
+        throttle(length)
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def close(self):
+        self._file.close()
+
+
+class ThrottledReadAheadDevice(ReadAheadDevice):
+    def _readAt(self, offset: int, length: int) -> bytes:
+        throttle(length)
+        return super()._readAt(offset, length)
+
+
+def createFile() -> str:
+    with tempfile.NamedTemporaryFile(suffix='.bin', delete=False) as file:
+        block = bytes(range(256)) * (BLOCK_SIZE // 256)
+        for _ in range(FILE_SIZE // BLOCK_SIZE):
+            file.write(block)
+    return file.name
+
+
+def play(read, stallLimit: float = 0.001) -> dict:
+    # reads the stream at its bitrate, jumps at a few points and adds up the time spent waiting
+    stalled = 0.0
+    stalls = 0
+    blockTime = BLOCK_SIZE / BITRATE
+    segment = FILE_SIZE // (len(SEEKS) + 2)
+    offsets = [0] + [int(FILE_SIZE * seek) for seek in SEEKS]
+    start = perf_counter()
+    for offset in offsets:
+        for position in range(offset, offset + segment, BLOCK_SIZE):
+            readStart = perf_counter()
+            read(position, BLOCK_SIZE)
+            waited = perf_counter() - readStart
+            if waited > stallLimit:
+                stalled += waited
+                stalls += 1
+            time.sleep(max(blockTime - waited, 0))
+    return {'stalledMs': stalled * 1000, 'stalls': stalls,
+            'wallMs': (perf_counter() - start) * 1000}
+
+
+def benchmarkDirect(path: str) -> dict:
+    file = ThrottledFile(path)
+    try:
+        return play(file.readAt)
+    finally:
+        file.close()
+
+
+def benchmarkReadAhead(path: str, bufferSize: int) -> dict:
+    device = ThrottledReadAheadDevice(path, bufferSize)
+    device.open(QIODevice.OpenModeFlag.ReadOnly)
+
+    def read(position: int, length: int):
+        device.seek(position)
+        device.read(length)
+
+    try:
+        return play(read)
+    finally:
+        device.close()
+
+
+def benchmarkStart(path: str, head: bytes) -> float:
+    # the first block of a track, with or without the prefetched head
+    device = ThrottledReadAheadDevice(path, 8 << 20, head)
+    start = perf_counter()
+    device.open(QIODevice.OpenModeFlag.ReadOnly)
+    device.read(BLOCK_SIZE)
+    elapsed = perf_counter() - start
+    device.close()
+    return elapsed * 1000
+
+
+def runReadAheadBenchmarks(bufferSize: int = 16 << 20) -> dict:
+    path = createFile()
+    try:
+        direct = benchmarkDirect(path)
+        readAhead = benchmarkReadAhead(path, bufferSize)
+        with open(path, 'rb') as file:
+            head = file.read(4 << 20)
+        coldStart = benchmarkStart(path, b'')
+        prefetchedStart = benchmarkStart(path, head)
+    finally:
+        os.remove(path)
+    return {
+        'readahead.direct.stalled': {'value': round(direct['stalledMs'], 3), 'unit': 'ms'},
+        'readahead.buffered.stalled': {'value': round(readAhead['stalledMs'], 3), 'unit': 'ms'},
+        'readahead.direct.stalls': {'value': direct['stalls'], 'unit': 'reads'},
+        'readahead.buffered.stalls': {'value': readAhead['stalls'], 'unit': 'reads'},
+        'readahead.start.cold': {'value': round(coldStart, 3), 'unit': 'ms'},
+        'readahead.start.prefetched': {'value': round(prefetchedStart, 3), 'unit': 'ms'}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read-ahead buffer against a throttled file')
+    parser.add_argument('--buffer', type=int, default=16, help='buffer size in MiB')
+    args = parser.parse_args()
+
+    _ = QApplication(sys.argv)
+    for name, result in runReadAheadBenchmarks(args.buffer << 20).items():
+        print(f'{name:>28} {result["value"]!s:>10} {result["unit"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Optional
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+BACKENDS = ('scene', 'opengl', 'widget')
+FRAMES = 300
+FRAME_SIZE = (1920, 1080)
+
+# every backend runs in its own process, the GL setup has to happen before QApplication exists
+RENDER_SCRIPT = '''
+import os
+import sys
+import json
+import time
+from PyQt6.QtCore import Qt, QCoreApplication, QSize, QStandardPaths
+from PyQt6.QtGui import QImage
+from PyQt6.QtMultimedia import QVideoFrame, QVideoFrameFormat
+from PyQt6.QtWidgets import QApplication
+
+backend, frameCount, width, height = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])
+QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_UseSoftwareOpenGL)
+app = QApplication(sys.argv)
+app.setApplicationName('VideoPlayerBenchmark')
+QStandardPaths.setTestModeEnabled(True)
+from main import VideoWindow
+from render_backend import RenderBackend, isOpenGLAvailable
+if backend == 'opengl' and not isOpenGLAvailable():
+    print(json.dumps(None))
+    sys.exit()
+
+def makeFrame(shade):
+    image = QImage(width, height, QImage.Format.Format_RGBX8888)
+    image.fill(shade)
+    try:
+        return QVideoFrame(image)
+    except TypeError:
+        # before Qt 6.8 frames can only be filled through a mapping
+        frame = QVideoFrame(QVideoFrameFormat(QSize(width, height),
+                                              QVideoFrameFormat.PixelFormat.Format_RGBX8888))
+        frame.map(QVideoFrame.MapMode.WriteOnly)
+        bits = frame.bits(0)
+        bits.setsize(frame.mappedBytes(0))
+        memoryview(bits)[:] = bytes([shade % 256]) * frame.mappedBytes(0)
+        frame.unmap()
+        return frame
+
+window = VideoWindow(renderBackend=RenderBackend(backend))
+window.resize(1280, 720)
+window.show()
+frames = [makeFrame(shade) for shade in (0x404040, 0x808080)]
+for frame in frames:
+    window.videoSink.setVideoFrame(frame)
+    app.processEvents()
+
+cpuStart, wallStart = time.process_time(), time.perf_counter()
+for number in range(frameCount):
+    window.videoSink.setVideoFrame(frames[number % 2])
+    app.processEvents()
+cpu, wall = time.process_time() - cpuStart, time.perf_counter() - wallStart
+print(json.dumps({'cpu': cpu / frameCount, 'wall': wall / frameCount}))
+'''
+
+
+def benchmarkBackend(backend: str, frames: int = FRAMES) -> Optional[dict]:
+    # a software rasterizer stands in for the GPU so the comparison runs anywhere
+    environment = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'),
+                       LIBGL_ALWAYS_SOFTWARE='1', QT_OPENGL='software')
+    output = subprocess.run(
+        [sys.executable, '-c', RENDER_SCRIPT, backend, str(frames), *map(str, FRAME_SIZE)],
+        cwd=ROOT_PATH, env=environment, capture_output=True, text=True, check=False)
+    if output.returncode != 0:
+        print(f'{backend} backend failed: {output.stderr.strip().splitlines()[-1:]}',
+              file=sys.stderr)
+        return None
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def runRenderBenchmarks(frames: int = FRAMES) -> dict:
+    results = {}
+    for backend in BACKENDS:
+        result = benchmarkBackend(backend, frames) or {}
+        for name in ('cpu', 'wall'):
+            value = result.get(name)
+            results[f'render.{backend}.{name}PerFrame'] = {
+                'value': round(value * 1000, 3) if value is not None else None, 'unit': 'ms'}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CPU time per presented frame for each backend')
+    parser.add_argument('--frames', type=int, default=FRAMES)
+    args = parser.parse_args()
+    for name, result in runRenderBenchmarks(args.frames).items():
+        print(f'{name:>28} {result["value"]!s:>10} {result["unit"]}')
+
+
+if __name__ == '__main__':
+    main()
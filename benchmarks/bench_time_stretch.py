@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# pylint: disable=wrong-import-position
+from time_stretch import Wsola, np
+
+SAMPLE_RATE = 48_000
+CHANNELS = 2
+# the decoder hands audio over in blocks of about 20 ms
+BLOCK_SIZE = 960
+DURATION = 30
+RATES = (0.5, 1.5, 2.0, 4.0)
+
+
+def createSignal(duration: int) -> 'np.ndarray':
+    # a chord with noise on top, closer to speech than a pure tone
+    generator = np.random.default_rng(0)
+    times = np.arange(duration * SAMPLE_RATE) / SAMPLE_RATE
+    tone = sum(np.sin(2 * np.pi * frequency * times) for frequency in (220, 330, 440)) / 4
+    signal = tone[:, None] + generator.normal(0, 0.05, (len(times), CHANNELS))
+    return signal.astype(np.float32)
+
+
+def benchmarkRate(signal: 'np.ndarray', rate: float) -> float:
+    wsola = Wsola(SAMPLE_RATE, CHANNELS)
+    wsola.setRate(rate)
+    outputFrames = 0
+    start = time.process_time()
+    for offset in range(0, len(signal), BLOCK_SIZE):
+        outputFrames += len(wsola.process(signal[offset:offset + BLOCK_SIZE]))
+    # cpu time spent for every second that comes out of the speakers
+    return (time.process_time() - start) / (outputFrames / SAMPLE_RATE)
+
+
+def runTimeStretchBenchmarks(duration: int = DURATION) -> dict:
+    # without numpy the backend changes the rate on its own and there is nothing to measure
+    signal = createSignal(duration) if np is not None else None
+    return {
+        f'stretch.{rate:g}x.cpuPerSecond': {
+            'value': round(benchmarkRate(signal, rate) * 1000, 3) if signal is not None else None,
+            'unit': 'ms'}
+        for rate in RATES
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CPU cost of the time stretcher per second played')
+    parser.add_argument('--duration', type=int, default=DURATION, help='seconds of audio')
+    args = parser.parse_args()
+    for name, result in runTimeStretchBenchmarks(args.duration).items():
+        print(f'{name:>28} {result["value"]!s:>10} {result["unit"]}')
+
+
+if __name__ == '__main__':
+    main()
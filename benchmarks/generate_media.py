@@ -0,0 +1,49 @@
+import os
+import shutil
+import argparse
+import tempfile
+import subprocess
+from typing import Optional
+
+MEDIA_DIRECTORY = os.path.join(tempfile.gettempdir(), 'videoplayer-benchmark-media')
+# a keyframe every two seconds is close to what most encoders produce
+VIDEO_CODECS = (('libx264', ['-pix_fmt', 'yuv420p', '-g', '60']), ('mpeg4', ['-g', '60']))
+
+
+def generateMedia(duration: int = 30, size: str = '1280x720', rate: int = 30,
+                  directory: str = MEDIA_DIRECTORY) -> Optional[str]:
+    path = os.path.join(directory, f'testsrc_{size}_{rate}fps_{duration}s.mp4')
+    if os.path.isfile(path):
+        return path
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        return None
+
+    os.makedirs(directory, exist_ok=True)
+    for codec, options in VIDEO_CODECS:
+        command = [
+            ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={rate}:duration={duration}',
+            '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+            '-c:v', codec, *options, '-c:a', 'aac', '-shortest', path
+        ]
+        if subprocess.run(command, check=False).returncode == 0:
+            return path
+        if os.path.exists(path):
+            os.remove(path)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate benchmark media with ffmpeg')
+    parser.add_argument('--duration', type=int, default=30)
+    parser.add_argument('--size', default='1280x720')
+    parser.add_argument('--rate', type=int, default=30)
+    args = parser.parse_args()
+
+    path = generateMedia(args.duration, args.size, args.rate)
+    print(path or 'ffmpeg is not available')
+
+
+if __name__ == '__main__':
+    main()
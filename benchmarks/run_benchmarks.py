@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+from datetime import datetime, timezone
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# pylint: disable=wrong-import-position
+from PyQt6.QtCore import QStandardPaths, QT_VERSION_STR
+from PyQt6.QtWidgets import QApplication
+
+from bench_playlist import SIZES, runPlaylistBenchmarks
+from bench_player import REPEATS, runPlayerBenchmarks
+from bench_read_ahead import runReadAheadBenchmarks
+from bench_render import runRenderBenchmarks
+from bench_time_stretch import runTimeStretchBenchmarks
+
+SUITES = ('playlist', 'player', 'readahead', 'render', 'stretch')
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # every benchmark measures a cost, so only growth is a regression
+    regressions = []
+    print(f'{"benchmark":<32} {"baseline":>10} {"current":>10} {"change":>8}')
+    for name, result in results.items():
+        previous = baseline.get(name, {}).get('value')
+        current = result['value']
+        if previous is None or current is None or previous == 0:
+            print(f'{name:<32} {previous!s:>10} {current!s:>10}')
+            continue
+        change = current / previous - 1
+        isRegression = change > tolerance
+        if isRegression:
+            regressions.append(name)
+        print(f'{name:<32} {previous:>10.3f} {current:>10.3f} {change:>+7.1%}'
+              f'{" !" if isRegression else ""}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite')
+    parser.add_argument('--suite', action='append', choices=SUITES,
+                        help='suite to run, all of them by default')
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--media', help='media file to play instead of the generated one')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown against the baseline, 0.2 is 20%%')
+    args = parser.parse_args()
+    suites = args.suite or SUITES
+
+    app = QApplication(sys.argv)
+    app.setApplicationName('VideoPlayerBenchmark')
+    # every run starts from an empty session, playlist and cache
+    QStandardPaths.setTestModeEnabled(True)
+    shutil.rmtree(QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.AppDataLocation), ignore_errors=True)
+
+    results = {}
+    if 'playlist' in suites:
+        results.update(runPlaylistBenchmarks(args.sizes))
+    if 'player' in suites:
+        results.update(runPlayerBenchmarks(args.repeats, args.media))
+    if 'readahead' in suites:
+        results.update(runReadAheadBenchmarks())
+    if 'render' in suites:
+        results.update(runRenderBenchmarks())
+    if 'stretch' in suites:
+        results.update(runTimeStretchBenchmarks())
+
+    report = {
+        'meta': {
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'qt': QT_VERSION_STR,
+            'platform': platform.platform(),
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as baselineFile:
+            baseline = json.load(baselineFile)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} regression(s): {", ".join(regressions)}')
+            sys.exit(1)
+    else:
+        for name, result in results.items():
+            print(f'{name:<32} {result["value"]!s:>10} {result["unit"]}')
+
+
+if __name__ == '__main__':
+    main()
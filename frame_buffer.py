@@ -0,0 +1,128 @@
+from collections import deque
+
+from PyQt6.QtCore import QObject
+from PyQt6.QtMultimedia import QVideoFrame, QVideoFrameFormat, QVideoSink
+
+_PixelFormat = QVideoFrameFormat.PixelFormat
+# bytes per pixel of the formats decoders produce, anything else is counted as 32 bit
+_bytesPerPixel = {
+    _PixelFormat.Format_NV12: 1.5,
+    _PixelFormat.Format_NV21: 1.5,
+    _PixelFormat.Format_YUV420P: 1.5,
+    _PixelFormat.Format_YV12: 1.5,
+    _PixelFormat.Format_IMC1: 1.5,
+    _PixelFormat.Format_YUV422P: 2,
+    _PixelFormat.Format_UYVY: 2,
+    _PixelFormat.Format_YUYV: 2,
+    _PixelFormat.Format_YUV420P10: 3,
+    _PixelFormat.Format_P010: 3,
+    _PixelFormat.Format_P016: 3,
+    _PixelFormat.Format_Y8: 1,
+    _PixelFormat.Format_Y16: 2,
+}
+
+
+def frameBytes(frame: QVideoFrame) -> int:
+    size = frame.size()
+    return int(size.width() * size.height() * _bytesPerPixel.get(frame.pixelFormat(), 4))
+
+
+class FrameRing(QObject):
+    # the frames the sink presented last, stepping back shows them again without the decoder
+    _defaultFrameDuration = 40_000
+    # a hardware decoder owns a fixed pool of surfaces, holding more of them would starve it
+    _hardwareFrameLimit = 8
+    # a frame further than this past the previous one follows a seek and starts the ring over
+    _gapTolerance = 500_000
+
+    def __init__(self, videoSink: QVideoSink, maxBytes: int, parent=None) -> None:
+        super().__init__(parent)
+        self.videoSink = videoSink
+        self.maxBytes = maxBytes
+        self.bytes = 0
+        self._frames = deque()
+        self._sizes = deque()
+        self._hardwareFrames = 0
+        # the frame on screen while stepping through the ring, -1 follows the decoder
+        self._index = -1
+        self._isShowing = False
+        videoSink.videoFrameChanged.connect(self._videoFrameChanged)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def isStepping(self) -> bool:
+        return self._index != -1
+
+    def position(self) -> int:
+        # of the frame on screen while stepping, in milliseconds like the player
+        return self._frames[self._index].startTime() // 1000 if self.isStepping() else -1
+
+    def clear(self):
+        self._frames.clear()
+        self._sizes.clear()
+        self.bytes = 0
+        self._hardwareFrames = 0
+        self._index = -1
+
+    def stepBack(self) -> int:
+        index = (self._index if self.isStepping() else len(self._frames) - 1) - 1
+        if index < 0:
+            return -1
+        return self._show(index)
+
+    def stepForward(self) -> int:
+        if not self.isStepping():
+            return -1
+        position = self._show(self._index + 1)
+        # the newest frame is the one the decoder stopped at
+        if self._index == len(self._frames) - 1:
+            self._index = -1
+        return position
+
+    def previousPosition(self, position: int) -> int:
+        # where the decoder has to seek for the frame before the ring, in milliseconds
+        if not self._frames:
+            return max(position - self._defaultFrameDuration // 1000, 0)
+        return max((self._frames[0].startTime() - 1) // 1000, 0)
+
+    def nextPosition(self, position: int) -> int:
+        if not self._frames:
+            return position + self._defaultFrameDuration // 1000
+        last = self._frames[-1]
+        endTime = last.endTime() if last.endTime() > last.startTime() \
+            else last.startTime() + self._defaultFrameDuration
+        return -(-endTime // 1000)
+
+    def _show(self, index: int) -> int:
+        self._index = index
+        self._isShowing = True
+        self.videoSink.setVideoFrame(self._frames[index])
+        self._isShowing = False
+        return self._frames[index].startTime() // 1000
+
+    def _videoFrameChanged(self, frame: QVideoFrame):
+        # this runs for every presented frame, keeping one only takes a reference to it
+        if self._isShowing or not frame.isValid() or frame.startTime() < 0:
+            return
+        if self.isStepping():
+            # a frame still on its way from before the pause would replace the stepped to one,
+            # seeks and playback clear the ring before the decoder is listened to again
+            self._show(self._index)
+            return
+        if self._frames:
+            last = self._frames[-1]
+            gap = frame.startTime() - max(last.endTime(), last.startTime())
+            if frame.startTime() <= last.startTime() or gap > self._gapTolerance:
+                self.clear()
+
+        size = frameBytes(frame)
+        self._frames.append(QVideoFrame(frame))
+        self._sizes.append(size)
+        self.bytes += size
+        self._hardwareFrames += frame.handleType() != QVideoFrame.HandleType.NoHandle
+        while len(self._frames) > 1 and (self.bytes > self.maxBytes
+                                         or self._hardwareFrames > self._hardwareFrameLimit):
+            dropped = self._frames.popleft()
+            self.bytes -= self._sizes.popleft()
+            self._hardwareFrames -= dropped.handleType() != QVideoFrame.HandleType.NoHandle
@@ -0,0 +1,73 @@
+from typing import Optional
+
+from PyQt6.QtCore import QObject, QUrl
+from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+
+from read_ahead import ReadAheadSource
+from time_stretch import TimeStretcher
+
+
+class PlayerPool(QObject):
+    def __init__(self, audioOutput: QAudioOutput, videoOutput: QObject, parent=None) -> None:
+        super().__init__(parent)
+        self.audioOutput = audioOutput
+        self.videoOutput = videoOutput
+        self.current = QMediaPlayer(self)
+        self.current.setAudioOutput(audioOutput)
+        self.current.setVideoOutput(videoOutput)
+        # the standby player opens the next file without any outputs attached
+        self.standby = QMediaPlayer(self)
+        for player in (self.current, self.standby):
+            player.mediaStatusChanged.connect(
+                lambda status, player=player: self._mediaStatusChanged(player, status))
+        self._preloadedSource = ''
+        self._preloadPosition = 0
+        self.readAhead: Optional[ReadAheadSource] = None
+        self.timeStretch: Optional[TimeStretcher] = None
+
+    def load(self, player: QMediaPlayer, fileName: str):
+        if self.readAhead is not None:
+            self.readAhead.setSource(player, fileName)
+        else:
+            player.setSource(QUrl.fromLocalFile(fileName) if fileName else QUrl())
+
+    def preloadedSource(self) -> str:
+        return self._preloadedSource
+
+    def preload(self, fileName: str, position: int = 0):
+        self._preloadedSource = fileName
+        self._preloadPosition = position
+        self.load(self.standby, fileName)
+
+    def release(self):
+        # both decoders are closed, the window keeps what it needs to load the file again
+        for player in (self.current, self.standby):
+            player.stop()
+            self.load(player, '')
+        self._preloadedSource = ''
+
+    def swap(self) -> QMediaPlayer:
+        previous, self.current = self.current, self.standby
+        previous.setVideoOutput(None)
+        if self.timeStretch is not None:
+            # the stretcher takes the audio away from the previous player itself
+            self.timeStretch.setPlayer(self.current)
+        else:
+            previous.setAudioOutput(None)
+            self.current.setAudioOutput(self.audioOutput)
+        self.current.setVideoOutput(self.videoOutput)
+        self.current.setPlaybackRate(previous.playbackRate())
+
+        previous.stop()
+        self.load(previous, '')
+        self.standby = previous
+        self._preloadedSource = ''
+        return self.current
+
+    def _mediaStatusChanged(self, player: QMediaPlayer, status):
+        if player is not self.standby or status != QMediaPlayer.MediaStatus.LoadedMedia:
+            return
+        # pausing prerolls the decoder so the swap only has to start the clock
+        if self._preloadPosition > 0:
+            self.standby.setPosition(self._preloadPosition)
+        self.standby.pause()
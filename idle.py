@@ -0,0 +1,83 @@
+from PyQt6.QtCore import QEvent, QObject, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QWidget
+
+
+class IdleManager(QObject):
+    # a window nobody can see stops drawing, one left without playback gives its decoder back,
+    # any activity brings both back at once
+    suspendedChanged = pyqtSignal(bool)
+    releasedChanged = pyqtSignal(bool)
+
+    def __init__(self, suspendTimeout: int, releaseTimeout: int, parent=None) -> None:
+        super().__init__(parent)
+        self.isVisible = True
+        self.isPlaying = False
+        self.isSuspended = False
+        self.isReleased = False
+        # a timeout of 0 never reaches its stage
+        self._suspendTimer = self._createTimer(suspendTimeout, self._suspend)
+        self._releaseTimer = self._createTimer(releaseTimeout, self._release)
+        self._update()
+
+    def watch(self, window: QWidget):
+        # the window is followed through its events as it is minimized, hidden and shown
+        window.installEventFilter(self)
+
+    def eventFilter(self, obj: QObject, event: QEvent) -> bool:
+        if event.type() in (QEvent.Type.WindowStateChange, QEvent.Type.Show, QEvent.Type.Hide):
+            self.setVisible(obj.isVisible() and not obj.isMinimized())
+        return False
+
+    def setVisible(self, visible: bool):
+        if visible == self.isVisible:
+            return
+        self.isVisible = visible
+        if visible:
+            self.activity()
+        else:
+            self._update()
+
+    def setPlaying(self, playing: bool):
+        if playing == self.isPlaying:
+            return
+        self.isPlaying = playing
+        self._update()
+
+    def activity(self):
+        # this runs for every input event, so it does nothing more than restart a timer
+        if self.isReleased:
+            self.isReleased = False
+            self.releasedChanged.emit(False)
+        if self.isSuspended and self.isVisible:
+            self.isSuspended = False
+            self.suspendedChanged.emit(False)
+        if not self.isPlaying and self._releaseTimer.interval():
+            self._releaseTimer.start()
+
+    def _createTimer(self, timeout: int, callback) -> QTimer:
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(timeout)
+        timer.timeout.connect(callback)
+        return timer
+
+    def _update(self):
+        self._restart(self._suspendTimer, not self.isVisible and not self.isSuspended)
+        self._restart(self._releaseTimer, not self.isPlaying and not self.isReleased)
+
+    @staticmethod
+    def _restart(timer: QTimer, running: bool):
+        if not running or not timer.interval():
+            timer.stop()
+        elif not timer.isActive():
+            timer.start()
+
+    def _suspend(self):
+        if not self.isVisible and not self.isSuspended:
+            self.isSuspended = True
+            self.suspendedChanged.emit(True)
+
+    def _release(self):
+        if not self.isPlaying and not self.isReleased:
+            self.isReleased = True
+            self.releasedChanged.emit(True)
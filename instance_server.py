@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import getpass
+from typing import List, Optional
+
+from PyQt6.QtCore import QDir, QLockFile, QObject
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+# one line per command, arguments are separated by tabs so paths can contain spaces:
+#   open <path>...     play the first file and add everything to the playlist
+#   enqueue <path>...  add to the playlist
+#   play | pause | show
+#   seek <milliseconds>
+#   status             replies with a json line
+SERVER_NAME = f'VideoPlayer-{getpass.getuser()}'
+CONNECT_TIMEOUT = 200
+REPLY_TIMEOUT = 1000
+
+
+def sendCommands(lines: List[str], serverName: str = SERVER_NAME) -> Optional[List[str]]:
+    # blocking on purpose, this runs before an event loop exists
+    socket = QLocalSocket()
+    socket.connectToServer(serverName)
+    if not socket.waitForConnected(CONNECT_TIMEOUT):
+        return None
+    socket.write(''.join(line + '\n' for line in lines).encode())
+    replies = []
+    while len(replies) < len(lines) and socket.waitForReadyRead(REPLY_TIMEOUT):
+        while socket.canReadLine():
+            replies.append(bytes(socket.readLine()).decode().rstrip('\n'))
+    socket.disconnectFromServer()
+    return replies
+
+
+def isServerRunning(serverName: str = SERVER_NAME) -> bool:
+    socket = QLocalSocket()
+    socket.connectToServer(serverName)
+    if not socket.waitForConnected(CONNECT_TIMEOUT):
+        return False
+    socket.disconnectFromServer()
+    return True
+
+
+def forwardToRunningInstance(arguments: List[str]) -> bool:
+    # the running instance has its own working directory
+    paths = [os.path.abspath(argument) for argument in arguments]
+    command = '\t'.join(['open'] + paths) if paths else 'show'
+    return sendCommands([command]) is not None
+
+
+class InstanceServer(QObject):
+    def __init__(self, window, serverName: str = SERVER_NAME, parent=None) -> None:
+        super().__init__(parent)
+        self.window = window
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self._newConnection)
+        # with socket options set, listen replaces a socket file even if an instance still owns
+        # it, so launches take turns and only listen while nothing answers
+        lock = QLockFile(os.path.join(QDir.tempPath(), f'{serverName}.lock'))
+        lock.lock()
+        try:
+            if not isServerRunning(serverName) and not self.server.listen(serverName):
+                # a crashed instance leaves its socket file behind
+                QLocalServer.removeServer(serverName)
+                self.server.listen(serverName)
+        finally:
+            lock.unlock()
+
+    def isListening(self) -> bool:
+        return self.server.isListening()
+
+    def close(self):
+        self.server.close()
+
+    def _newConnection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self._readCommands(socket))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def _readCommands(self, socket: QLocalSocket):
+        while socket.canReadLine():
+            line = bytes(socket.readLine()).decode(errors='replace').rstrip('\r\n')
+            command, *arguments = line.split('\t') if '\t' in line else line.split(' ', 1)
+            try:
+                reply = self._execute(command.lower(), [argument for argument in arguments
+                                                        if argument])
+            except (ValueError, IndexError) as error:
+                reply = f'error {error}'
+            socket.write((reply + '\n').encode())
+
+    def _execute(self, command: str, arguments: List[str]) -> str:
+        window = self.window
+        match command:
+            case 'open':
+                window.openPaths(arguments)
+                self._raiseWindow()
+            case 'enqueue':
+                window.playListWidget.importPaths(arguments)
+            case 'play':
+                window.play()
+            case 'pause':
+                window.pause()
+            case 'seek':
+                window.seekEngine.seek(int(arguments[0]))
+            case 'show':
+                self._raiseWindow()
+            case 'status':
+                player = window.mediaPlayer
+                return json.dumps({
+                    'file': player.source().toLocalFile(),
+                    'state': player.playbackState().name,
+                    'position': player.position(),
+                    'duration': player.duration(),
+                    'rate': player.playbackRate(),
+                    'playlist': window.playListWidget.count()
+                })
+            case _:
+                raise ValueError(f'unknown command {command!r}')
+        return 'ok'
+
+    def _raiseWindow(self):
+        if self.window.isMinimized():
+            self.window.showNormal()
+        else:
+            self.window.show()
+        self.window.raise_()
+        self.window.activateWindow()
+
+
+if __name__ == '__main__':
+    # scripted control, e.g. python instance_server.py seek 60000
+    result = sendCommands(['\t'.join(sys.argv[1:]) or 'status'])
+    if result is None:
+        sys.exit('no running instance')
+    print('\n'.join(result))
@@ -0,0 +1,301 @@
+import os
+import math
+import sqlite3
+from collections import deque
+from typing import NamedTuple, Optional
+
+from PyQt6.QtCore import QObject, QThread, QTimer, QUrl, pyqtSignal
+from PyQt6.QtMultimedia import QAudioDecoder, QAudioFormat
+
+from media_probe import fileKey
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def isLoudnessAvailable() -> bool:
+    return np is not None and os.environ.get('VIDEOPLAYER_NORMALIZE', '1') != '0'
+
+
+class Loudness(NamedTuple):
+    # integrated loudness in LUFS and sample peak in dBFS, None for files without audio
+    integrated: Optional[float] = None
+    peak: Optional[float] = None
+
+
+def gainFor(loudness: Loudness, target: float, maxGain: float, headroom: float) -> float:
+    # quiet files are raised only as far as their peak allows
+    if loudness.integrated is None:
+        return 1.0
+    gain = min(target - loudness.integrated, maxGain)
+    if loudness.peak is not None:
+        gain = min(gain, -headroom - loudness.peak)
+    return 10 ** (gain / 20)
+
+
+def _biquadPower(b: tuple, a: tuple, frequencies: 'np.ndarray') -> 'np.ndarray':
+    z = np.exp(-1j * frequencies)
+    numerator = b[0] + b[1] * z + b[2] * z * z
+    denominator = a[0] + a[1] * z + a[2] * z * z
+    return np.abs(numerator / denominator) ** 2
+
+
+def kWeighting(sampleRate: int, length: int) -> 'np.ndarray':
+    # power response of the BS.1770 pre-filter and high pass at the bins of a real FFT
+    frequencies = 2 * np.pi * np.fft.rfftfreq(length)
+    k = math.tan(math.pi * 1681.974450955533 / sampleRate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = _biquadPower(
+        ((vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0),
+        (1, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0), frequencies)
+    k = math.tan(math.pi * 38.13547087602444 / sampleRate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    highPass = _biquadPower((1, -2, 1), (1, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+                            frequencies)
+    return shelf * highPass
+
+
+class LoudnessMeter:
+    # the filtered energy of every 100 ms is taken from its spectrum, four of them make a
+    # gating block, so a whole chunk of audio is measured with a few array operations
+    _subBlockLength = 0.1
+    _blockSubBlocks = 4
+    _absoluteGate = -70.0
+    _relativeGate = -10.0
+
+    def __init__(self, sampleRate: int, channels: int) -> None:
+        self.channels = channels
+        self._subBlock = int(sampleRate * self._subBlockLength)
+        weighting = kWeighting(sampleRate, self._subBlock)
+        # parseval for a real FFT, the bins between DC and nyquist stand for two
+        weighting[1:(self._subBlock + 1) // 2] *= 2
+        self._weighting = weighting / (self._subBlock * self._subBlock)
+        self._remainder = np.zeros((0, channels), np.float32)
+        self._energies = []
+        self._peak = 0.0
+
+    def process(self, samples: 'np.ndarray'):
+        if len(samples):
+            self._peak = max(self._peak, float(np.abs(samples).max()))
+        data = np.concatenate((self._remainder, samples)) if len(self._remainder) else samples
+        count = len(data) // self._subBlock
+        self._remainder = data[count * self._subBlock:]
+        if not count:
+            return
+        blocks = data[:count * self._subBlock].reshape(count, self._subBlock, self.channels)
+        power = np.abs(np.fft.rfft(blocks, axis=1)) ** 2
+        # mean square of every channel, summed over the channels with unit weights
+        self._energies.append(np.einsum('bfc,f->b', power, self._weighting))
+
+    def result(self) -> Loudness:
+        energies = np.concatenate(self._energies) if self._energies else np.zeros(0)
+        peak = 20 * math.log10(self._peak) if self._peak > 0 else None
+        if len(energies) < self._blockSubBlocks:
+            return Loudness(None, peak)
+        # overlapping 400 ms blocks move on by one sub block
+        sums = np.convolve(energies, np.ones(self._blockSubBlocks), 'valid') / self._blockSubBlocks
+        with np.errstate(divide='ignore'):
+            loudness = -0.691 + 10 * np.log10(sums)
+        gated = sums[loudness > self._absoluteGate]
+        if gated.size == 0:
+            return Loudness(None, peak)
+        threshold = -0.691 + 10 * math.log10(gated.mean()) + self._relativeGate
+        gated = sums[loudness > max(threshold, self._absoluteGate)]
+        return Loudness(-0.691 + 10 * math.log10(gated.mean()), peak)
+
+
+class LoudnessCache:
+    def __init__(self, path: str) -> None:
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript('''
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS loudness (
+                path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, integrated REAL, peak REAL);
+        ''')
+        self._pending = []
+
+    def get(self, key: tuple[str, int, int]) -> Optional[Loudness]:
+        row = self._connection.execute(
+            'SELECT integrated, peak FROM loudness WHERE path = ? AND mtime = ? AND size = ?',
+            key).fetchone()
+        return Loudness(*row) if row else None
+
+    def put(self, key: tuple[str, int, int], loudness: Loudness):
+        self._pending.append(key + tuple(loudness))
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO loudness VALUES (?, ?, ?, ?, ?)', self._pending)
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+
+class LoudnessAnalyzer(QThread):
+    analyzed = pyqtSignal(str, object)
+    _sampleRate = 48_000
+    _channels = 2
+
+    def __init__(self, filePath: str, parent=None) -> None:
+        super().__init__(parent)
+        self.filePath = filePath
+
+    def run(self) -> None:
+        # the decoder lives in this thread, so its buffers are measured here and not in the UI
+        audioFormat = QAudioFormat()
+        audioFormat.setSampleRate(self._sampleRate)
+        audioFormat.setChannelCount(self._channels)
+        audioFormat.setSampleFormat(QAudioFormat.SampleFormat.Float)
+        decoder = QAudioDecoder()
+        decoder.setAudioFormat(audioFormat)
+        meter = LoudnessMeter(self._sampleRate, self._channels)
+        failed = []
+
+        def readBuffers():
+            if self.isInterruptionRequested():
+                decoder.stop()
+                self.quit()
+                return
+            while decoder.bufferAvailable():
+                buffer = decoder.read()
+                data = buffer.constData()
+                data.setsize(buffer.byteCount())
+                meter.process(np.frombuffer(bytes(data), np.float32).reshape(-1, self._channels))
+
+        def decodingFailed(_):
+            failed.append(True)
+            self.quit()
+
+        decoder.bufferReady.connect(readBuffers)
+        decoder.finished.connect(self.quit)
+        decoder.error.connect(decodingFailed)
+        decoder.setSource(QUrl.fromLocalFile(self.filePath))
+        decoder.start()
+        self.exec()
+        decoder.stop()
+        if not self.isInterruptionRequested():
+            # files that cannot be decoded are measured as silent so they are not tried again
+            self.analyzed.emit(self.filePath, Loudness() if failed else meter.result())
+
+
+class LoudnessAnalysis(QObject):
+    # the library is measured in the background, every finished file is cached at once, so an
+    # interrupted analysis picks up where it stopped on the next start
+    loudnessReady = pyqtSignal(dict)
+    _lookupChunkSize = 200
+    _flushInterval = 2000
+
+    def __init__(self, cache: LoudnessCache, parent=None) -> None:
+        super().__init__(parent)
+        self.cache = cache
+        # one core is left to playback
+        self.maxAnalyzers = max((os.cpu_count() or 2) - 1, 1)
+        self._analyzers = {}
+        self._results = {}
+        self._queued = set()
+        self._lookupQueue = deque()
+        self._analyzeQueue = deque()
+        self._keys = {}
+
+        self._lookupTimer = QTimer(self)
+        self._lookupTimer.timeout.connect(self._lookupChunk)
+        self._flushTimer = QTimer(self)
+        self._flushTimer.setInterval(self._flushInterval)
+        self._flushTimer.timeout.connect(self._flush)
+
+    def result(self, filePath: str) -> Optional[Loudness]:
+        return self._results.get(filePath)
+
+    def analyze(self, filePaths, urgent=False):
+        # urgent files, the one playing and the next, skip the queue
+        for filePath in filePaths:
+            if filePath in self._results:
+                continue
+            if filePath in self._queued:
+                if urgent and filePath in self._analyzeQueue:
+                    self._analyzeQueue.remove(filePath)
+                    self._analyzeQueue.appendleft(filePath)
+                continue
+            self._queued.add(filePath)
+            if urgent:
+                self._lookupQueue.appendleft(filePath)
+            else:
+                self._lookupQueue.append(filePath)
+        if self._lookupQueue and not self._lookupTimer.isActive():
+            self._lookupTimer.start(0)
+
+    def close(self):
+        self._lookupTimer.stop()
+        self._lookupQueue.clear()
+        self._analyzeQueue.clear()
+        for analyzer in self._analyzers.values():
+            analyzer.requestInterruption()
+            analyzer.quit()
+        for analyzer in self._analyzers.values():
+            analyzer.wait()
+        self._analyzers.clear()
+        self._flush()
+        self.cache.close()
+
+    def _lookupChunk(self):
+        found = {}
+        for _ in range(min(self._lookupChunkSize, len(self._lookupQueue))):
+            filePath = self._lookupQueue.popleft()
+            key = fileKey(filePath)
+            loudness = self.cache.get(key) if key else None
+            if loudness is not None:
+                self._queued.discard(filePath)
+                self._results[filePath] = loudness
+                found[filePath] = loudness
+            elif key is not None:
+                self._keys[filePath] = key
+                self._analyzeQueue.append(filePath)
+            else:
+                self._queued.discard(filePath)
+
+        if not self._lookupQueue:
+            self._lookupTimer.stop()
+        if found:
+            self.loudnessReady.emit(found)
+        self._startAnalyzers()
+
+    def _startAnalyzers(self):
+        while self._analyzeQueue and len(self._analyzers) < self.maxAnalyzers:
+            filePath = self._analyzeQueue.popleft()
+            analyzer = LoudnessAnalyzer(filePath, self)
+            analyzer.analyzed.connect(self._analyzed)
+            analyzer.finished.connect(
+                lambda analyzer=analyzer: self._analyzerFinished(analyzer))
+            self._analyzers[filePath] = analyzer
+            analyzer.start(QThread.Priority.LowPriority)
+
+    def _analyzed(self, filePath: str, loudness: Loudness):
+        self._queued.discard(filePath)
+        key = self._keys.pop(filePath, None)
+        if key is not None:
+            self.cache.put(key, loudness)
+            if not self._flushTimer.isActive():
+                self._flushTimer.start()
+        self._results[filePath] = loudness
+        self.loudnessReady.emit({filePath: loudness})
+
+    def _analyzerFinished(self, analyzer: LoudnessAnalyzer):
+        if self._analyzers.get(analyzer.filePath) is analyzer:
+            del self._analyzers[analyzer.filePath]
+            analyzer.deleteLater()
+        self._startAnalyzers()
+
+    def _flush(self):
+        self._flushTimer.stop()
+        self.cache.flush()
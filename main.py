@@ -1,12 +1,27 @@
 import sys
 import os
 import enum
-import random
-from typing import List
+from time import perf_counter
+from typing import List, Optional
 
-from PyQt6.QtCore import QDir, Qt, QUrl, QSizeF, QSize, QEvent, QObject, QPointF, pyqtSignal
-from PyQt6.QtMultimediaWidgets import QGraphicsVideoItem
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+# the startup probe measures from here, before Qt is loaded
+START_TIME = perf_counter()
+
+# pylint: disable=wrong-import-position
+
+# a second launch hands its arguments over before paying for the multimedia imports
+if __name__ == '__main__' and '--wall' not in sys.argv \
+        and not os.environ.get('VIDEOPLAYER_NEW_INSTANCE'):
+    from instance_server import forwardToRunningInstance
+    if forwardToRunningInstance(sys.argv[1:]):
+        sys.exit(0)
+
+from PyQt6.QtCore import (
+    QDir, Qt, QSizeF, QSize, QRectF, QEvent, QObject, QPoint, QPointF, QModelIndex, QTimer,
+    pyqtSignal
+)
+from PyQt6.QtMultimediaWidgets import QGraphicsVideoItem, QVideoWidget
+from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput, QVideoFrame
 from PyQt6.QtWidgets import (
     QApplication,
     QFileDialog,
@@ -20,87 +35,101 @@ from PyQt6.QtWidgets import (
     QGraphicsScene,
     QGraphicsView,
     QLabel,
+    QLineEdit,
     QComboBox,
     QGraphicsPolygonItem,
-    QListWidget,
-    QListWidgetItem,
-    QSizePolicy
+    QGraphicsItem,
+    QListView,
+    QAbstractItemView,
+    QSizePolicy,
+    QStyle,
+    QStyleOptionSlider
 )
 
-from PyQt6.QtGui import QIcon, QAction, QKeyEvent, QMouseEvent, QPolygonF, QColor
-
-STYLES_PATH = os.path.join(os.path.dirname(
-    os.path.realpath(__file__)), 'styles')
-
-ICONS_PATH = os.path.join(os.path.dirname(
-    os.path.realpath(__file__)), 'icons')
-
-
-def getStyle(fileName: str):
-    with open(os.path.join(STYLES_PATH, fileName), 'r', encoding='utf-8') as style:
-        return '\n'.join(style.readlines())
-
-
-def getIcon(fileName: str):
-    return QIcon(os.path.join(ICONS_PATH, fileName))
-
+from PyQt6.QtGui import (
+    QIcon, QAction, QKeyEvent, QMouseEvent, QPainter, QPolygonF, QColor, QImage
+)
 
-class DeleteButton(QPushButton):
-    ...
+from playlist_model import PlaylistModel, PlaylistDelegate, PlaylistFilterModel
+from media_import import MediaImporter, isPlaylistFile
+from session_store import SessionStore, getDataPath
+from media_probe import MediaProbe, MetadataCache, formatDuration
+from thumbnails import ThumbnailStore, SeekPreview
+from gapless import PlayerPool
+from shuffle import ShuffleEngine
+from search_index import SearchIndex
+from read_ahead import ReadAheadSource
+from update_scheduler import UpdateScheduler
+from playback_metrics import PlaybackMetrics, MetricsOverlay, StartupProbe
+from resources import getIcon, getStyle
+from resume_store import ResumeStore, ResumeState
+from seek_engine import SeekEngine, KeyframeCache
+from video_wall import VideoWall
+from instance_server import InstanceServer
+from render_backend import RenderBackend, optimizeScene, optimizeView
+from time_stretch import TimeStretcher, isTimeStretchAvailable
+from frame_buffer import FrameRing
+from loudness import LoudnessAnalysis, LoudnessCache, gainFor, isLoudnessAvailable
+from subtitles import SubtitleItem, Subtitles
+from scenes import SceneDetector, ChapterCache
+from idle import IdleManager
 
 
 class MinimizeButton(QPushButton):
     ...
 
 
-class VideoItem(QWidget):
-    deleted = pyqtSignal(int, name='deleted')
-    doubleClicked = pyqtSignal(QWidget)
+class PositionSlider(QSlider):
+    hovered = pyqtSignal(int, int)
+    left = pyqtSignal()
 
-    def __init__(self, item: QListWidgetItem, fileName='', parent=None) -> None:
-        super().__init__(parent)
-        self.item = item
-        self.isPlaying = False
-        self.filePath = fileName
-        self.fileName = os.path.split(fileName)[1]
-        self.layout = QHBoxLayout()
-        self.fileNameLabel = QLabel(self.fileName)
-        self.videoIconLabel = QLabel('')
-        self.videoIconLabel.setMaximumSize(20, 30)
-        self.videoIconLabel.setPixmap(VIDEO_ICON.pixmap(QSize(20, 20)))
-        self.layout.addWidget(self.videoIconLabel)
-        self.layout.addWidget(self.fileNameLabel)
-        self.deleteButton = DeleteButton('×')
-        self.deleteButton.clicked.connect(self.delete)
-        self.deleteButton.setMaximumWidth(50)
-        self.layout.addWidget(self.deleteButton)
-        self.setLayout(self.layout)
+    _markerColor = QColor(255, 255, 255, 160)
 
-    def delete(self, _):
-        listWidget = self.item.listWidget()
-        count = listWidget.count()
-        items = [listWidget.item(i) for i in range(count)]
+    def __init__(self, orientation: Qt.Orientation, parent=None) -> None:
+        super().__init__(orientation, parent)
+        self.setMouseTracking(True)
+        self.markers = []
 
-        for i, item in enumerate(items):
-            if item is self.item:
-                listWidget.takeItem(i)
-                self.deleted.emit(i)
-                break
+    def setMarkers(self, markers):
+        self.markers = markers
+        self.update()
 
-    def setIsPlaying(self, value):
-        if value:
-            self.fileNameLabel.setText('Playing...')
-            self.item.setSelected(True)
-        else:
-            self.fileNameLabel.setText(self.fileName)
-            self.item.setSelected(False)
-        self.isPlaying = value
+    def valueAt(self, x: int) -> int:
+        groove, handle = self._grooveAndHandle()
+        return QStyle.sliderValueFromPosition(
+            self.minimum(), self.maximum(), x - groove.x() - handle.width() // 2,
+            groove.width() - handle.width())
 
-    def mousePressEvent(self, _) -> None:
-        return
+    def paintEvent(self, event) -> None:
+        super().paintEvent(event)
+        if not self.markers or self.maximum() <= self.minimum():
+            return
+        groove, handle = self._grooveAndHandle()
+        painter = QPainter(self)
+        painter.setPen(self._markerColor)
+        for marker in self.markers:
+            x = groove.x() + handle.width() // 2 + QStyle.sliderPositionFromValue(
+                self.minimum(), self.maximum(), marker, groove.width() - handle.width())
+            painter.drawLine(x, groove.top(), x, groove.bottom())
+        painter.end()
+
+    def _grooveAndHandle(self) -> tuple:
+        option = QStyleOptionSlider()
+        self.initStyleOption(option)
+        groove = self.style().subControlRect(
+            QStyle.ComplexControl.CC_Slider, option, QStyle.SubControl.SC_SliderGroove, self)
+        handle = self.style().subControlRect(
+            QStyle.ComplexControl.CC_Slider, option, QStyle.SubControl.SC_SliderHandle, self)
+        return groove, handle
 
-    def mouseDoubleClickEvent(self, _) -> None:
-        self.doubleClicked.emit(self)
+    def mouseMoveEvent(self, event: QMouseEvent) -> None:
+        super().mouseMoveEvent(event)
+        x = int(event.position().x())
+        self.hovered.emit(self.valueAt(x), x)
+
+    def leaveEvent(self, event) -> None:
+        super().leaveEvent(event)
+        self.left.emit()
 
 
 class PlaylistState(enum.IntEnum):
@@ -111,9 +140,11 @@ class PlaylistState(enum.IntEnum):
 
 class PlayList(QWidget):
     _controlPanelHeight = 40
+    _indexChunkSize = 1000
     _isHidden = True
-    _currentPlaylistIndex = -1
     playRequested = pyqtSignal(str)
+    filesImported = pyqtSignal(list)
+    stateChanged = pyqtSignal(int)
 
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
@@ -124,41 +155,22 @@ class PlayList(QWidget):
         self.minimizeButton.clicked.connect(self.triggerHide)
         self.playListContent = QWidget()
         self.playListContentLayout = QVBoxLayout()
-        self.state = PlaylistState.Repeat
-
-        self.controlPanel = QWidget()
-        self.controlPanelLayout = QHBoxLayout()
-        self.controlPanel.setMaximumHeight(self._controlPanelHeight)
-        self.addButton = QPushButton(getIcon('plus.ico'), '')
-        self.addButton.setIconSize(QSize(15, 15))
-        self.addButton.clicked.connect(self.openNewFile)
-        self.controlPanelLayout.addWidget(self.addButton)
-
-        self.shuffleButton = QPushButton(getIcon('shuffle.ico'), '')
-        self.shuffleButton.setIconSize(QSize(20, 20))
-        self.repeatOneButton = QPushButton(getIcon('repeat-one.ico'), '')
-        self.repeatOneButton.setIconSize(QSize(20, 20))
-        self.repeatButton = QPushButton(getIcon('repeat.ico'), '')
-        self.repeatButton.setIconSize(QSize(20, 20))
-        self.repeatButton.setProperty('selected', True)
-
-        self.shuffleButton.clicked.connect(self.shuffleClicked)
-        self.repeatButton.clicked.connect(self.repeatClicked)
-        self.repeatOneButton.clicked.connect(self.repeatOneClicked)
-
-        self.controlPanelLayout.addWidget(self.shuffleButton)
-        self.controlPanelLayout.addWidget(self.repeatOneButton)
-        self.controlPanelLayout.addWidget(self.repeatButton)
-
-        self.controlPanel.setLayout(self.controlPanelLayout)
-
-        self.playListContentLayout.addWidget(self.controlPanel)
-        self.videoList = QListWidget()
-        self.videoList.itemSelectionChanged.connect(self.updateSelection)
-
-        self.playListContentLayout.addWidget(self.videoList)
-
         self.playListContent.setLayout(self.playListContentLayout)
+        self.state = PlaylistState.Repeat
+        self._importers = []
+        self.shuffle = ShuffleEngine()
+        # the panel starts hidden, its widgets are only built when it is first needed
+        self._isContentBuilt = False
+        self.controlPanel: Optional[QWidget] = None
+        self.controlPanelLayout: Optional[QHBoxLayout] = None
+        self.addButton: Optional[QPushButton] = None
+        self.shuffleButton: Optional[QPushButton] = None
+        self.repeatOneButton: Optional[QPushButton] = None
+        self.repeatButton: Optional[QPushButton] = None
+        self.durationLabel: Optional[QLabel] = None
+        self.searchBox: Optional[QLineEdit] = None
+        self.videoList: Optional[QListView] = None
+        self._setupModel()
 
         self.layout = QHBoxLayout()
         self.layout.setContentsMargins(0, 0, 0, 0)
@@ -171,8 +183,27 @@ class PlayList(QWidget):
         self._isHidden = not self._isHidden
         self.triggerHide()
 
+    def buildContent(self):
+        if self._isContentBuilt:
+            return
+        self._isContentBuilt = True
+        self._setupControlPanel()
+        self.playListContentLayout.addWidget(self.controlPanel)
+        self.searchBox = QLineEdit()
+        self.searchBox.setPlaceholderText('Search')
+        self.searchBox.setClearButtonEnabled(True)
+        self.searchBox.textChanged.connect(self.search)
+        self.playListContentLayout.addWidget(self.searchBox)
+        self._setupVideoList()
+        self.playListContentLayout.addWidget(self.videoList)
+        self.setState(self.state)
+        self._updateDurationLabel()
+        # the index is only worth building once the search box can be used
+        self._indexTimer.start()
+
     def triggerHide(self):
         if self._isHidden:
+            self.buildContent()
             self.playListContent.setVisible(True)
             self.minimizeButton.setText('>')
         else:
@@ -181,34 +212,23 @@ class PlayList(QWidget):
 
         self._isHidden = not self._isHidden
 
-    def updateSelection(self):
-        count = self.videoList.count()
-        videoItems = [self.videoList.itemWidget(self.videoList.item(i)) for i in range(count)]
-
-        for videoItem in videoItems:
-            if videoItem and videoItem.isPlaying:
-                videoItem.item.setSelected(True)
-
     def shuffleClicked(self):
-        self.repeatButton.setProperty('selected', False)
-        self.repeatOneButton.setProperty('selected', False)
-        self.shuffleButton.setProperty('selected', True)
-        self.updateButtonStyle()
-        self.state = PlaylistState.Shuffle
+        self.setState(PlaylistState.Shuffle)
 
     def repeatClicked(self):
-        self.repeatOneButton.setProperty('selected', False)
-        self.shuffleButton.setProperty('selected', False)
-        self.repeatButton.setProperty('selected', True)
-        self.updateButtonStyle()
-        self.state = PlaylistState.Repeat
+        self.setState(PlaylistState.Repeat)
 
     def repeatOneClicked(self):
-        self.repeatButton.setProperty('selected', False)
-        self.shuffleButton.setProperty('selected', False)
-        self.repeatOneButton.setProperty('selected', True)
-        self.updateButtonStyle()
-        self.state = PlaylistState.RepeatOne
+        self.setState(PlaylistState.RepeatOne)
+
+    def setState(self, state: PlaylistState):
+        if self._isContentBuilt:
+            self.shuffleButton.setProperty('selected', state == PlaylistState.Shuffle)
+            self.repeatOneButton.setProperty('selected', state == PlaylistState.RepeatOne)
+            self.repeatButton.setProperty('selected', state == PlaylistState.Repeat)
+            self.updateButtonStyle()
+        self.state = state
+        self.stateChanged.emit(int(state))
 
     def updateButtonStyle(self):
         self.shuffleButton.style().polish(self.shuffleButton)
@@ -216,82 +236,229 @@ class PlayList(QWidget):
         self.repeatButton.style().polish(self.repeatButton)
 
     def openNewFile(self):
-        fileName, _ = QFileDialog.getOpenFileName(
-            self, "Open File", QDir.homePath())
-        if fileName != '':
-            item = QListWidgetItem()
-            self.videoList.addItem(item)
-            videoItem = VideoItem(item, fileName)
-            videoItem.deleted.connect(self._adjustIndex)
-            videoItem.doubleClicked.connect(self.playVideoItem)
-            self.videoList.setItemWidget(item, videoItem)
-
-    def playVideoItem(self, item: VideoItem):
-        count = self.videoList.count()
-        videoItems = [self.videoList.itemWidget(
-            self.videoList.item(i)) for i in range(count)]
-
-        for i, videoItem in enumerate(videoItems):
-            if videoItem is item:
-                self.unSelectOldWidget()
-                item.setIsPlaying(True)
-                self.playRequested.emit(self.videoList.itemWidget(
-                    self.videoList.item(i)).filePath)
+        fileNames, _ = QFileDialog.getOpenFileNames(
+            self, "Open Files", QDir.homePath())
+        if fileNames:
+            self.importPaths(fileNames)
+
+    def importPaths(self, paths: List[str]):
+        importer = MediaImporter(paths, self)
+        importer.batchReady.connect(
+            lambda filePaths: self._addImportedFiles(importer, filePaths))
+        importer.finished.connect(lambda: self._importFinished(importer))
+        self._importers.append(importer)
+        importer.start()
+
+    def cancelImport(self):
+        importers = list(self._importers)
+        for importer in importers:
+            importer.cancel()
+        for importer in importers:
+            importer.wait()
+            self._importFinished(importer)
+
+    def isImporting(self):
+        return len(self._importers) > 0
+
+    def playVideoItem(self, index: QModelIndex):
+        row = self.model.rowOf(index.data(PlaylistModel.EntryIdRole))
+        self.model.setCurrentRow(row)
+        self.playRequested.emit(self.model.filePath(row))
+
+    def search(self, query: str):
+        self._query = query
+        entryIds = self.searchIndex.search(query)
+        if entryIds is None:
+            model = self.model
+            self.videoList.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        else:
+            self.filterModel.setEntryIds(entryIds)
+            model = self.filterModel
+            self.videoList.setDragDropMode(QAbstractItemView.DragDropMode.NoDragDrop)
+        if self.videoList.model() is not model:
+            self.videoList.setModel(model)
+        if entryIds is None:
+            # the hidden filter drops the last results so playlist changes do not rebuild it
+            self.filterModel.setEntryIds(set())
 
     def next(self):
-        count = self.videoList.count()
+        index = self._nextRow()
+        if index is None:
+            return None
+        if self.state == PlaylistState.Shuffle:
+            self.shuffle.next(self.model.currentEntryId())
+        self.model.setCurrentRow(index)
+        return self.model.filePath(index)
+
+    def previous(self):
+        count = self.model.rowCount()
         if count == 0:
             return None
+        if self.state == PlaylistState.Shuffle:
+            index = self.model.rowOf(self.shuffle.previous(self.model.currentEntryId()))
+            if index == -1:
+                return None
+        else:
+            index = (self.model.currentRow() - 1) % count
+        self.model.setCurrentRow(index)
+        return self.model.filePath(index)
+
+    def peekNext(self):
+        index = self._nextRow()
+        return self.model.filePath(index) if index is not None else None
 
-        videoWidgets = [self.videoList.itemWidget(
-            self.videoList.item(i)) for i in range(count)]
-        videoWidgets: List[VideoItem]
-        videos = list(map(lambda w: w.filePath, videoWidgets))
+    def count(self):
+        return self.model.rowCount()
 
-        self.unSelectOldWidget()
+    def _nextRow(self):
+        count = self.model.rowCount()
+        if count == 0:
+            return None
+
+        currentRow = self.model.currentRow()
 
         if self.state == PlaylistState.Shuffle:
-            index = random.randint(0, count - 1)
-            self.videoList.itemWidget(
-                self.videoList.item(index)).setIsPlaying(True)
-            self._currentPlaylistIndex = index
-            return videos[index]
+            return self.model.rowOf(self.shuffle.peek(self.model.currentEntryId()))
         if self.state == PlaylistState.RepeatOne:
-            if self._currentPlaylistIndex == -1:
-                self._currentPlaylistIndex = 0
-            index = self._currentPlaylistIndex % count
-            self.videoList.itemWidget(
-                self.videoList.item(index)).setIsPlaying(True)
-            return videos[index]
-        if self.state == PlaylistState.Repeat:
-            self._currentPlaylistIndex += 1
-            self._currentPlaylistIndex %= count
-            index = self._currentPlaylistIndex % count
-            self.videoList.itemWidget(
-                self.videoList.item(index)).setIsPlaying(True)
-            video = videos[index]
-
-            return video
-
-    def unSelectOldWidget(self):
-        count = self.videoList.count()
-        currentVideoItem = self.videoList.itemWidget(
-            self.videoList.item(self._currentPlaylistIndex % count))
-        currentVideoItem.setIsPlaying(False)
+            return max(currentRow, 0) % count
+        return (currentRow + 1) % count
 
-    def count(self):
-        return self.videoList.count()
+    def _setupControlPanel(self):
+        self.controlPanel = QWidget()
+        self.controlPanelLayout = QHBoxLayout()
+        self.controlPanel.setMaximumHeight(self._controlPanelHeight)
+        self.addButton = QPushButton(getIcon('plus.ico'), '')
+        self.addButton.setIconSize(QSize(15, 15))
+        self.addButton.clicked.connect(self.openNewFile)
+        self.controlPanelLayout.addWidget(self.addButton)
+
+        self.shuffleButton = QPushButton(getIcon('shuffle.ico'), '')
+        self.shuffleButton.setIconSize(QSize(20, 20))
+        self.repeatOneButton = QPushButton(getIcon('repeat-one.ico'), '')
+        self.repeatOneButton.setIconSize(QSize(20, 20))
+        self.repeatButton = QPushButton(getIcon('repeat.ico'), '')
+        self.repeatButton.setIconSize(QSize(20, 20))
+
+        self.shuffleButton.clicked.connect(self.shuffleClicked)
+        self.repeatButton.clicked.connect(self.repeatClicked)
+        self.repeatOneButton.clicked.connect(self.repeatOneClicked)
+
+        self.controlPanelLayout.addWidget(self.shuffleButton)
+        self.controlPanelLayout.addWidget(self.repeatOneButton)
+        self.controlPanelLayout.addWidget(self.repeatButton)
+
+        self.durationLabel = QLabel('')
+        self.durationLabel.setAlignment(
+            Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        self.controlPanelLayout.addWidget(self.durationLabel)
+
+        self.controlPanel.setLayout(self.controlPanelLayout)
+
+    def _setupVideoList(self):
+        self.videoList = QListView()
+        self.videoList.setModel(self.model)
+        self.videoList.setItemDelegate(PlaylistDelegate(getIcon('video.ico'), self.videoList))
+        self.videoList.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.videoList.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        self.videoList.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.videoList.setUniformItemSizes(True)
+        self.videoList.doubleClicked.connect(self.playVideoItem)
+
+    def _setupModel(self):
+        self.model = PlaylistModel(self)
+        self.mediaProbe = MediaProbe(MetadataCache(getDataPath('metadata.sqlite3')), parent=self)
+        self.mediaProbe.metadataReady.connect(self.model.setMediaInfo)
+        self.model.rowsInserted.connect(self._probeRows)
+        self.model.rowsInserted.connect(self._addShuffleEntries)
+        self.model.rowsAboutToBeRemoved.connect(self._removeShuffleEntries)
+        self.model.rowsInserted.connect(self._indexRows)
+        self.model.rowsAboutToBeRemoved.connect(self._unindexRows)
+
+        self.searchIndex = SearchIndex()
+        self.filterModel = PlaylistFilterModel(self.model, self)
+        self.mediaProbe.metadataReady.connect(self.searchIndex.setMediaInfo)
+        self._query = ''
+        # entries are indexed a chunk per event loop pass so a large playlist does not freeze
+        self._indexTimer = QTimer(self)
+        self._indexTimer.setInterval(0)
+        self._indexTimer.timeout.connect(self._indexChunk)
+
+        # the total is recounted at most a few times a second while entries stream in
+        self._durationLabelTimer = QTimer(self)
+        self._durationLabelTimer.setSingleShot(True)
+        self._durationLabelTimer.setInterval(250)
+        self._durationLabelTimer.timeout.connect(self._updateDurationLabel)
+        self.model.rowsInserted.connect(self._durationLabelTimer.start)
+        self.model.rowsRemoved.connect(self._durationLabelTimer.start)
+        self.mediaProbe.metadataReady.connect(self._durationLabelTimer.start)
+
+        self.loudness = None
+        if isLoudnessAvailable():
+            self.loudness = LoudnessAnalysis(
+                LoudnessCache(getDataPath('loudness.sqlite3')), parent=self)
+
+    def _probeRows(self, _, first: int, last: int):
+        self.mediaProbe.probe(self.model.filePath(row) for row in range(first, last + 1))
+        if self.loudness is not None:
+            self.loudness.analyze(self.model.filePath(row) for row in range(first, last + 1))
+
+    def _addShuffleEntries(self, _, first: int, last: int):
+        self.shuffle.add(self.model.entryId(row) for row in range(first, last + 1))
+
+    def _removeShuffleEntries(self, _, first: int, last: int):
+        self.shuffle.remove([self.model.entryId(row) for row in range(first, last + 1)])
+
+    def _indexRows(self, _, first: int, last: int):
+        entries = [(self.model.entryId(row), self.model.filePath(row))
+                   for row in range(first, last + 1)]
+        self.searchIndex.add(entries)
+        if self._isContentBuilt:
+            self._indexTimer.start()
+        if self._query.strip():
+            # the new rows are indexed at once, the newest pending go first, so they are judged
+            # by the same search the shown ones came from
+            self.searchIndex.indexPending(len(entries))
+            matches = self.searchIndex.search(self._query)
+            self.filterModel.addEntryIds([entryId for entryId, _ in entries if entryId in matches])
+
+    def _unindexRows(self, _, first: int, last: int):
+        self.searchIndex.remove([self.model.entryId(row) for row in range(first, last + 1)])
+
+    def _indexChunk(self):
+        if not self.searchIndex.indexPending(self._indexChunkSize):
+            self._indexTimer.stop()
+
+    def _updateDurationLabel(self):
+        if not self._isContentBuilt:
+            return
+        count = self.model.rowCount()
+        if count == 0:
+            self.durationLabel.setText('')
+            return
+        self.durationLabel.setText(
+            f'{count} · {formatDuration(self.model.totalDuration())}')
 
-    def _adjustIndex(self, index):
-        if index == self._currentPlaylistIndex:
-            self._currentPlaylistIndex = -1
-        if index > self._currentPlaylistIndex:
+    def _addImportedFiles(self, importer: MediaImporter, filePaths: List[str]):
+        # batches queued before a cancellation are dropped
+        if importer.isInterruptionRequested():
             return
+        # files already in the playlist are not added again, they are still reported as imported
+        newFilePaths = dict.fromkeys(
+            filePath for filePath in filePaths if self.model.entryIdOf(filePath) == -1)
+        self.model.addFiles(newFilePaths)
+        self.filesImported.emit(filePaths)
 
-        self._currentPlaylistIndex = max(0, self._currentPlaylistIndex - 1)
+    def _importFinished(self, importer: MediaImporter):
+        if importer in self._importers:
+            self._importers.remove(importer)
+        importer.deleteLater()
 
 
 class ControlPanel(QWidget):
+    _playbackRates = (0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 4.0)
+    minPlaybackRate = 0.1
+    maxPlaybackRate = 4.0
+
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
         self.playButton = QPushButton()
@@ -300,7 +467,7 @@ class ControlPanel(QWidget):
         self.setContentsMargins(0, 0, 0, 0)
         self.setMaximumHeight(70)
 
-        self.positionSlider = QSlider(Qt.Orientation.Horizontal)
+        self.positionSlider = PositionSlider(Qt.Orientation.Horizontal)
         self.positionSlider.setRange(0, 0)
 
         self.volumeSlider = QSlider(Qt.Orientation.Horizontal)
@@ -308,12 +475,9 @@ class ControlPanel(QWidget):
         self.volumeSlider.setMaximumWidth(100)
 
         self.playbackSpeedComboBox = QComboBox()
-        self.playbackSpeedComboBox.addItem('0.25x', 0.25)
-        self.playbackSpeedComboBox.addItem('0.5x', 0.5)
-        self.playbackSpeedComboBox.addItem('1x', 1)
-        self.playbackSpeedComboBox.addItem('1.5x', 1.5)
-        self.playbackSpeedComboBox.addItem('2x', 2)
-        self.playbackSpeedComboBox.setCurrentIndex(2)
+        for playbackRate in self._playbackRates:
+            self.playbackSpeedComboBox.addItem(f'{playbackRate:g}x', playbackRate)
+        self.playbackSpeedComboBox.setCurrentIndex(self._playbackRates.index(1.0))
 
         self.controlLayout = QHBoxLayout()
         self.controlLayout.setContentsMargins(10, 10, 10, 10)
@@ -332,6 +496,27 @@ class ControlPanel(QWidget):
 
         self.setLayout(self.controlLayout)
 
+    def playbackRate(self) -> float:
+        return self.playbackSpeedComboBox.currentData()
+
+    def setPlaybackRate(self, playbackRate: float) -> float:
+        # a rate between the presets gets an item of its own until the rate changes again
+        playbackRate = round(min(max(playbackRate, self.minPlaybackRate), self.maxPlaybackRate), 2)
+        comboBox = self.playbackSpeedComboBox
+        comboBox.blockSignals(True)
+        for index in range(comboBox.count()):
+            if comboBox.itemData(index) not in self._playbackRates:
+                comboBox.removeItem(index)
+                break
+        index = 0
+        while index < comboBox.count() and comboBox.itemData(index) < playbackRate:
+            index += 1
+        if index == comboBox.count() or comboBox.itemData(index) != playbackRate:
+            comboBox.insertItem(index, f'{playbackRate:g}x', playbackRate)
+        comboBox.setCurrentIndex(index)
+        comboBox.blockSignals(False)
+        return playbackRate
+
 
 class VideoWindow(QMainWindow):
     _rewindStep = 10_000
@@ -343,9 +528,33 @@ class VideoWindow(QMainWindow):
     _isControlPanelHidden = False
     _playlistWidth = 400
     _videoEnded = True
-
-    def __init__(self, parent=None):
+    _resumeEndMargin = 5_000
+    _preloadTime = 5_000
+    # 0 follows the refresh rate of the screen
+    _updateRate = 0
+    _hiddenUpdateRate = 10
+    _startupTimeout = 500
+    _playbackRateStep = 0.05
+    _frameBufferSize = 256 << 20
+    _targetLoudness = -18.0
+    # a measured file plays this far below the output's maximum at full volume, so a quiet
+    # one can be raised by as much as a loud one is lowered without clipping the volume,
+    # files not measured yet keep the full level
+    _maxGain = 6.0
+    _normalizedLevel = 10 ** (-_maxGain / 20)
+    _peakHeadroom = 1.0
+    # a measurement finishing later than this into the file is left for its next play
+    _lateGainPosition = 5_000
+    _gain = 1.0
+    _idleSuspendTimeout = 10_000
+    _idleReleaseTimeout = 300_000
+    _activityEvents = frozenset((QEvent.Type.KeyPress, QEvent.Type.MouseButtonPress,
+                                 QEvent.Type.MouseMove, QEvent.Type.Wheel))
+
+    def __init__(self, parent=None, renderBackend: Optional[RenderBackend] = None):
         super(VideoWindow, self).__init__(parent)
+        self.renderBackend = renderBackend or RenderBackend.fromName(
+            os.environ.get('VIDEOPLAYER_RENDER', RenderBackend.Scene.value))
         self.setContentsMargins(0, 0, 0, 0)
         self.setWindowTitle("Видеоплеер Лёхи")
         self.isFullScreen = False
@@ -355,43 +564,118 @@ class VideoWindow(QMainWindow):
         centralWidget = QWidget()
 
         self.controlPanel = ControlPanel()
+        self.updateScheduler = UpdateScheduler(self._hiddenUpdateRate, self)
         self.controlPanel.playButton.clicked.connect(self.triggerPlay)
         self.controlPanel.positionSlider.sliderReleased.connect(
             self._updateVideoPosition)
         self.setCentralWidget(centralWidget)
 
+        self.idle = self._createIdleManager()
+        # the file and the state a released decoder is loaded again with
+        self._released = None
+        self._isRestoring = False
         self._setupMediaPlayer()
         self._setupPlayIcon()
 
         self.playListWidget = PlayList(self)
         self.playListWidget.setMinimumWidth(self._playlistWidth)
         self.playListWidget.playRequested.connect(self.playFromFile)
+        self.playListWidget.filesImported.connect(self._filesImported)
+        self._playWhenImported = False
+        self._importedCurrentFile = ''
+        # files are measured by the playlist, their gain is applied here when they play
+        self.loudness = self.playListWidget.loudness
+        if self.loudness is not None:
+            self.loudness.loudnessReady.connect(self._loudnessReady)
+
+        self.sessionStore = SessionStore(getDataPath('session.sqlite3'), self)
+        self.sessionStore.attachModel(self.playListWidget.model)
+        self.playListWidget.stateChanged.connect(
+            lambda state: self.sessionStore.setValue('playlistState', state))
+        self.resumeStore = ResumeStore(getDataPath('resume.sqlite3'), self)
+        self._resumeState = ResumeState()
+        # of the file playing, taken once on load so position ticks do no file system access
+        self._fingerprint: Optional[str] = None
+
+        self.thumbnails = ThumbnailStore(getDataPath('thumbnails'), self)
+        self.scenes = SceneDetector(ChapterCache(getDataPath('chapters.sqlite3')), self)
+        self.scenes.chaptersChanged.connect(self._chaptersChanged)
+        self._setupSeekPreview()
         self.triggerControlPanel()
 
         self.layout = QVBoxLayout()
         self.layout.setSpacing(0)
         self.layout.setContentsMargins(0, 0, 0, 0)
-        self.layout.addWidget(self.graphicsView)
+        self.layout.addWidget(self.videoView)
         self.layout.addWidget(self.controlPanel)
 
         centralWidget.setLayout(self.layout)
-        self.setStyleSheet(getStyle('main.qss'))
         self._resizeVideoItem()
 
+        # the rest of the window is styled and built once the first frame is out
+        self._isStartupFinished = False
+        self.videoSink.videoFrameChanged.connect(self._finishStartup)
+        QTimer.singleShot(self._startupTimeout, self._finishStartup)
+
     def openFile(self):
         fileName, _ = QFileDialog.getOpenFileName(
             self, "Open Movie", QDir.homePath())
         if fileName != '':
             self.playFromFile(fileName)
 
+    def openFolder(self):
+        directory = QFileDialog.getExistingDirectory(
+            self, "Open Folder", QDir.homePath())
+        if directory != '':
+            self.playListWidget.importPaths([directory])
+
+    def openPaths(self, paths: List[str]):
+        # a file is started right away instead of after the import
+        if os.path.isfile(paths[0]) and not isPlaylistFile(paths[0]):
+            self._importedCurrentFile = os.path.abspath(paths[0])
+            self.playFromFile(self._importedCurrentFile)
+        else:
+            self._playWhenImported = True
+        self.playListWidget.importPaths(paths)
+
+    def loadFile(self, fileName: str):
+        if self._released is not None:
+            # the file opened instead is loaded over the released one
+            self._released = ('', ResumeState())
+        self.idle.activity()
+        self._unloadFile()
+        self.playerPool.load(self.mediaPlayer, fileName)
+        self._fileLoaded(fileName)
+        self._resumeState = self.resumeStore.stateOf(self._fingerprint)
+
     def playFromFile(self, fileName: str):
-        self.mediaPlayer.setSource(QUrl.fromLocalFile(fileName))
-        self.setWindowTitle(fileName)
+        self.loadFile(fileName)
         self.play()
 
+    def restoreSession(self, restoreSource=True):
+        store = self.sessionStore
+        self.playListWidget.setState(
+            PlaylistState(store.value('playlistState', PlaylistState.Repeat)))
+        self.controlPanel.volumeSlider.setValue(store.value('volume', 100))
+        self._setPlaybackRate(store.value('playbackRate', 1))
+
+        store.restoreEntries()
+        # files given on the command line decide the current entry themselves
+        if restoreSource:
+            self.playListWidget.model.setCurrentEntryId(store.value('currentEntryId', -1))
+        currentFile = store.value('currentFile')
+        if restoreSource and currentFile and os.path.isfile(currentFile):
+            self.loadFile(currentFile)
+
     def triggerControlPanel(self):
         self.controlPanel.setVisible(self._isControlPanelHidden)
         self._isControlPanelHidden = not self._isControlPanelHidden
+        if self._isControlPanelHidden:
+            self.updateScheduler.setRate(self._hiddenUpdateRate)
+        else:
+            self.updateScheduler.setRate(self._updateRate or self.screen().refreshRate())
+            # the slider is not kept up to date while it can not be seen
+            self._updateSlider()
         self._resizeVideoItem()
         self.playListWidget.move(
             self.size().width() - self.playListWidget.width(), 0)
@@ -418,9 +702,14 @@ class VideoWindow(QMainWindow):
             self.play()
 
     def play(self):
+        self.idle.activity()
         if self.mediaPlayer.source().fileName() == '' and self.playListWidget.count() > 0:
             self._playNextFromPlaylist()
 
+        # the decoder is ahead of a frame stepped back to from the ring
+        if self.frameRing.isStepping():
+            self.mediaPlayer.setPosition(self.frameRing.position())
+            self.frameRing.clear()
         if self.mediaPlayer.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
             self.mediaPlayer.play()
 
@@ -428,6 +717,20 @@ class VideoWindow(QMainWindow):
         if self.mediaPlayer.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
             self.mediaPlayer.pause()
 
+    def stepFrame(self, forward: bool):
+        self.pause()
+        position = self.frameRing.stepForward() if forward else self.frameRing.stepBack()
+        if position == -1:
+            # past either end of the ring the decoder seeks to the frame, exactly and at once
+            current = self.mediaPlayer.position()
+            position = self.frameRing.nextPosition(current) if forward \
+                else self.frameRing.previousPosition(current)
+            self.frameRing.clear()
+            self.playbackMetrics.seekStarted()
+            self.mediaPlayer.setPosition(position)
+        self.controlPanel.positionSlider.setValue(position)
+        self.subtitles.update(position)
+
     def contextMenuEvent(self, event) -> None:
         contextMenu = QMenu()
 
@@ -436,6 +739,14 @@ class VideoWindow(QMainWindow):
         openAction.setStatusTip('Open video')
         openAction.triggered.connect(self.openFile)
 
+        openFolderAction = QAction('Open &Folder', self)
+        openFolderAction.setStatusTip('Add a folder to the playlist')
+        openFolderAction.triggered.connect(self.openFolder)
+
+        cancelImportAction = QAction('&Cancel Import', self)
+        cancelImportAction.setEnabled(self.playListWidget.isImporting())
+        cancelImportAction.triggered.connect(self.playListWidget.cancelImport)
+
         exitAction = QAction('&Exit', self)
         exitAction.setStatusTip('Quit application')
         exitAction.triggered.connect(self._exit)
@@ -447,11 +758,29 @@ class VideoWindow(QMainWindow):
         fullscreenAction.triggered.connect(self.triggerFullScreen)
 
         contextMenu.addAction(openAction)
+        contextMenu.addAction(openFolderAction)
+        contextMenu.addAction(cancelImportAction)
         contextMenu.addAction(fullscreenAction)
         contextMenu.addAction(exitAction)
 
         contextMenu.exec(self.mapToGlobal(event.pos()))
 
+    def closeEvent(self, event) -> None:
+        self.playListWidget.cancelImport()
+        self.playListWidget.mediaProbe.close()
+        if self.loudness is not None:
+            self.loudness.close()
+        self.sessionStore.flush()
+        self.resumeStore.flush()
+        self.seekEngine.close()
+        self.subtitles.close()
+        self.scenes.close()
+        if self.readAhead is not None:
+            self.readAhead.close()
+        if self.timeStretch is not None:
+            self.timeStretch.close()
+        super().closeEvent(event)
+
     def resizeEvent(self, _) -> None:
         self._resizeVideoItem()
         self.playListWidget.move(
@@ -462,9 +791,11 @@ class VideoWindow(QMainWindow):
             self.playListWidget.width(), int(self.scene.height()))
 
     def setVolume(self, volume: int):
-        self.audioOutput.setVolume(volume / 100)
+        # the slider sets the level, the gain of the file evens out its loudness on top
+        self.audioOutput.setVolume(min(volume / 100 * self._gain, 1))
+        self.sessionStore.setValue('volume', volume)
 
-    def keyPressEvent(self, event: QKeyEvent) -> None:
+    def keyPressEvent(self, event: QKeyEvent) -> None:  # pylint: disable=too-many-branches
         key = event.keyCombination().key()
 
         match key:
@@ -473,23 +804,24 @@ class VideoWindow(QMainWindow):
                 self.triggerPlay()
             # rewind backward
             case Qt.Key.Key_J:
-                self.mediaPlayer.setPosition(
-                    max(self.mediaPlayer.position() - self._rewindStep, 0))
+                self.seekEngine.seek(self.seekEngine.position() - self._rewindStep)
             # rewind forward
             case Qt.Key.Key_L:
-                self.mediaPlayer.setPosition(
-                    min(self.mediaPlayer.position()
-                        + self._rewindStep, self.mediaPlayer.duration()))
+                self.seekEngine.seek(self.seekEngine.position() + self._rewindStep)
             # reduce playback speed
             case Qt.Key.Key_Comma:
-                currentIndex = self.controlPanel.playbackSpeedComboBox.currentIndex()
-                self.controlPanel.playbackSpeedComboBox.setCurrentIndex(
-                    max(currentIndex - 1, 0))
+                self._setPlaybackRate(
+                    self.controlPanel.playbackRate() - self._playbackRateStep)
             # increase playback speed
             case Qt.Key.Key_Period:
-                currentIndex = self.controlPanel.playbackSpeedComboBox.currentIndex()
-                self.controlPanel.playbackSpeedComboBox.setCurrentIndex(
-                    min(currentIndex + 1, self.controlPanel.playbackSpeedComboBox.count() - 1))
+                self._setPlaybackRate(
+                    self.controlPanel.playbackRate() + self._playbackRateStep)
+            # previous frame
+            case Qt.Key.Key_BracketLeft:
+                self.stepFrame(forward=False)
+            # next frame
+            case Qt.Key.Key_BracketRight:
+                self.stepFrame(forward=True)
             # trigger fullscreen
             case Qt.Key.Key_F:
                 self.triggerFullScreen()
@@ -506,54 +838,168 @@ class VideoWindow(QMainWindow):
             # open file
             case Qt.Key.Key_O:
                 self.openFile()
+            # show playback metrics
+            case Qt.Key.Key_M:
+                self.metricsOverlay.toggle()
+            # next chapter
+            case Qt.Key.Key_N:
+                position = self.scenes.nextChapter(self.seekEngine.position())
+                if position != -1:
+                    self.seekEngine.seek(position)
+            # previous chapter
+            case Qt.Key.Key_P:
+                position = self.scenes.previousChapter(self.seekEngine.position())
+                if position != -1:
+                    self.seekEngine.seek(position)
+            # previous file
+            case Qt.Key.Key_PageUp:
+                self._playPreviousFromPlaylist()
+            # next file
+            case Qt.Key.Key_PageDown:
+                self._playNextFromPlaylist()
 
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
         position = event.scenePosition()
         positionY = self.size().height() - position.y()
+        isInRange = positionY <= self.controlPanel.size().height() + self._controlPanelTriggerRange
 
-        if positionY > self.controlPanel.size().height() + self._controlPanelTriggerRange \
-                and not self._isControlPanelHidden:
-            self.triggerControlPanel()
-        elif positionY <= self.controlPanel.size().height() + self._controlPanelTriggerRange \
-                and self._isControlPanelHidden:
-            self.triggerControlPanel()
+        if isInRange == self._isControlPanelHidden:
+            self.updateScheduler.schedule(
+                'controlPanel', self._setControlPanelVisible, isInRange)
+        else:
+            self.updateScheduler.cancel('controlPanel')
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
         if event.button() == Qt.MouseButton.LeftButton:
             self.triggerPlay()
 
     def eventFilter(self, obj: QObject, event: QEvent) -> bool:
-        if isinstance(event, QMouseEvent):
-            if obj is self.windowHandle():
-                self.mouseMoveEvent(event)
+        # only mouse moves over the window can show or hide the control panel
+        if event.type() == QEvent.Type.MouseMove and obj is self.windowHandle():
+            self.mouseMoveEvent(event)
+        if event.type() in self._activityEvents:
+            self.idle.activity()
         return False
 
     def _setupPlayIcon(self):
         self.playIcon = QGraphicsPolygonItem()
         self.playIcon.setPen(Qt.GlobalColor.transparent)
         self.playIcon.setBrush(self._playIconColor)
+        # the icon is redrawn from a cached pixmap instead of rasterizing the polygon
+        self.playIcon.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
         self.scene.addItem(self.playIcon)
+        # subtitles found next to the file are drawn over the video like the icon
+        self.subtitleItem = SubtitleItem()
+        self.scene.addItem(self.subtitleItem)
+        self.subtitles = Subtitles(self.subtitleItem, self)
 
     def _updateVideoPosition(self):
-        self.mediaPlayer.setPosition(self.controlPanel.positionSlider.value())
+        self.seekEngine.seek(self.controlPanel.positionSlider.value(), coarse=True)
 
     def _exit(self):
-        sys.exit(1)
-
-    def _playbackStateChanged(self, _):
-        if self.mediaPlayer.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+        # the teardown lives in closeEvent, the last window closing ends the application
+        self.close()
+
+    def _playbackStateChanged(self, state: QMediaPlayer.PlaybackState):
+        playing = state == QMediaPlayer.PlaybackState.PlayingState
+        # thumbnails and scene detection decode at a reduced rate while a file plays
+        self.thumbnails.setPlaybackActive(playing)
+        self.scenes.setPlaybackActive(playing)
+        self.idle.setPlaying(playing)
+        if playing:
             self.playIcon.setVisible(False)
             self.controlPanel.playButton.setIcon(self.pauseIcon)
-        elif self.mediaPlayer.playbackState() == QMediaPlayer.PlaybackState.PausedState:
+        else:
             self.playIcon.setVisible(True)
             self.controlPanel.playButton.setIcon(self.miniPlayIcon)
-        else:
-            self._playNextFromPlaylist()
 
     def _positionChanged(self, position):
-        self.controlPanel.positionSlider.setValue(position)
+        if not self._isControlPanelHidden:
+            self.updateScheduler.schedule('slider', self._updateSlider)
+        if self.mediaPlayer.source().isEmpty():
+            return
+        self.subtitles.update(position)
+        fileName = self.mediaPlayer.source().toLocalFile()
+        self.resumeStore.setPosition(self._fingerprint, position)
+        if 0 < self.mediaPlayer.duration() - position <= self._preloadTime:
+            self._preloadNext(fileName)
+
+    def _preloadNext(self, fileName: str):
+        nextVideo = self.playListWidget.peekNext()
+        if nextVideo is None or nextVideo in (fileName, self.playerPool.preloadedSource()):
+            return
+        self.playerPool.preload(nextVideo, self.resumeStore.state(nextVideo).position)
+
+    def _chaptersChanged(self, filePath: str, chapters):
+        if filePath == self.mediaPlayer.source().toLocalFile():
+            self.controlPanel.positionSlider.setMarkers(chapters)
+
+    def _setupSeekPreview(self):
+        self.seekPreview = SeekPreview(self)
+        self.controlPanel.positionSlider.hovered.connect(self._showSeekPreview)
+        self.controlPanel.positionSlider.left.connect(self.seekPreview.hide)
+
+    def _showSeekPreview(self, position: int, x: int):
+        slider = self.controlPanel.positionSlider
+        if self.mediaPlayer.source().isEmpty() or slider.maximum() == 0:
+            return
+        image = self.thumbnails.thumbnail(self.mediaPlayer.source().toLocalFile(), position)
+        self.seekPreview.showPreview(image, position, slider.mapTo(self, QPoint(x, 0)))
+
+    def _finishStartup(self, *_):
+        if self._isStartupFinished:
+            return
+        self._isStartupFinished = True
+        self.videoSink.videoFrameChanged.disconnect(self._finishStartup)
+        self.setStyleSheet(getStyle('main.qss'))
+        if not self.mediaPlayer.source().isEmpty():
+            self.thumbnails.prepare(self.mediaPlayer.source().toLocalFile())
+            self.scenes.prepare(self.mediaPlayer.source().toLocalFile())
+        QTimer.singleShot(0, self.playListWidget.buildContent)
+
+    def _mediaStatusChanged(self, status):
+        # thumbnail sampling would compete with the first frame for the decoder
+        if status == QMediaPlayer.MediaStatus.LoadedMedia and self._isStartupFinished:
+            self.thumbnails.prepare(self.mediaPlayer.source().toLocalFile())
+            self.scenes.prepare(self.mediaPlayer.source().toLocalFile())
+        if status == QMediaPlayer.MediaStatus.LoadedMedia:
+            self._applyResumeState(self._resumeState)
+            self._resumeState = ResumeState()
+            # a restored file is paused on the frame it was released at
+            if self._isRestoring and \
+                    self.mediaPlayer.playbackState() == QMediaPlayer.PlaybackState.StoppedState:
+                self.mediaPlayer.pause()
+            self._isRestoring = False
+        elif status == QMediaPlayer.MediaStatus.EndOfMedia:
+            # a finished file starts from the beginning next time
+            self.resumeStore.setPosition(self._fingerprint, 0)
+            # only the end of a file moves on, loading another one stops the player as well
+            self._playNextFromPlaylist()
+
+    def _applyResumeState(self, state: ResumeState):
+        if 0 < state.position < self.mediaPlayer.duration() - self._resumeEndMargin:
+            self.mediaPlayer.setPosition(state.position)
+        if 0 <= state.audioTrack < len(self.mediaPlayer.audioTracks()):
+            self.mediaPlayer.setActiveAudioTrack(state.audioTrack)
+        if state.rate is not None:
+            self._setPlaybackRate(state.rate)
+
+    def _setPlaybackRate(self, playbackRate: float):
+        playbackRate = self.controlPanel.setPlaybackRate(float(playbackRate))
+        self.mediaPlayer.setPlaybackRate(playbackRate)
+        if self.timeStretch is not None:
+            self.timeStretch.setRate(playbackRate)
+        self.sessionStore.setValue('playbackRate', playbackRate)
+        if not self.mediaPlayer.source().isEmpty():
+            self.resumeStore.setRate(self._fingerprint, playbackRate)
 
     def _playNextFromPlaylist(self):
+        preloaded = self.playerPool.preloadedSource()
+        if preloaded and preloaded == self.playListWidget.peekNext():
+            self.playListWidget.next()
+            self._swapPlayer()
+            return
+
         nextVideo = self.playListWidget.next()
         if nextVideo is not None:
             if nextVideo == self.mediaPlayer.source().path():
@@ -562,12 +1008,165 @@ class VideoWindow(QMainWindow):
             else:
                 self.playFromFile(nextVideo)
 
-    def _durationChanged(self, duration):
-        self.controlPanel.positionSlider.setRange(0, duration)
+    def _playPreviousFromPlaylist(self):
+        previousVideo = self.playListWidget.previous()
+        if previousVideo is not None:
+            self.playFromFile(previousVideo)
+
+    def _swapPlayer(self):
+        self._unloadFile()
+        self._detachPlayer(self.mediaPlayer)
+        self.mediaPlayer = self.playerPool.swap()
+        self._attachPlayer(self.mediaPlayer)
+        self.mediaPlayer.play()
+
+        fileName = self.mediaPlayer.source().toLocalFile()
+        self._fileLoaded(fileName)
+        # the standby player was already moved to the stored position
+        self._applyResumeState(self.resumeStore.stateOf(self._fingerprint)._replace(position=0))
+        self._durationChanged(self.mediaPlayer.duration())
+        self.thumbnails.prepare(fileName)
+        self.scenes.prepare(fileName)
+
+    def _unloadFile(self):
+        # the outgoing file keeps where it was left, what its player reports while it is
+        # stopped and replaced is not stored until the next file has its fingerprint
+        if not self.mediaPlayer.source().isEmpty() and \
+                self.mediaPlayer.mediaStatus() != QMediaPlayer.MediaStatus.EndOfMedia:
+            position = self.frameRing.position() if self.frameRing.isStepping() \
+                else self.mediaPlayer.position()
+            self.resumeStore.setPosition(self._fingerprint, position)
+        self._fingerprint = None
+
+    def _fileLoaded(self, fileName: str):
+        self.setWindowTitle(fileName)
+        self._fingerprint = self.resumeStore.fingerprint(fileName)
+        self.frameRing.clear()
+        self.seekEngine.setFile(fileName)
+        self.subtitles.load(fileName)
+        self.controlPanel.positionSlider.setMarkers(
+            self.scenes.chapters if self.scenes.filePath == fileName else [])
+        nextVideo = self.playListWidget.peekNext()
+        if self.readAhead is not None and nextVideo not in (None, fileName):
+            self.readAhead.prefetch(nextVideo)
+        self.sessionStore.setValue('currentFile', fileName)
+        self.sessionStore.setValue(
+            'currentEntryId', self.playListWidget.model.currentEntryId())
+        if self.loudness is not None:
+            self.loudness.analyze(
+                [path for path in (fileName, nextVideo) if path], urgent=True)
+            self._applyLoudness(self.loudness.result(fileName))
+
+    def _applyLoudness(self, loudness):
+        self._gain = self._normalizedLevel * gainFor(
+            loudness, self._targetLoudness, self._maxGain, self._peakHeadroom) \
+            if loudness is not None and loudness.integrated is not None else 1.0
+        self.setVolume(self.controlPanel.volumeSlider.value())
+
+    def _loudnessReady(self, results: dict):
+        fileName = self.mediaPlayer.source().toLocalFile()
+        if fileName in results and self.mediaPlayer.position() < self._lateGainPosition:
+            self._applyLoudness(results[fileName])
+
+    def _idleSuspendedChanged(self, suspended: bool):
+        # frames still reach the sink, nothing in the scene asks to be drawn
+        self.videoItem.setVisible(not suspended)
+        self.videoView.setUpdatesEnabled(not suspended)
+
+    def _idleReleasedChanged(self, released: bool):
+        if released:
+            self._releaseDecoder()
+        else:
+            self._restoreDecoder()
+
+    def _releaseDecoder(self):
+        if self.mediaPlayer.source().isEmpty():
+            return
+        started = perf_counter()
+        # the last frame stays on screen while the decoder is away
+        still = self.videoSink.videoFrame().toImage() \
+            if self.isVisible() and not self.isMinimized() else QImage()
+        position = self.frameRing.position() if self.frameRing.isStepping() \
+            else self.mediaPlayer.position()
+        self._released = (self.mediaPlayer.source().toLocalFile(), ResumeState(
+            position=position, audioTrack=self.mediaPlayer.activeAudioTrack()))
+        # the player is detached so its stopped state does not move on to the next file
+        self._detachPlayer(self.mediaPlayer)
+        self.playerPool.release()
+        self.frameRing.clear()
+        self.thumbnails.release()
+        self.scenes.release()
+        if not still.isNull():
+            self.videoSink.setVideoFrame(QVideoFrame(still))
+        self.playbackMetrics.releaseLatency.observe((perf_counter() - started) * 1000)
+
+    def _restoreDecoder(self):
+        if self._released is None:
+            return
+        (fileName, state), self._released = self._released, None
+        self._attachPlayer(self.mediaPlayer)
+        if fileName:
+            self.playbackMetrics.restoreStarted()
+            self._resumeState = state
+            self._isRestoring = True
+            self.playerPool.load(self.mediaPlayer, fileName)
+
+    def _attachPlayer(self, player: QMediaPlayer):
+        self.playbackMetrics.setPlayer(player)
+        self.seekEngine.setPlayer(player)
+        player.playbackStateChanged.connect(self._playbackStateChanged)
+        player.positionChanged.connect(self._positionChanged)
+        player.durationChanged.connect(self._durationChanged)
+        player.mediaStatusChanged.connect(self._mediaStatusChanged)
+        player.activeTracksChanged.connect(self._activeTracksChanged)
+
+    def _detachPlayer(self, player: QMediaPlayer):
+        player.playbackStateChanged.disconnect(self._playbackStateChanged)
+        player.positionChanged.disconnect(self._positionChanged)
+        player.durationChanged.disconnect(self._durationChanged)
+        player.mediaStatusChanged.disconnect(self._mediaStatusChanged)
+        player.activeTracksChanged.disconnect(self._activeTracksChanged)
+
+    def _bufferFillChanged(self, player: QMediaPlayer, level: float):
+        if player is self.mediaPlayer:
+            self.playbackMetrics.bufferFill = level
+
+    def _activeTracksChanged(self):
+        if not self.mediaPlayer.source().isEmpty():
+            self.resumeStore.setAudioTrack(self._fingerprint, self.mediaPlayer.activeAudioTrack())
+
+    def _filesImported(self, filePaths: List[str]):
+        if self._importedCurrentFile in filePaths:
+            self._setCurrentFile(self._importedCurrentFile)
+            self._importedCurrentFile = ''
+        if self._playWhenImported and filePaths:
+            self._playWhenImported = False
+            # the import starts from its own first file, not after a restored current entry
+            if self.mediaPlayer.source().isEmpty():
+                self._setCurrentFile(filePaths[0])
+                self.playFromFile(filePaths[0])
+
+    def _setCurrentFile(self, filePath: str):
+        model = self.playListWidget.model
+        model.setCurrentEntryId(model.entryIdOf(filePath))
+        self.sessionStore.setValue('currentEntryId', model.currentEntryId())
+
+    def _durationChanged(self, _):
+        self.updateScheduler.schedule('slider', self._updateSlider)
+
+    def _updateSlider(self):
+        # the player is read when the update runs so only the latest state is drawn
+        slider = self.controlPanel.positionSlider
+        slider.setRange(0, self.mediaPlayer.duration())
+        if not slider.isSliderDown():
+            slider.setValue(self.mediaPlayer.position())
+
+    def _setControlPanelVisible(self, visible: bool):
+        if visible == self._isControlPanelHidden:
+            self.triggerControlPanel()
 
     def _playbackSpeedChanged(self, index):
-        self.mediaPlayer.setPlaybackRate(
-            self.controlPanel.playbackSpeedComboBox.itemData(index))
+        self._setPlaybackRate(self.controlPanel.playbackSpeedComboBox.itemData(index))
 
     def _resizeVideoItem(self):
         height = self.size().height() - self.controlPanel.height() * \
@@ -587,6 +1186,7 @@ class VideoWindow(QMainWindow):
             ))
 
         self.videoItem.setSize(size)
+        self.subtitleItem.setArea(QRectF(0, 0, size.width(), size.height()))
         self.scene.setSceneRect(0, 0, size.width(), size.height())
 
     def _stopIfNeed(self):
@@ -594,7 +1194,6 @@ class VideoWindow(QMainWindow):
             self.triggerPlay()
 
     def _setupMediaPlayer(self):
-        self.mediaPlayer = QMediaPlayer()
         self.setMinimumHeight(300)
 
         self.scene = QGraphicsScene(self)
@@ -606,10 +1205,47 @@ class VideoWindow(QMainWindow):
         self.graphicsView.setHorizontalScrollBarPolicy(
             Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
 
+        optimizeScene(self.scene)
+        optimizeView(self.graphicsView, self.renderBackend == RenderBackend.OpenGL)
+
         self.videoItem = QGraphicsVideoItem()
         self.scene.addItem(self.videoItem)
+        # without overlays the video widget skips the scene and draws the frames directly
+        if self.renderBackend == RenderBackend.Widget:
+            self.videoWidget = QVideoWidget()
+            self.videoView, videoOutput = self.videoWidget, self.videoWidget
+        else:
+            self.videoView, videoOutput = self.graphicsView, self.videoItem
+        self.videoSink = videoOutput.videoSink()
         self.audioOutput = QAudioOutput()
         self.audioOutput.setVolume(1)
+        # the window always drives the pool's current player, the standby one preloads
+        self.playerPool = PlayerPool(self.audioOutput, videoOutput, self)
+        self.mediaPlayer = self.playerPool.current
+        # slow disks and network mounts are read through a buffer ahead of the decoder
+        self.readAhead = None
+        readAheadSize = int(os.environ.get('VIDEOPLAYER_READ_AHEAD', 0))
+        if readAheadSize > 0:
+            self.readAhead = ReadAheadSource(readAheadSize << 20, self)
+            self.playerPool.readAhead = self.readAhead
+        # away from 1x the audio is time stretched here instead of by the backend
+        self.timeStretch = None
+        if isTimeStretchAvailable():
+            self.timeStretch = TimeStretcher(self.audioOutput, self)
+            self.timeStretch.setPlayer(self.mediaPlayer)
+            self.playerPool.timeStretch = self.timeStretch
+        self.playbackMetrics = PlaybackMetrics(self.videoSink, self)
+        self.metricsOverlay = MetricsOverlay(self.playbackMetrics)
+        self.scene.addItem(self.metricsOverlay)
+        # recently presented frames for stepping back, capped in MiB
+        frameBufferSize = int(os.environ.get('VIDEOPLAYER_FRAME_BUFFER', 0)) << 20
+        self.frameRing = FrameRing(self.videoSink, frameBufferSize or self._frameBufferSize, self)
+        self.seekEngine = SeekEngine(KeyframeCache(getDataPath('keyframes.sqlite3')), self)
+        self.seekEngine.seekIssued.connect(lambda _: self.playbackMetrics.seekStarted())
+        # a seek leaves the stepped to frame, the decoder's next one is shown again
+        self.seekEngine.seekIssued.connect(lambda _: self.frameRing.clear())
+        if self.readAhead is not None:
+            self.readAhead.fillLevelChanged.connect(self._bufferFillChanged)
         self.controlPanel.positionSlider.sliderPressed.connect(
             self._stopIfNeed)
 
@@ -620,24 +1256,47 @@ class VideoWindow(QMainWindow):
         self.controlPanel.playbackSpeedComboBox.currentIndexChanged.connect(
             self._playbackSpeedChanged)
 
-        self.mediaPlayer.setAudioOutput(self.audioOutput)
-        self.mediaPlayer.setVideoOutput(self.videoItem)
-        self.mediaPlayer.playbackStateChanged.connect(
-            self._playbackStateChanged)
-        self.mediaPlayer.positionChanged.connect(self._positionChanged)
-        self.mediaPlayer.durationChanged.connect(self._durationChanged)
+        self._attachPlayer(self.mediaPlayer)
+
+    def _createIdleManager(self) -> IdleManager:
+        # timeouts in seconds, 0 turns a stage off
+        suspendTimeout = os.environ.get('VIDEOPLAYER_IDLE_SUSPEND')
+        releaseTimeout = os.environ.get('VIDEOPLAYER_IDLE_RELEASE')
+        idle = IdleManager(
+            self._idleSuspendTimeout if suspendTimeout is None else int(suspendTimeout) * 1000,
+            self._idleReleaseTimeout if releaseTimeout is None else int(releaseTimeout) * 1000,
+            self)
+        idle.watch(self)
+        idle.suspendedChanged.connect(self._idleSuspendedChanged)
+        idle.releasedChanged.connect(self._idleReleasedChanged)
+        return idle
+
 
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
+    app.setApplicationName('VideoPlayer')
+    # --wall N plays the given files on N tiles of a single window
+    if len(sys.argv) > 2 and sys.argv[1] == '--wall' and sys.argv[2].isdigit():
+        wall = VideoWall(int(sys.argv[2]))
+        wall.resize(1280, 720)
+        wall.show()
+        wall.openPaths(sys.argv[3:])
+        sys.exit(app.exec())
+
     player = VideoWindow()
     player.resize(640, 480)
+    if os.environ.get('VIDEOPLAYER_STARTUP_PROBE'):
+        startupProbe = StartupProbe(START_TIME, player, player.videoSink,
+                                    expectFrame=len(sys.argv) > 1)
     player.show()
+    # the files on the command line start decoding before the session is restored
     if len(sys.argv) > 1:
-        FILE_PATH = sys.argv[1]
-        if os.path.exists(FILE_PATH) and os.path.isfile(FILE_PATH):
-            player.playFromFile(FILE_PATH)
+        player.openPaths(sys.argv[1:])
+    player.restoreSession(restoreSource=len(sys.argv) <= 1)
+    instanceServer = InstanceServer(player)
     app.installEventFilter(player)
-    VIDEO_ICON = getIcon('video.ico')
+    if os.environ.get('VIDEOPLAYER_METRICS'):
+        player.playbackMetrics.startExport(os.environ['VIDEOPLAYER_METRICS'])
 
     sys.exit(app.exec())
@@ -0,0 +1,144 @@
+import os
+import glob
+from time import monotonic
+from typing import Callable, Iterable, Iterator
+from urllib.parse import unquote, urlparse
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+MEDIA_EXTENSIONS = frozenset((
+    '.3gp', '.aac', '.avi', '.flac', '.flv', '.m2ts', '.m4a', '.m4v', '.mkv', '.mov',
+    '.mp3', '.mp4', '.mpeg', '.mpg', '.mts', '.ogg', '.ogv', '.opus', '.ts', '.wav',
+    '.webm', '.wma', '.wmv'
+))
+
+PLAYLIST_EXTENSIONS = frozenset(('.m3u', '.m3u8', '.pls'))
+
+
+def isMediaFile(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in MEDIA_EXTENSIONS
+
+
+def isPlaylistFile(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in PLAYLIST_EXTENSIONS
+
+
+def readPlaylistFile(path: str) -> Iterator[str]:
+    baseDir = os.path.dirname(os.path.abspath(path))
+    isPls = path.lower().endswith('.pls')
+    # m3u8 is always utf-8, plain m3u usually is in practice too
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as playlist:
+        for line in playlist:
+            line = line.strip()
+            if isPls:
+                key, _, value = line.partition('=')
+                if not key.lower().startswith('file'):
+                    continue
+                line = value.strip()
+            elif line.startswith('#'):
+                continue
+
+            entry = _playlistEntryPath(line, baseDir)
+            if entry:
+                yield entry
+
+
+def iterMediaFiles(sources: Iterable[str],
+                   isCancelled: Callable[[], bool] = lambda: False) -> Iterator[str]:
+    for source in sources:
+        if isCancelled():
+            return
+
+        if glob.has_magic(source):
+            paths = sorted(glob.iglob(os.path.expanduser(source), recursive=True))
+        else:
+            paths = [source]
+
+        for path in paths:
+            if os.path.isdir(path):
+                yield from _walkDirectory(path, isCancelled)
+            elif isPlaylistFile(path) and os.path.isfile(path):
+                yield from _readPlaylistMedia(path, isCancelled)
+            elif os.path.isfile(path) and (path == source or isMediaFile(path)):
+                # a file passed explicitly is trusted whatever its extension is
+                yield os.path.abspath(path)
+
+
+class MediaImporter(QThread):
+    batchReady = pyqtSignal(list)
+    _batchSize = 256
+    _batchInterval = 0.1
+
+    def __init__(self, sources: Iterable[str], parent=None) -> None:
+        super().__init__(parent)
+        self.sources = list(sources)
+
+    def run(self) -> None:
+        batch = []
+        lastEmit = monotonic()
+
+        for path in iterMediaFiles(self.sources, self.isInterruptionRequested):
+            batch.append(path)
+            if len(batch) >= self._batchSize or monotonic() - lastEmit >= self._batchInterval:
+                self.batchReady.emit(batch)
+                batch = []
+                lastEmit = monotonic()
+
+        if batch and not self.isInterruptionRequested():
+            self.batchReady.emit(batch)
+
+    def cancel(self):
+        self.requestInterruption()
+
+
+def _playlistEntryPath(entry: str, baseDir: str) -> str:
+    if not entry:
+        return ''
+    if '://' in entry:
+        url = urlparse(entry)
+        # only local files can be played through the playlist
+        if url.scheme != 'file':
+            return ''
+        entry = unquote(url.path)
+    return os.path.normpath(os.path.join(baseDir, entry))
+
+
+def _readPlaylistMedia(path: str, isCancelled: Callable[[], bool]) -> Iterator[str]:
+    try:
+        for entry in readPlaylistFile(path):
+            if isCancelled():
+                return
+            if os.path.isdir(entry):
+                yield from _walkDirectory(entry, isCancelled)
+            # missing files and nested playlists are left out, like in a folder
+            elif isMediaFile(entry) and os.path.isfile(entry):
+                yield entry
+    except OSError:
+        return
+
+
+def _walkDirectory(path: str, isCancelled: Callable[[], bool]) -> Iterator[str]:
+    directories = [os.path.abspath(path)]
+
+    while directories:
+        if isCancelled():
+            return
+
+        directory = directories.pop()
+        try:
+            with os.scandir(directory) as scanner:
+                entries = sorted(scanner, key=lambda entry: entry.name.lower())
+        except OSError:
+            continue
+
+        subDirectories = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subDirectories.append(entry.path)
+                elif entry.is_file() and isMediaFile(entry.name):
+                    yield entry.path
+            except OSError:
+                continue
+
+        directories.extend(reversed(subDirectories))
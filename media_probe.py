@@ -0,0 +1,247 @@
+import os
+import sqlite3
+from collections import deque
+from typing import Callable, NamedTuple, Optional
+
+from PyQt6.QtCore import QObject, QTimer, QUrl, QSize, pyqtSignal
+from PyQt6.QtMultimedia import QMediaPlayer, QMediaMetaData, QMediaFormat
+
+
+class MediaInfo(NamedTuple):
+    duration: int = 0
+    width: int = 0
+    height: int = 0
+    videoCodec: str = ''
+    audioCodec: str = ''
+    bitRate: int = 0
+
+
+def fileKey(path: str) -> Optional[tuple[str, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def formatDuration(duration: int) -> str:
+    seconds = duration // 1000
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f'{hours}:{minutes:02}:{seconds:02}'
+    return f'{minutes}:{seconds:02}'
+
+
+def formatMediaInfo(info: MediaInfo) -> str:
+    details = []
+    if info.duration:
+        details.append(formatDuration(info.duration))
+    if info.width and info.height:
+        details.append(f'{info.width}×{info.height}')
+    codecs = '/'.join(codec for codec in (info.videoCodec, info.audioCodec) if codec)
+    if codecs:
+        details.append(codecs)
+    if info.bitRate:
+        details.append(f'{info.bitRate // 1000} kb/s')
+    return ' · '.join(details)
+
+
+class MetadataCache:
+    def __init__(self, path: str) -> None:
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript('''
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS metadata (
+                path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, duration INTEGER,
+                width INTEGER, height INTEGER, videoCodec TEXT, audioCodec TEXT,
+                bitRate INTEGER);
+        ''')
+        self._pending = []
+
+    def get(self, key: tuple[str, int, int]) -> Optional[MediaInfo]:
+        row = self._connection.execute(
+            'SELECT duration, width, height, videoCodec, audioCodec, bitRate FROM metadata '
+            'WHERE path = ? AND mtime = ? AND size = ?', key).fetchone()
+        return MediaInfo(*row) if row else None
+
+    def put(self, key: tuple[str, int, int], info: MediaInfo):
+        self._pending.append(key + tuple(info))
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                self._pending)
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+
+class MediaPlayerProber(QObject):
+    finished = pyqtSignal(str, object)
+    _timeout = 10_000
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.filePath = ''
+        # no outputs are attached, the player only demuxes the headers
+        self.player = QMediaPlayer(self)
+        self.player.mediaStatusChanged.connect(self._mediaStatusChanged)
+        self._timeoutTimer = QTimer(self)
+        self._timeoutTimer.setSingleShot(True)
+        self._timeoutTimer.setInterval(self._timeout)
+        self._timeoutTimer.timeout.connect(lambda: self._finish(None))
+
+    def probe(self, filePath: str):
+        self.filePath = filePath
+        self._timeoutTimer.start()
+        self.player.setSource(QUrl.fromLocalFile(filePath))
+
+    def _mediaStatusChanged(self, status):
+        if status in (QMediaPlayer.MediaStatus.LoadedMedia,
+                      QMediaPlayer.MediaStatus.BufferedMedia):
+            self._finish(self._readMediaInfo())
+        elif status == QMediaPlayer.MediaStatus.InvalidMedia:
+            # an empty result marks a file that can not be read, a timeout gives no result
+            self._finish(MediaInfo())
+
+    def _readMediaInfo(self) -> MediaInfo:
+        metaData = self.player.metaData()
+        resolution = metaData.value(QMediaMetaData.Key.Resolution)
+        if not isinstance(resolution, QSize):
+            resolution = QSize()
+        bitRate = sum(value for value in (metaData.value(QMediaMetaData.Key.VideoBitRate),
+                                          metaData.value(QMediaMetaData.Key.AudioBitRate))
+                      if isinstance(value, int))
+        return MediaInfo(
+            duration=metaData.value(QMediaMetaData.Key.Duration) or self.player.duration(),
+            width=resolution.width(),
+            height=resolution.height(),
+            videoCodec=_codecName(metaData.value(QMediaMetaData.Key.VideoCodec),
+                                  QMediaFormat.videoCodecName),
+            audioCodec=_codecName(metaData.value(QMediaMetaData.Key.AudioCodec),
+                                  QMediaFormat.audioCodecName),
+            bitRate=bitRate)
+
+    def _finish(self, info: Optional[MediaInfo]):
+        if not self.filePath:
+            return
+        self._timeoutTimer.stop()
+        filePath = self.filePath
+        self.filePath = ''
+        self.player.setSource(QUrl())
+        self.finished.emit(filePath, info)
+
+
+class MediaProbe(QObject):
+    metadataReady = pyqtSignal(dict)
+    _maxProbers = 4
+    _lookupChunkSize = 200
+    _flushInterval = 2000
+
+    def __init__(self, cache: MetadataCache,
+                 proberFactory: Callable[[QObject], QObject] = MediaPlayerProber,
+                 parent=None) -> None:
+        super().__init__(parent)
+        self.cache = cache
+        self._proberFactory = proberFactory
+        self._idleProbers = []
+        self._proberCount = 0
+        self._results = {}
+        self._queued = set()
+        # paths are first checked against the cache, only misses reach the probers
+        self._lookupQueue = deque()
+        self._probeQueue = deque()
+        self._keys = {}
+
+        self._lookupTimer = QTimer(self)
+        self._lookupTimer.timeout.connect(self._lookupChunk)
+        self._flushTimer = QTimer(self)
+        self._flushTimer.setInterval(self._flushInterval)
+        self._flushTimer.timeout.connect(self._flush)
+
+    def probe(self, filePaths):
+        for filePath in filePaths:
+            if filePath not in self._results and filePath not in self._queued:
+                self._queued.add(filePath)
+                self._lookupQueue.append(filePath)
+        if self._lookupQueue and not self._lookupTimer.isActive():
+            self._lookupTimer.start(0)
+
+    def close(self):
+        self._lookupTimer.stop()
+        self._lookupQueue.clear()
+        self._probeQueue.clear()
+        self._flush()
+        self.cache.close()
+
+    def _lookupChunk(self):
+        found = {}
+        for _ in range(min(self._lookupChunkSize, len(self._lookupQueue))):
+            filePath = self._lookupQueue.popleft()
+            key = fileKey(filePath)
+            info = self.cache.get(key) if key else None
+            if info is not None:
+                self._queued.discard(filePath)
+                self._results[filePath] = info
+                found[filePath] = info
+            elif key is not None:
+                self._keys[filePath] = key
+                self._probeQueue.append(filePath)
+            else:
+                self._queued.discard(filePath)
+
+        if not self._lookupQueue:
+            self._lookupTimer.stop()
+        if found:
+            self.metadataReady.emit(found)
+        self._startProbes()
+
+    def _startProbes(self):
+        while self._probeQueue:
+            if self._idleProbers:
+                prober = self._idleProbers.pop()
+            elif self._proberCount < self._maxProbers:
+                prober = self._proberFactory(self)
+                prober.finished.connect(
+                    lambda filePath, info, prober=prober: self._probeFinished(
+                        prober, filePath, info))
+                self._proberCount += 1
+            else:
+                return
+            prober.probe(self._probeQueue.popleft())
+
+    def _probeFinished(self, prober: QObject, filePath: str, info: Optional[MediaInfo]):
+        self._idleProbers.append(prober)
+        self._queued.discard(filePath)
+        key = self._keys.pop(filePath, None)
+        # a timed out file may sit on a slow mount, it is left to be probed again later
+        if info is None:
+            self._startProbes()
+            return
+        # unreadable files are cached as empty so they are not probed again
+        if key is not None:
+            self.cache.put(key, info)
+            if not self._flushTimer.isActive():
+                self._flushTimer.start()
+        self._results[filePath] = info
+        self.metadataReady.emit({filePath: info})
+        self._startProbes()
+
+    def _flush(self):
+        self._flushTimer.stop()
+        self.cache.flush()
+
+
+def _codecName(codec, nameFunction) -> str:
+    if codec is None:
+        return ''
+    try:
+        return nameFunction(codec)
+    except TypeError:
+        return str(codec)
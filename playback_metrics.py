@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+from bisect import bisect_left
+from typing import Optional
+
+from PyQt6.QtCore import QObject, QEvent, QTimer, QUrl
+from PyQt6.QtGui import QColor, QBrush, QFont
+from PyQt6.QtMultimedia import QMediaPlayer, QVideoSink, QVideoFrame
+from PyQt6.QtWidgets import QGraphicsSimpleTextItem, QGraphicsItem, QWidget
+
+
+class Histogram:
+    bounds = (1, 2, 4, 8, 16, 33, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        # the upper bound of the bucket the quantile falls into
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return float('inf')
+
+    def toDict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'buckets': dict(zip(map(str, self.bounds + ('+Inf',)), self.counts))
+        }
+
+    def prometheusLines(self, name: str) -> list:
+        lines = [f'# TYPE {name} histogram']
+        cumulative = 0
+        for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum {self.sum:.3f}')
+        lines.append(f'{name}_count {self.count}')
+        return lines
+
+
+class PlaybackMetrics(QObject):
+    # a frame arriving this much later than the nominal frame time counts as a drop
+    _dropFactor = 1.5
+    _metricPrefix = 'videoplayer'
+
+    def __init__(self, videoSink: QVideoSink, parent=None) -> None:
+        super().__init__(parent)
+        self.player: Optional[QMediaPlayer] = None
+        self.jitter = Histogram()
+        self.seekLatency = Histogram()
+        self.timeToFirstFrame = Histogram()
+        self.stallDuration = Histogram()
+        # an idle window giving its decoder back and getting a frame on screen again
+        self.releaseLatency = Histogram()
+        self.restoreLatency = Histogram()
+        self.frames = 0
+        self.droppedFrames = 0
+        self.stalls = 0
+        self.lastTimeToFirstFrame = 0.0
+        self.lastSeekLatency = 0.0
+        # share of the read-ahead buffer that is filled, -1 without read-ahead
+        self.bufferFill = -1.0
+
+        self._lastWallTime = 0.0
+        self._lastFrameTime = -1
+        self._frameDuration = 0
+        self._loadStarted = 0.0
+        self._seekStarted = 0.0
+        self._stallStarted = 0.0
+        self._restoreStarted = 0.0
+        self._exportPath = ''
+        self._exportTimer = QTimer(self)
+        self._exportTimer.timeout.connect(self.export)
+        videoSink.videoFrameChanged.connect(self._videoFrameChanged)
+
+    def setPlayer(self, player: QMediaPlayer):
+        if self.player is not None:
+            self.player.sourceChanged.disconnect(self._sourceChanged)
+            self.player.playbackStateChanged.disconnect(self._playbackStateChanged)
+            self.player.mediaStatusChanged.disconnect(self._mediaStatusChanged)
+        self.player = player
+        player.sourceChanged.connect(self._sourceChanged)
+        player.playbackStateChanged.connect(self._playbackStateChanged)
+        player.mediaStatusChanged.connect(self._mediaStatusChanged)
+        # a swapped in player was loaded in advance, its first frame is still measured
+        self._sourceChanged(player.source())
+
+    def seekStarted(self):
+        self._seekStarted = time.perf_counter()
+        self._resetContinuity()
+
+    def restoreStarted(self):
+        self._restoreStarted = time.perf_counter()
+
+    def startExport(self, path: str, interval: int = 10_000):
+        self._exportPath = path
+        self._exportTimer.start(interval)
+
+    def snapshot(self) -> dict:
+        return {
+            'time': time.time(),
+            'frames': self.frames,
+            'droppedFrames': self.droppedFrames,
+            'stalls': self.stalls,
+            'lastTimeToFirstFrameMs': round(self.lastTimeToFirstFrame, 3),
+            'lastSeekLatencyMs': round(self.lastSeekLatency, 3),
+            'bufferFill': self.bufferFill,
+            'jitterMs': self.jitter.toDict(),
+            'seekLatencyMs': self.seekLatency.toDict(),
+            'timeToFirstFrameMs': self.timeToFirstFrame.toDict(),
+            'stallDurationMs': self.stallDuration.toDict(),
+            'releaseLatencyMs': self.releaseLatency.toDict(),
+            'restoreLatencyMs': self.restoreLatency.toDict()
+        }
+
+    def prometheusText(self) -> str:
+        prefix = self._metricPrefix
+        lines = []
+        for name, value in (('frames_total', self.frames),
+                            ('dropped_frames_total', self.droppedFrames),
+                            ('stalls_total', self.stalls)):
+            lines += [f'# TYPE {prefix}_{name} counter', f'{prefix}_{name} {value}']
+        lines += [f'# TYPE {prefix}_last_time_to_first_frame_ms gauge',
+                  f'{prefix}_last_time_to_first_frame_ms {self.lastTimeToFirstFrame:.3f}',
+                  f'# TYPE {prefix}_buffer_fill gauge',
+                  f'{prefix}_buffer_fill {self.bufferFill:.2f}']
+        for name, histogram in (('frame_jitter_ms', self.jitter),
+                                ('seek_latency_ms', self.seekLatency),
+                                ('time_to_first_frame_ms', self.timeToFirstFrame),
+                                ('stall_duration_ms', self.stallDuration),
+                                ('release_latency_ms', self.releaseLatency),
+                                ('restore_latency_ms', self.restoreLatency)):
+            lines += histogram.prometheusLines(f'{prefix}_{name}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str = ''):
+        path = path or self._exportPath
+        if not path:
+            return
+        # .prom files are rewritten for a node exporter, anything else is appended to
+        if path.endswith('.prom'):
+            temporaryPath = path + '.tmp'
+            with open(temporaryPath, 'w', encoding='utf-8') as file:
+                file.write(self.prometheusText())
+            os.replace(temporaryPath, path)
+        else:
+            with open(path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(self.snapshot()) + '\n')
+
+    def _sourceChanged(self, source: QUrl):
+        self._loadStarted = 0.0 if source.isEmpty() else time.perf_counter()
+        self._resetContinuity()
+
+    def _resetContinuity(self):
+        self._lastFrameTime = -1
+
+    def _playbackStateChanged(self, state):
+        if state != QMediaPlayer.PlaybackState.PlayingState:
+            self._resetContinuity()
+
+    def _mediaStatusChanged(self, status):
+        if status in (QMediaPlayer.MediaStatus.StalledMedia,
+                      QMediaPlayer.MediaStatus.BufferingMedia):
+            if not self._stallStarted and self._lastFrameTime != -1:
+                self.stalls += 1
+                self._stallStarted = time.perf_counter()
+        elif self._stallStarted:
+            self.stallDuration.observe((time.perf_counter() - self._stallStarted) * 1000)
+            self._stallStarted = 0.0
+
+    def _videoFrameChanged(self, frame: QVideoFrame):
+        # this runs for every presented frame, so it only does arithmetic
+        now = time.perf_counter()
+        frameTime = frame.startTime()
+        if frameTime < 0:
+            return
+        self.frames += 1
+
+        if self._restoreStarted:
+            # the reload of a released file is not a start of playback
+            self.restoreLatency.observe((now - self._restoreStarted) * 1000)
+            self._restoreStarted = 0.0
+            self._loadStarted = 0.0
+        if self._loadStarted:
+            self.lastTimeToFirstFrame = (now - self._loadStarted) * 1000
+            self.timeToFirstFrame.observe(self.lastTimeToFirstFrame)
+            self._loadStarted = 0.0
+        if self._seekStarted:
+            self.lastSeekLatency = (now - self._seekStarted) * 1000
+            self.seekLatency.observe(self.lastSeekLatency)
+            self._seekStarted = 0.0
+
+        frameDuration = frame.endTime() - frameTime
+        if frameDuration > 0:
+            self._frameDuration = frameDuration
+        playing = self.player is not None \
+            and self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+        if playing and self._lastFrameTime != -1 and frameTime > self._lastFrameTime:
+            rate = self.player.playbackRate() or 1
+            # timestamps are in microseconds, the histograms in milliseconds
+            expected = (frameTime - self._lastFrameTime) / rate / 1000
+            self.jitter.observe(abs((now - self._lastWallTime) * 1000 - expected))
+            if self._frameDuration:
+                skipped = (frameTime - self._lastFrameTime) / self._frameDuration
+                if skipped >= self._dropFactor:
+                    self.droppedFrames += round(skipped) - 1
+        self._lastFrameTime = frameTime if playing else -1
+        self._lastWallTime = now
+
+
+class MetricsOverlay(QGraphicsSimpleTextItem):
+    _refreshInterval = 500
+
+    def __init__(self, metrics: PlaybackMetrics, parent=None) -> None:
+        super().__init__(parent)
+        self.metrics = metrics
+        self.setBrush(QBrush(QColor(255, 255, 0)))
+        self.setFont(QFont('monospace', 9))
+        self.setPos(10, 10)
+        self.setZValue(10)
+        # the text only changes twice a second, painting reuses the cached pixmap
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIgnoresTransformations)
+        self._refreshTimer = QTimer()
+        self._refreshTimer.setInterval(self._refreshInterval)
+        self._refreshTimer.timeout.connect(self.refresh)
+        self.setVisible(False)
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+        if self.isVisible():
+            self.refresh()
+            self._refreshTimer.start()
+        else:
+            self._refreshTimer.stop()
+
+    def refresh(self):
+        metrics = self.metrics
+        jitter = metrics.jitter
+        lines = [
+            f'frames {metrics.frames}  dropped {metrics.droppedFrames}  '
+            f'stalls {metrics.stalls}',
+            f'jitter p50 {jitter.quantile(0.5):g} ms  p99 {jitter.quantile(0.99):g} ms',
+            f'seek {metrics.lastSeekLatency:.0f} ms  '
+            f'p90 {metrics.seekLatency.quantile(0.9):g} ms',
+            f'first frame {metrics.lastTimeToFirstFrame:.0f} ms']
+        if metrics.bufferFill >= 0:
+            lines.append(f'buffer {metrics.bufferFill:.0%}')
+        self.setText('\n'.join(lines))
+
+
+class StartupProbe(QObject):
+    _timeout = 10_000
+
+    def __init__(self, startTime: float, window: QWidget, videoSink: QVideoSink,
+                 expectFrame: bool, parent=None) -> None:
+        super().__init__(parent)
+        self.startTime = startTime
+        self.expectFrame = expectFrame
+        self.timeToWindow = None
+        self.timeToFirstFrame = None
+        self._isReported = False
+        self._videoSink = videoSink
+        window.installEventFilter(self)
+        videoSink.videoFrameChanged.connect(self._videoFrameChanged)
+        QTimer.singleShot(self._timeout, self.report)
+
+    def eventFilter(self, obj: QObject, event: QEvent) -> bool:
+        if event.type() == QEvent.Type.Paint and self.timeToWindow is None:
+            self.timeToWindow = (time.perf_counter() - self.startTime) * 1000
+            obj.removeEventFilter(self)
+            if not self.expectFrame or self.timeToFirstFrame is not None:
+                self.report()
+        return False
+
+    def report(self):
+        if self._isReported:
+            return
+        self._isReported = True
+        self._videoSink.videoFrameChanged.disconnect(self._videoFrameChanged)
+        print(json.dumps({'timeToWindowMs': _rounded(self.timeToWindow),
+                          'timeToFirstFrameMs': _rounded(self.timeToFirstFrame)}),
+              file=sys.stderr)
+
+    def _videoFrameChanged(self, frame: QVideoFrame):
+        if not frame.isValid() or self.timeToFirstFrame is not None:
+            return
+        self.timeToFirstFrame = (time.perf_counter() - self.startTime) * 1000
+        if self.timeToWindow is not None:
+            self.report()
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
@@ -0,0 +1,445 @@
+import os
+from bisect import bisect_left, bisect_right
+from typing import Iterable
+
+from PyQt6.QtCore import (
+    Qt, QAbstractListModel, QAbstractProxyModel, QModelIndex, QSize, QRect, QEvent, QPoint
+)
+from PyQt6.QtGui import QIcon, QColor, QFont, QMouseEvent
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyle, QStyleOptionViewItem
+
+from media_probe import MediaInfo, formatMediaInfo
+
+
+class _Block(list):
+    __slots__ = ('start',)
+
+    def __init__(self, ids=(), start=0) -> None:
+        super().__init__(ids)
+        self.start = start
+
+
+# ids are kept in bounded blocks, every id knows its block and every block knows
+# its first row, so an insert/remove/move only touches one block and the block starts
+class EntryIndex:
+
+    _blockSize = 512
+
+    def __init__(self) -> None:
+        self._blocks: list[_Block] = []
+        self._starts: list[int] = []
+        self._blockOf: dict[int, _Block] = {}
+
+    def __len__(self) -> int:
+        if not self._blocks:
+            return 0
+        return self._blocks[-1].start + len(self._blocks[-1])
+
+    def __contains__(self, entryId: int) -> bool:
+        return entryId in self._blockOf
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    def idAt(self, row: int) -> int:
+        block = self._blocks[bisect_right(self._starts, row) - 1]
+        return block[row - block.start]
+
+    def rowOf(self, entryId: int) -> int:
+        block = self._blockOf.get(entryId)
+        if block is None:
+            return -1
+        return block.start + block.index(entryId)
+
+    def insert(self, row: int, entryIds: list[int]):
+        if not entryIds:
+            return
+
+        if row == len(self):
+            blockNumber = len(self._blocks) - 1
+        else:
+            blockNumber = bisect_right(self._starts, row) - 1
+
+        if blockNumber < 0:
+            block = _Block()
+            self._blocks.append(block)
+            blockNumber = 0
+        else:
+            block = self._blocks[blockNumber]
+
+        offset = row - block.start
+        block[offset:offset] = entryIds
+        for entryId in entryIds:
+            self._blockOf[entryId] = block
+
+        if len(block) > self._blockSize * 2:
+            self._splitBlock(blockNumber)
+        self._updateStarts(blockNumber)
+
+    def remove(self, row: int, count: int = 1) -> list[int]:
+        removed = []
+        blockNumber = bisect_right(self._starts, row) - 1
+        firstChanged = blockNumber
+
+        while count > 0:
+            block = self._blocks[blockNumber]
+            offset = row - block.start
+            taken = block[offset:offset + count]
+            del block[offset:offset + count]
+            for entryId in taken:
+                del self._blockOf[entryId]
+            removed.extend(taken)
+            count -= len(taken)
+            row += len(taken)
+            if block:
+                blockNumber += 1
+            else:
+                del self._blocks[blockNumber]
+
+        self._updateStarts(firstChanged)
+        return removed
+
+    def _splitBlock(self, blockNumber: int):
+        block = self._blocks[blockNumber]
+        parts = [_Block(block[i:i + self._blockSize])
+                 for i in range(self._blockSize, len(block), self._blockSize)]
+        del block[self._blockSize:]
+        for part in parts:
+            for entryId in part:
+                self._blockOf[entryId] = part
+        self._blocks[blockNumber + 1:blockNumber + 1] = parts
+
+    def _updateStarts(self, blockNumber: int):
+        blockNumber = max(blockNumber, 0)
+        start = 0
+        if blockNumber > 0:
+            previous = self._blocks[blockNumber - 1]
+            start = previous.start + len(previous)
+
+        del self._starts[blockNumber:]
+        for block in self._blocks[blockNumber:]:
+            block.start = start
+            self._starts.append(start)
+            start += len(block)
+
+
+class PlaylistModel(QAbstractListModel):
+    FilePathRole = Qt.ItemDataRole.UserRole + 1
+    IsPlayingRole = Qt.ItemDataRole.UserRole + 2
+    EntryIdRole = Qt.ItemDataRole.UserRole + 3
+    MediaInfoRole = Qt.ItemDataRole.UserRole + 4
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        # only the path is stored per entry, everything else is derived on paint
+        self._filePaths: dict[int, str] = {}
+        # the first entry of every path, so a file opened again is found instead of added
+        self._entryIdsByPath: dict[str, int] = {}
+        self._entries = EntryIndex()
+        self._nextEntryId = 0
+        self._currentEntryId = -1
+        self._mediaInfo: dict[str, MediaInfo] = {}
+        self._totalDuration = None
+        self.rowsInserted.connect(self._invalidateTotalDuration)
+        self.rowsRemoved.connect(self._invalidateTotalDuration)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._entries)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        entryId = self._entries.idAt(index.row())
+        match role:
+            case Qt.ItemDataRole.DisplayRole:
+                if entryId == self._currentEntryId:
+                    return 'Playing...'
+                return os.path.basename(self._filePaths[entryId])
+            case Qt.ItemDataRole.ToolTipRole | self.FilePathRole:
+                return self._filePaths[entryId]
+            case self.IsPlayingRole:
+                return entryId == self._currentEntryId
+            case self.EntryIdRole:
+                return entryId
+            case self.MediaInfoRole:
+                return self._mediaInfo.get(self._filePaths[entryId])
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.ItemFlag.ItemIsDropEnabled
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable \
+            | Qt.ItemFlag.ItemIsDragEnabled | Qt.ItemFlag.ItemNeverHasChildren
+
+    def supportedDropActions(self) -> Qt.DropAction:
+        return Qt.DropAction.MoveAction
+
+    def addFiles(self, filePaths: Iterable[str]) -> list[int]:
+        filePaths = list(filePaths)
+        entryIds = range(self._nextEntryId, self._nextEntryId + len(filePaths))
+        self.addEntries(zip(entryIds, filePaths))
+        return list(entryIds)
+
+    def addEntries(self, entries: Iterable[tuple[int, str]]):
+        entries = list(entries)
+        if not entries:
+            return
+
+        entryIds = [entryId for entryId, _ in entries]
+        self._nextEntryId = max(self._nextEntryId, max(entryIds) + 1)
+
+        first = len(self._entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self._filePaths.update(entries)
+        for entryId, filePath in entries:
+            self._entryIdsByPath.setdefault(filePath, entryId)
+        self._entries.insert(first, entryIds)
+        self.endInsertRows()
+
+    def reserveEntryIds(self, nextEntryId: int):
+        self._nextEntryId = max(self._nextEntryId, nextEntryId)
+
+    def removeRows(self, row: int, count: int, parent=QModelIndex()) -> bool:
+        if parent.isValid() or row < 0 or count <= 0 or row + count > len(self._entries):
+            return False
+
+        self.beginRemoveRows(parent, row, row + count - 1)
+        for entryId in self._entries.remove(row, count):
+            filePath = self._filePaths.pop(entryId)
+            if self._entryIdsByPath.get(filePath) == entryId:
+                del self._entryIdsByPath[filePath]
+            if entryId == self._currentEntryId:
+                self._currentEntryId = -1
+        self.endRemoveRows()
+        return True
+
+    def moveRows(self, sourceParent: QModelIndex, sourceRow: int, count: int,
+                 destinationParent: QModelIndex, destinationChild: int) -> bool:
+        if sourceParent.isValid() or destinationParent.isValid() or count <= 0 \
+                or sourceRow < 0 or sourceRow + count > len(self._entries) \
+                or sourceRow <= destinationChild <= sourceRow + count:
+            return False
+
+        if not self.beginMoveRows(sourceParent, sourceRow, sourceRow + count - 1,
+                                  destinationParent, destinationChild):
+            return False
+        entryIds = self._entries.remove(sourceRow, count)
+        if destinationChild > sourceRow:
+            destinationChild -= count
+        self._entries.insert(destinationChild, entryIds)
+        self.endMoveRows()
+        return True
+
+    def filePath(self, row: int) -> str:
+        return self._filePaths[self._entries.idAt(row)]
+
+    def entryIdOf(self, filePath: str) -> int:
+        return self._entryIdsByPath.get(filePath, -1)
+
+    def entryId(self, row: int) -> int:
+        return self._entries.idAt(row)
+
+    def entryIds(self):
+        return iter(self._entries)
+
+    def rowOf(self, entryId: int) -> int:
+        return self._entries.rowOf(entryId)
+
+    def currentRow(self) -> int:
+        if self._currentEntryId == -1:
+            return -1
+        return self._entries.rowOf(self._currentEntryId)
+
+    def setMediaInfo(self, mediaInfo: dict[str, MediaInfo]):
+        self._mediaInfo.update(mediaInfo)
+        self._totalDuration = None
+        if len(self._entries) > 0:
+            self.dataChanged.emit(self.index(0), self.index(len(self._entries) - 1),
+                                  [self.MediaInfoRole])
+
+    def totalDuration(self) -> int:
+        # summed over the probe results once and kept until the entries or results change
+        if self._totalDuration is None:
+            self._totalDuration = sum(
+                self._mediaInfo[filePath].duration for filePath in self._filePaths.values()
+                if filePath in self._mediaInfo)
+        return self._totalDuration
+
+    def currentEntryId(self) -> int:
+        return self._currentEntryId
+
+    def setCurrentRow(self, row: int):
+        self.setCurrentEntryId(self._entries.idAt(row) if 0 <= row < len(self._entries) else -1)
+
+    def setCurrentEntryId(self, entryId: int):
+        # the entry may not be loaded yet, it is highlighted once it is added
+        oldRow = self.currentRow()
+        self._currentEntryId = entryId
+        for changedRow in (oldRow, self.currentRow()):
+            if 0 <= changedRow < len(self._entries):
+                changedIndex = self.index(changedRow)
+                self.dataChanged.emit(changedIndex, changedIndex)
+
+    def _invalidateTotalDuration(self):
+        self._totalDuration = None
+
+
+class PlaylistFilterModel(QAbstractProxyModel):
+    # shows the entries of a search, in playlist order
+    _lookupFactor = 16
+
+    def __init__(self, model: PlaylistModel, parent=None) -> None:
+        super().__init__(parent)
+        self._entryIds = set()
+        self._rows: list[int] = []
+        self.setSourceModel(model)
+        model.rowsRemoved.connect(self._refresh)
+        model.rowsMoved.connect(self._refresh)
+        model.modelReset.connect(self._refresh)
+        model.dataChanged.connect(self._sourceDataChanged)
+
+    def setEntryIds(self, entryIds: set):
+        self.beginResetModel()
+        self._entryIds = entryIds
+        model = self.sourceModel()
+        # a few matches are looked up, many are picked up in one pass over the playlist
+        if len(entryIds) * self._lookupFactor < model.rowCount():
+            self._rows = sorted(row for row in map(model.rowOf, entryIds) if row != -1)
+        else:
+            self._rows = [row for row, entryId in enumerate(model.entryIds())
+                          if entryId in entryIds]
+        self.endResetModel()
+
+    def addEntryIds(self, entryIds: list[int]):
+        # entries are only ever added at the end of the playlist, so they are appended here too
+        rows = sorted(self.sourceModel().rowOf(entryId) for entryId in entryIds)
+        if not rows:
+            return
+        self._entryIds.update(entryIds)
+        self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+        self._rows += rows
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else 1
+
+    def index(self, row: int, column: int, parent=QModelIndex()) -> QModelIndex:
+        if parent.isValid() or column != 0 or not 0 <= row < len(self._rows):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, *_) -> QModelIndex:
+        return QModelIndex()
+
+    def mapToSource(self, proxyIndex: QModelIndex) -> QModelIndex:
+        if not proxyIndex.isValid() or proxyIndex.row() >= len(self._rows):
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxyIndex.row()])
+
+    def mapFromSource(self, sourceIndex: QModelIndex) -> QModelIndex:
+        if not sourceIndex.isValid():
+            return QModelIndex()
+        row = bisect_left(self._rows, sourceIndex.row())
+        if row == len(self._rows) or self._rows[row] != sourceIndex.row():
+            return QModelIndex()
+        return self.createIndex(row, 0)
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        # a filtered view has gaps, so rows are not moved from it
+        return super().flags(index) & ~Qt.ItemFlag.ItemIsDragEnabled
+
+    def removeRows(self, row: int, count: int, parent=QModelIndex()) -> bool:
+        if parent.isValid() or row < 0 or count <= 0 or row + count > len(self._rows):
+            return False
+        for sourceRow in reversed(self._rows[row:row + count]):
+            self.sourceModel().removeRows(sourceRow, 1)
+        return True
+
+    def _refresh(self):
+        # without a search there is nothing to map, and nothing to rebuild on every change
+        if self._entryIds:
+            self.setEntryIds(self._entryIds)
+
+    def _sourceDataChanged(self, topLeft: QModelIndex, bottomRight: QModelIndex, roles=()):
+        first = bisect_left(self._rows, topLeft.row())
+        last = bisect_right(self._rows, bottomRight.row()) - 1
+        if first <= last:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, 0), roles)
+
+
+class PlaylistDelegate(QStyledItemDelegate):
+    _rowHeight = 80
+    _iconSize = 20
+    _deleteButtonWidth = 50
+    _deleteButtonFontSize = 30
+    _deleteButtonColor = QColor(207, 207, 207)
+    _deleteButtonHoverColor = QColor(255, 255, 255)
+
+    def __init__(self, icon: QIcon, parent=None) -> None:
+        super().__init__(parent)
+        self.icon = icon
+
+    def paint(self, painter, option: QStyleOptionViewItem, index: QModelIndex) -> None:
+        option = QStyleOptionViewItem(option)
+        self.initStyleOption(option, index)
+        option.icon = self.icon
+        option.features |= QStyleOptionViewItem.ViewItemFeature.HasDecoration
+        option.decorationSize = QSize(self._iconSize, self._iconSize)
+        mediaInfo = index.data(PlaylistModel.MediaInfoRole)
+        if mediaInfo:
+            # a line separator, the item view style draws a plain newline as a space
+            option.text = f'{option.text}\u2028{formatMediaInfo(mediaInfo)}'
+        # the view selection only drives drag and drop, the playing row is highlighted instead
+        if index.data(PlaylistModel.IsPlayingRole):
+            option.state |= QStyle.StateFlag.State_Selected
+        else:
+            option.state &= ~QStyle.StateFlag.State_Selected
+
+        buttonRect = self._deleteButtonRect(option.rect)
+        option.rect.setRight(buttonRect.left())
+        widget = option.widget
+        style = widget.style() if widget else None
+
+        # the background is drawn across the whole row, the text stops at the button
+        backgroundOption = QStyleOptionViewItem(option)
+        backgroundOption.rect.setRight(buttonRect.right())
+        backgroundOption.text = ''
+        backgroundOption.features &= ~QStyleOptionViewItem.ViewItemFeature.HasDecoration
+        if style:
+            style.drawPrimitive(QStyle.PrimitiveElement.PE_PanelItemViewItem,
+                                backgroundOption, painter, widget)
+            style.drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, widget)
+
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        painter.save()
+        font = QFont(option.font)
+        font.setPixelSize(self._deleteButtonFontSize)
+        painter.setFont(font)
+        painter.setPen(self._deleteButtonHoverColor if hovered else self._deleteButtonColor)
+        painter.drawText(buttonRect, Qt.AlignmentFlag.AlignCenter, '×')
+        painter.restore()
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        size = super().sizeHint(option, index)
+        return QSize(size.width(), max(size.height(), self._rowHeight))
+
+    def editorEvent(self, event: QEvent, model, option: QStyleOptionViewItem,
+                    index: QModelIndex) -> bool:
+        if event.type() == QEvent.Type.MouseButtonRelease \
+                and isinstance(event, QMouseEvent) \
+                and event.button() == Qt.MouseButton.LeftButton \
+                and self._deleteButtonRect(option.rect).contains(event.position().toPoint()):
+            model.removeRow(index.row())
+            return True
+        return super().editorEvent(event, model, option, index)
+
+    def _deleteButtonRect(self, rect: QRect) -> QRect:
+        return QRect(QPoint(rect.right() - self._deleteButtonWidth, rect.top()),
+                     QSize(self._deleteButtonWidth, rect.height()))
@@ -0,0 +1,256 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from PyQt6.QtCore import QIODevice, QObject, QThread, QUrl, pyqtSignal
+from PyQt6.QtMultimedia import QMediaPlayer
+
+
+class _FillThread(QThread):
+    def __init__(self, fill, parent=None) -> None:
+        super().__init__(parent)
+        self._fill = fill
+
+    def run(self) -> None:
+        self._fill()
+
+
+class ReadAheadDevice(QIODevice):
+    # emitted from the fill thread whenever the level moves by a step
+    fillLevelChanged = pyqtSignal(float)
+    _chunkSize = 256 << 10
+    # this part of the buffer keeps data behind the read position for short backward seeks
+    _backFraction = 4
+    _levelSteps = 20
+    _waitTimeout = 0.5
+
+    def __init__(self, filePath: str, bufferSize: int = 32 << 20, head: bytes = b'',
+                 parent=None) -> None:
+        super().__init__(parent)
+        self.filePath = filePath
+        self.bufferSize = max(bufferSize, self._chunkSize * self._backFraction)
+        self.stalls = 0
+        self._file = None
+        self._size = 0
+        self._buffer = bytearray(self.bufferSize)
+        # file offsets of the buffered window, the ring index is offset % bufferSize
+        self._start = 0
+        self._end = 0
+        self._position = 0
+        # bumped on every jump so a chunk read for the old window is thrown away
+        self._generation = 0
+        self._isStopped = False
+        self._lastLevel = -1
+        self._condition = threading.Condition()
+        self._thread = _FillThread(self._fill)
+        self._head = head[:self.bufferSize - self.bufferSize // self._backFraction]
+
+    def open(self, mode=QIODevice.OpenModeFlag.ReadOnly) -> bool:
+        try:
+            self._file = open(self.filePath, 'rb', buffering=0)  # pylint: disable=consider-using-with
+            self._size = os.fstat(self._file.fileno()).st_size
+        except OSError as error:
+            self.setErrorString(str(error))
+            return False
+        # a prefetched head lets playback start before the first read reaches the disk
+        self._write(0, self._head)
+        self._head = b''
+        self._thread.start(QThread.Priority.HighPriority)
+        # unbuffered, the ring buffer already is the buffer
+        return super().open(mode | QIODevice.OpenModeFlag.Unbuffered)
+
+    def close(self) -> None:
+        with self._condition:
+            self._isStopped = True
+            self._condition.notify_all()
+        self._thread.wait()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().close()
+
+    def isSequential(self) -> bool:
+        return False
+
+    def size(self) -> int:
+        return self._size
+
+    def seek(self, position: int) -> bool:
+        with self._condition:
+            self._position = position
+            self._condition.notify_all()
+        return super().seek(position)
+
+    def bufferedBytes(self) -> int:
+        with self._condition:
+            return max(self._end - self._position, 0)
+
+    def fillLevel(self) -> float:
+        if self._position >= self._size:
+            return 1.0
+        ahead = self.bufferSize - self.bufferSize // self._backFraction
+        return min(self.bufferedBytes() / min(ahead, self._size - self._position), 1.0)
+
+    def readData(self, maxlen: int) -> Optional[bytes]:
+        with self._condition:
+            position = self._position
+            if position >= self._size:
+                return b''
+            if not self._start <= position <= self._end + self._chunkSize:
+                # a seek out of the window starts a new window at the target
+                self._start = self._end = position
+                self._generation += 1
+                self._condition.notify_all()
+            if position >= self._end:
+                self.stalls += 1
+            # the file can shrink while the reader waits, the filler then moves the size back
+            while self._end <= position < self._size and not self._isStopped:
+                self._condition.wait(self._waitTimeout)
+            if self._isStopped:
+                return None
+            if position >= self._size:
+                return b''
+            length = min(maxlen, self._end - position)
+            data = self._read(position, length)
+            self._position = position + length
+            self._condition.notify_all()
+        return data
+
+    def writeData(self, _) -> int:
+        return -1
+
+    def _read(self, position: int, length: int) -> bytes:
+        index = position % self.bufferSize
+        first = min(length, self.bufferSize - index)
+        view = memoryview(self._buffer)
+        if first == length:
+            return bytes(view[index:index + length])
+        return bytes(view[index:]) + bytes(view[:length - first])
+
+    def _write(self, position: int, data: bytes):
+        length = len(data)
+        index = position % self.bufferSize
+        first = min(length, self.bufferSize - index)
+        self._buffer[index:index + first] = data[:first]
+        self._buffer[:length - first] = data[first:]
+        self._end = position + length
+        self._start = max(self._start, self._end - self.bufferSize)
+
+    def _fill(self):
+        ahead = self.bufferSize - self.bufferSize // self._backFraction
+        while True:
+            with self._condition:
+                while not self._isStopped and (self._end >= self._size
+                                               or self._end - self._position >= ahead):
+                    self._condition.wait()
+                if self._isStopped:
+                    return
+                offset, generation = self._end, self._generation
+            # the disk is read without the lock so the player keeps reading buffered data
+            data = self._readAt(offset, min(self._chunkSize, self._size - offset))
+            with self._condition:
+                if generation != self._generation:
+                    continue
+                if not data:
+                    # a truncated file is treated as ending here
+                    self._size = offset
+                else:
+                    self._write(offset, data)
+                self._condition.notify_all()
+            self._reportLevel()
+
+    def _readAt(self, offset: int, length: int) -> bytes:
+        try:
+            self._file.seek(offset)
+            return self._file.read(length)
+        except (OSError, ValueError):
+            return b''
+
+    def _reportLevel(self):
+        level = round(self.fillLevel() * self._levelSteps)
+        if level != self._lastLevel:
+            self._lastLevel = level
+            self.fillLevelChanged.emit(level / self._levelSteps)
+
+
+class _HeadReader(QThread):
+    headReady = pyqtSignal(str, bytes)
+
+    def __init__(self, filePath: str, size: int, parent=None) -> None:
+        super().__init__(parent)
+        self.filePath = filePath
+        self.size = size
+
+    def run(self) -> None:
+        try:
+            with open(self.filePath, 'rb') as file:
+                head = file.read(self.size)
+        except OSError:
+            return
+        if not self.isInterruptionRequested():
+            self.headReady.emit(self.filePath, head)
+
+
+class ReadAheadSource(QObject):
+    fillLevelChanged = pyqtSignal(QMediaPlayer, float)
+    _headSize = 4 << 20
+    _maxHeads = 2
+
+    def __init__(self, bufferSize: int, parent=None) -> None:
+        super().__init__(parent)
+        self.bufferSize = bufferSize
+        self._devices = {}
+        self._heads = OrderedDict()
+        self._readers = []
+
+    def setSource(self, player: QMediaPlayer, fileName: str):
+        previous = self._devices.pop(player, None)
+        if not fileName:
+            player.setSource(QUrl())
+        else:
+            device = ReadAheadDevice(fileName, self.bufferSize, self._heads.pop(fileName, b''),
+                                     self)
+            device.fillLevelChanged.connect(
+                lambda level, player=player: self.fillLevelChanged.emit(player, level))
+            if device.open():
+                self._devices[player] = device
+                # the url keeps source() meaningful for everything keyed by the file name
+                player.setSourceDevice(device, QUrl.fromLocalFile(fileName))
+            else:
+                player.setSource(QUrl.fromLocalFile(fileName))
+        # the player let go of the old device when it got the new source
+        if previous is not None:
+            previous.close()
+            previous.deleteLater()
+
+    def prefetch(self, fileName: str):
+        if fileName in self._heads or any(reader.filePath == fileName for reader in self._readers):
+            return
+        reader = _HeadReader(fileName, self._headSize, self)
+        reader.headReady.connect(self._headReady)
+        reader.finished.connect(lambda: self._readerFinished(reader))
+        self._readers.append(reader)
+        reader.start(QThread.Priority.LowPriority)
+
+    def fillLevel(self, player: QMediaPlayer) -> float:
+        device = self._devices.get(player)
+        return device.fillLevel() if device is not None else -1.0
+
+    def close(self):
+        for reader in self._readers:
+            reader.requestInterruption()
+            reader.wait()
+        for device in self._devices.values():
+            device.close()
+        self._devices.clear()
+
+    def _headReady(self, fileName: str, head: bytes):
+        self._heads[fileName] = head
+        while len(self._heads) > self._maxHeads:
+            self._heads.popitem(last=False)
+
+    def _readerFinished(self, reader: _HeadReader):
+        if reader in self._readers:
+            self._readers.remove(reader)
+            reader.deleteLater()
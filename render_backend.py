@@ -0,0 +1,49 @@
+import enum
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPainter, QOpenGLContext
+from PyQt6.QtWidgets import QGraphicsScene, QGraphicsView
+
+try:
+    from PyQt6.QtOpenGLWidgets import QOpenGLWidget
+except ImportError:
+    QOpenGLWidget = None
+
+
+class RenderBackend(enum.Enum):
+    # the scene draws the overlays, the widget draws nothing but the video
+    Scene = 'scene'
+    OpenGL = 'opengl'
+    Widget = 'widget'
+
+    @classmethod
+    def fromName(cls, name: str) -> 'RenderBackend':
+        try:
+            return cls(name.strip().lower())
+        except ValueError:
+            return cls.Scene
+
+
+def isOpenGLAvailable() -> bool:
+    # the module can be there while the platform plugin has no GL support, offscreen for one
+    return QOpenGLWidget is not None and QOpenGLContext().create()
+
+
+def optimizeScene(scene: QGraphicsScene):
+    # a handful of items that move together, an index would only be rebuilt on every resize
+    scene.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.NoIndex)
+
+
+def optimizeView(view: QGraphicsView, useOpenGL: bool = False) -> bool:
+    view.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+    view.setOptimizationFlags(QGraphicsView.OptimizationFlag.DontSavePainterState
+                              | QGraphicsView.OptimizationFlag.DontAdjustForAntialiasing)
+    view.setBackgroundBrush(Qt.GlobalColor.black)
+    view.setCacheMode(QGraphicsView.CacheModeFlag.CacheBackground)
+    if useOpenGL and isOpenGLAvailable():
+        view.setViewport(QOpenGLWidget())
+        # a GL viewport redraws all of itself anyway, working out dirty regions is wasted
+        view.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        return True
+    view.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate)
+    return False
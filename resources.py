@@ -0,0 +1,116 @@
+import os
+import json
+from functools import lru_cache
+
+from PyQt6.QtCore import QRect, QSize, Qt, QStandardPaths
+from PyQt6.QtGui import QIcon, QImage, QPainter, QPixmap
+
+ROOT_PATH = os.path.dirname(os.path.realpath(__file__))
+STYLES_PATH = os.path.join(ROOT_PATH, 'styles')
+ICONS_PATH = os.path.join(ROOT_PATH, 'icons')
+
+
+class ResourceBundle:
+    # the .ico files hold 800px images, decoding them took most of the window construction
+    _iconSize = 64
+    _atlasColumns = 8
+    _version = 1
+
+    def __init__(self, cacheDirectory: str) -> None:
+        self.cacheDirectory = cacheDirectory
+        self._indexPath = os.path.join(cacheDirectory, 'bundle.json')
+        self._atlasPath = os.path.join(cacheDirectory, 'icons.png')
+        self._icons = {}
+        self._iconRects = {}
+        self._styles = {}
+        self._atlas = QImage()
+        self._load()
+
+    def icon(self, fileName: str) -> QIcon:
+        if fileName not in self._icons:
+            rect = self._iconRects.get(fileName)
+            # files that are not in the bundle are still loaded the slow way
+            self._icons[fileName] = QIcon(QPixmap.fromImage(self._atlas.copy(QRect(*rect)))) \
+                if rect else QIcon(os.path.join(ICONS_PATH, fileName))
+        return self._icons[fileName]
+
+    def style(self, fileName: str) -> str:
+        if fileName not in self._styles:
+            with open(os.path.join(STYLES_PATH, fileName), 'r', encoding='utf-8') as style:
+                self._styles[fileName] = style.read()
+        return self._styles[fileName]
+
+    def _load(self):
+        sources = _sourceStamps()
+        try:
+            with open(self._indexPath, 'r', encoding='utf-8') as indexFile:
+                index = json.load(indexFile)
+        except (OSError, ValueError):
+            index = {}
+        if index.get('version') == self._version and index.get('sources') == sources:
+            self._atlas = QImage(self._atlasPath)
+        if self._atlas.isNull():
+            index = self._build(sources)
+        self._iconRects = index['icons']
+        self._styles = dict(index['styles'])
+
+    def _build(self, sources: dict) -> dict:
+        iconNames = sorted(name for name in os.listdir(ICONS_PATH) if name.endswith('.ico'))
+        rows = (len(iconNames) + self._atlasColumns - 1) // self._atlasColumns
+        self._atlas = QImage(self._iconSize * self._atlasColumns, self._iconSize * max(rows, 1),
+                             QImage.Format.Format_ARGB32_Premultiplied)
+        self._atlas.fill(Qt.GlobalColor.transparent)
+
+        iconRects = {}
+        painter = QPainter(self._atlas)
+        for number, name in enumerate(iconNames):
+            pixmap = QIcon(os.path.join(ICONS_PATH, name)).pixmap(
+                QSize(self._iconSize, self._iconSize))
+            x = number % self._atlasColumns * self._iconSize
+            y = number // self._atlasColumns * self._iconSize
+            painter.drawPixmap(x, y, pixmap)
+            iconRects[name] = [x, y, pixmap.width(), pixmap.height()]
+        painter.end()
+
+        styles = {}
+        for name in os.listdir(STYLES_PATH):
+            with open(os.path.join(STYLES_PATH, name), 'r', encoding='utf-8') as style:
+                styles[name] = style.read()
+
+        index = {'version': self._version, 'sources': sources,
+                 'icons': iconRects, 'styles': styles}
+        # the bundle is only a cache, a read-only location just means it is rebuilt next time
+        try:
+            os.makedirs(self.cacheDirectory, exist_ok=True)
+            self._atlas.save(self._atlasPath, 'PNG')
+            with open(self._indexPath, 'w', encoding='utf-8') as indexFile:
+                json.dump(index, indexFile)
+        except OSError:
+            pass
+        return index
+
+
+@lru_cache(maxsize=None)
+def getResourceBundle() -> ResourceBundle:
+    cachePath = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+    return ResourceBundle(os.path.join(cachePath, 'resources'))
+
+
+def getStyle(fileName: str) -> str:
+    return getResourceBundle().style(fileName)
+
+
+def getIcon(fileName: str) -> QIcon:
+    return getResourceBundle().icon(fileName)
+
+
+def _sourceStamps() -> dict:
+    stamps = {}
+    for directory in (ICONS_PATH, STYLES_PATH):
+        with os.scandir(directory) as scanner:
+            for entry in scanner:
+                if entry.name.endswith(('.ico', '.qss')):
+                    stat = entry.stat()
+                    stamps[os.path.join(os.path.basename(directory), entry.name)] = \
+                        [stat.st_mtime_ns, stat.st_size]
+    return stamps
@@ -0,0 +1,154 @@
+import os
+import time
+import sqlite3
+import hashlib
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from PyQt6.QtCore import QObject, QTimer
+
+
+class ResumeState(NamedTuple):
+    position: int = 0
+    rate: Optional[float] = None
+    audioTrack: int = -1
+
+
+def fileFingerprint(path: str, sampleSize: int = 1 << 20) -> Optional[str]:
+    # the path is left out so a renamed or moved file keeps its fingerprint
+    try:
+        stat = os.stat(path)
+        digest = hashlib.blake2b(f'{stat.st_size}:{stat.st_mtime_ns}'.encode(), digest_size=16)
+        with open(path, 'rb') as file:
+            digest.update(file.read(sampleSize))
+            if stat.st_size > sampleSize:
+                file.seek(max(stat.st_size - sampleSize, sampleSize))
+                digest.update(file.read(sampleSize))
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class ResumeStore(QObject):
+    _saveDelay = 1000
+    _evictDelay = 10_000
+    _maxEntries = 200_000
+    _maxAge = 365 * 24 * 60 * 60
+    _fingerprintCacheSize = 1000
+
+    def __init__(self, path: str, parent=None) -> None:
+        super().__init__(parent)
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript('''
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS resume (
+                fingerprint TEXT PRIMARY KEY, position INTEGER NOT NULL, rate REAL,
+                audioTrack INTEGER NOT NULL, updated INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS resume_updated ON resume (updated);
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                path TEXT PRIMARY KEY, mtime INTEGER NOT NULL, size INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL, updated INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS fingerprints_updated ON fingerprints (updated);
+        ''')
+        # hashing reads the file, so every path is only fingerprinted once per change
+        self._fingerprints = OrderedDict()
+        self._pendingStates = {}
+        self._pendingFingerprints = {}
+        self._saveTimer = QTimer(self)
+        self._saveTimer.setSingleShot(True)
+        self._saveTimer.setInterval(self._saveDelay)
+        self._saveTimer.timeout.connect(self.flush)
+        QTimer.singleShot(self._evictDelay, self.evict)
+
+    def state(self, path: str) -> ResumeState:
+        return self.stateOf(self.fingerprint(path))
+
+    def stateOf(self, fingerprint: Optional[str]) -> ResumeState:
+        if fingerprint is None:
+            return ResumeState()
+        if fingerprint in self._pendingStates:
+            return self._pendingStates[fingerprint]
+        row = self._connection.execute(
+            'SELECT position, rate, audioTrack FROM resume WHERE fingerprint = ?',
+            (fingerprint,)).fetchone()
+        return ResumeState(*row) if row else ResumeState()
+
+    # the window fingerprints a file once when it is loaded, updates only take the fingerprint
+    def setPosition(self, fingerprint: Optional[str], position: int):
+        self._update(fingerprint, position=position)
+
+    def setRate(self, fingerprint: Optional[str], rate: float):
+        self._update(fingerprint, rate=rate)
+
+    def setAudioTrack(self, fingerprint: Optional[str], audioTrack: int):
+        self._update(fingerprint, audioTrack=audioTrack)
+
+    def fingerprint(self, path: str) -> Optional[str]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key in self._fingerprints:
+            self._fingerprints.move_to_end(key)
+            return self._fingerprints[key]
+
+        row = self._connection.execute(
+            'SELECT fingerprint FROM fingerprints WHERE path = ? AND mtime = ? AND size = ?',
+            key).fetchone()
+        if row:
+            fingerprint = row[0]
+        else:
+            fingerprint = fileFingerprint(path)
+            if fingerprint is None:
+                return None
+            self._pendingFingerprints[path] = key + (fingerprint,)
+            self._scheduleSave()
+        self._fingerprints[key] = fingerprint
+        if len(self._fingerprints) > self._fingerprintCacheSize:
+            self._fingerprints.popitem(last=False)
+        return fingerprint
+
+    def flush(self):
+        self._saveTimer.stop()
+        if not (self._pendingStates or self._pendingFingerprints):
+            return
+        now = int(time.time())
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO resume (fingerprint, position, rate, audioTrack, updated) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (((fingerprint,) + tuple(state) + (now,))
+                 for fingerprint, state in self._pendingStates.items()))
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO fingerprints (path, mtime, size, fingerprint, updated) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (row + (now,) for row in self._pendingFingerprints.values()))
+        self._pendingStates.clear()
+        self._pendingFingerprints.clear()
+
+    def evict(self):
+        self.flush()
+        with self._connection:
+            for table in ('resume', 'fingerprints'):
+                self._connection.execute(
+                    f'DELETE FROM {table} WHERE updated < ?', (int(time.time()) - self._maxAge,))
+                # the oldest rows go first once the table is over its size
+                self._connection.execute(
+                    f'DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} '
+                    f'ORDER BY updated DESC LIMIT -1 OFFSET ?)', (self._maxEntries,))
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def _update(self, fingerprint: Optional[str], **changes):
+        if fingerprint is None:
+            return
+        self._pendingStates[fingerprint] = self.stateOf(fingerprint)._replace(**changes)
+        self._scheduleSave()
+
+    def _scheduleSave(self):
+        if not self._saveTimer.isActive():
+            self._saveTimer.start()
@@ -0,0 +1,173 @@
+import sqlite3
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+from PyQt6.QtCore import QObject, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from media_probe import fileKey
+from thumbnails import FrameSampler
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ChapterCache:
+    def __init__(self, path: str) -> None:
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript('''
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS chapters (
+                path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, positions BLOB);
+        ''')
+
+    def get(self, key: tuple[str, int, int]) -> Optional[array]:
+        row = self._connection.execute(
+            'SELECT positions FROM chapters WHERE path = ? AND mtime = ? AND size = ?',
+            key).fetchone()
+        if row is None:
+            return None
+        positions = array('q')
+        positions.frombytes(row[0])
+        return positions
+
+    def put(self, key: tuple[str, int, int], positions: array):
+        with self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO chapters VALUES (?, ?, ?, ?)',
+                                     key + (positions.tobytes(),))
+
+    def close(self):
+        self._connection.close()
+
+
+def detectCuts(histograms: 'np.ndarray', frames: 'np.ndarray', minScore: float,
+               deviations: float) -> tuple:
+    # a cut changes both the colours and the picture, every pair of samples is scored at once
+    colourChange = np.abs(np.diff(histograms, axis=0)).sum(axis=1) / 2
+    pictureChange = np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2)) / 255
+    scores = (colourChange + pictureChange) / 2
+    # busy footage changes a lot all the time, a cut has to stand out from the file itself
+    median = np.median(scores)
+    threshold = max(minScore, median + deviations * np.median(np.abs(scores - median)))
+    cuts = np.flatnonzero(scores > threshold)
+    return cuts + 1, scores[cuts]
+
+
+class SceneDetector(QObject):
+    # frames are sampled small and sparse by a sampler of their own, it slows down while the
+    # player is playing so the detection does not compete with playback for the decoder
+    chaptersChanged = pyqtSignal(str, object)
+    frameSize = QSize(64, 36)
+    interval = 2000
+    _bins = 16
+    _minScore = 0.3
+    _deviations = 6.0
+    _minChapterLength = 30_000
+    # chapters found so far are shown every this many samples
+    _updateInterval = 50
+    # a chapter this close behind is skipped when going back, like restarting a track
+    _previousTolerance = 3000
+
+    def __init__(self, cache: ChapterCache, parent=None) -> None:
+        super().__init__(parent)
+        self.cache = cache
+        self.filePath = ''
+        self.chapters = array('q')
+        self.sampler = FrameSampler(self.frameSize, self)
+        self.sampler.frameSampled.connect(self._frameSampled)
+        self.sampler.finished.connect(self._samplingFinished)
+        self._key = None
+        self._positions = []
+        self._histograms = []
+        self._frames = []
+
+    @staticmethod
+    def isAvailable() -> bool:
+        return np is not None
+
+    def prepare(self, filePath: str):
+        if filePath == self.filePath:
+            return
+        self.sampler.stop()
+        self.filePath = filePath
+        self._key = fileKey(filePath)
+        self._positions.clear()
+        self._histograms.clear()
+        self._frames.clear()
+        chapters = self.cache.get(self._key) if self._key else None
+        self._setChapters(chapters or array('q'))
+        if chapters is None and self._key and self.isAvailable():
+            self.sampler.start(filePath, self.interval)
+
+    def setPlaybackActive(self, active: bool):
+        self.sampler.setThrottled(active)
+
+    def nextChapter(self, position: int) -> int:
+        index = bisect_right(self.chapters, position)
+        return self.chapters[index] if index < len(self.chapters) else -1
+
+    def previousChapter(self, position: int) -> int:
+        # the start of the file counts as a chapter once the file has any
+        if not self.chapters:
+            return -1
+        index = bisect_left(self.chapters, position - self._previousTolerance)
+        return self.chapters[index - 1] if index > 0 else 0
+
+    def release(self):
+        # the next prepare reads the cache or starts the pass over
+        self.sampler.stop()
+        self.filePath = ''
+        self._positions.clear()
+        self._histograms.clear()
+        self._frames.clear()
+
+    def close(self):
+        self.sampler.stop()
+        self.cache.close()
+
+    def _setChapters(self, chapters: array):
+        self.chapters = chapters
+        self.chaptersChanged.emit(self.filePath, chapters)
+
+    def _frameSampled(self, position: int, image: QImage):
+        # the sampler keeps the aspect ratio, the comparison needs every frame the same size
+        image = image.scaled(self.frameSize, Qt.AspectRatioMode.IgnoreAspectRatio) \
+            .convertToFormat(QImage.Format.Format_RGB32)
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        pixels = np.frombuffer(bits, np.uint8).reshape(
+            image.height(), image.bytesPerLine())[:, :image.width() * 4]
+        pixels = pixels.reshape(image.height(), image.width(), 4)[:, :, :3]
+        bins = (pixels >> 4).astype(np.intp) + np.arange(3) * self._bins
+        histogram = np.bincount(bins.ravel(), minlength=3 * self._bins) / pixels[:, :, 0].size
+        self._positions.append(position)
+        self._histograms.append(histogram)
+        self._frames.append(pixels.mean(axis=2, dtype=np.float32))
+        if len(self._positions) % self._updateInterval == 0:
+            self._setChapters(self._detect())
+
+    def _detect(self) -> array:
+        if len(self._positions) < 2:
+            return array('q')
+        cuts, scores = detectCuts(np.array(self._histograms), np.array(self._frames),
+                                  self._minScore, self._deviations)
+        # the strongest cuts win, weaker ones too close to them are dropped
+        chapters = []
+        for cut in cuts[np.argsort(-scores, kind='stable')]:
+            position = self._positions[cut]
+            if all(abs(position - chapter) >= self._minChapterLength for chapter in chapters):
+                chapters.append(position)
+        return array('q', sorted(chapters))
+
+    def _samplingFinished(self):
+        if not self.filePath:
+            return
+        chapters = self._detect()
+        if self._key is not None:
+            self.cache.put(self._key, chapters)
+        self._histograms.clear()
+        self._frames.clear()
+        self._setChapters(chapters)
@@ -0,0 +1,174 @@
+import os
+import math
+from collections import Counter
+from typing import Iterable, Optional
+
+from media_probe import MediaInfo, formatMediaInfo
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _mediaInfoText(info: MediaInfo) -> str:
+    text = formatMediaInfo(info)
+    if info.width and info.height:
+        text += f' {info.width}x{info.height}'
+    return text.lower()
+
+
+class SearchIndex:
+    # file names and metadata are indexed by trigram, directories are few and shared so they
+    # are matched directly
+    _fuzzyRatio = 0.6
+    # trigrams this common do not narrow a fuzzy search down and are left out of it
+    _fuzzyPostingShare = 0.2
+
+    def __init__(self) -> None:
+        self._names = {}
+        self._postings = {}
+        self._directories = {}
+        self._entryDirectories = {}
+        self._entryPaths = {}
+        self._pathIds = {}
+        self._metadata = {}
+        # removed entries stay in the postings until there are enough of them to compact
+        self._removed = set()
+        # entries are indexed in chunks, the ones still waiting are matched by a plain scan
+        self._pending = {}
+
+    def __len__(self) -> int:
+        return len(self._names) + len(self._pending)
+
+    def add(self, entries: Iterable[tuple[int, str]]):
+        for entryId, filePath in entries:
+            self._pending[entryId] = filePath
+            self._removed.discard(entryId)
+
+    def remove(self, entryIds: Iterable[int]):
+        for entryId in entryIds:
+            if self._pending.pop(entryId, None) is not None:
+                continue
+            if self._names.pop(entryId, None) is None:
+                continue
+            self._removed.add(entryId)
+            directory = self._entryDirectories.pop(entryId)
+            self._directories[directory].discard(entryId)
+            if not self._directories[directory]:
+                del self._directories[directory]
+            filePath = self._entryPaths.pop(entryId)
+            self._pathIds[filePath].discard(entryId)
+            if not self._pathIds[filePath]:
+                del self._pathIds[filePath]
+        if len(self._removed) > len(self._names):
+            self._compact()
+
+    def setMediaInfo(self, mediaInfo: dict[str, MediaInfo]):
+        for filePath, info in mediaInfo.items():
+            text = _mediaInfoText(info)
+            self._metadata[filePath] = text
+            for entryId in self._pathIds.get(filePath, ()):
+                # probing a file again replaces what the last probe indexed
+                name = self._nameText(filePath)
+                self._updateTrigrams(entryId, self._names[entryId], name)
+                self._names[entryId] = name
+
+    def hasPending(self) -> bool:
+        return bool(self._pending)
+
+    def indexPending(self, limit: int) -> bool:
+        for _ in range(min(limit, len(self._pending))):
+            entryId, filePath = self._pending.popitem()
+            name = self._nameText(filePath)
+            directory = os.path.dirname(filePath).lower()
+            self._names[entryId] = name
+            self._entryPaths[entryId] = filePath
+            self._entryDirectories[entryId] = directory
+            self._directories.setdefault(directory, set()).add(entryId)
+            self._pathIds.setdefault(filePath, set()).add(entryId)
+            self._addTrigrams(entryId, name)
+        return bool(self._pending)
+
+    def search(self, query: str) -> Optional[set]:
+        # None when there is nothing to filter by, every word has to match somewhere
+        words = query.lower().split()
+        if not words:
+            return None
+        result = None
+        for word in sorted(words, key=len, reverse=True):
+            matches = self._nameMatches(word)
+            for directory, entryIds in self._directories.items():
+                if word in directory:
+                    matches |= entryIds
+            matches |= {entryId for entryId, filePath in self._pending.items()
+                        if word in filePath.lower()}
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return result
+
+    def _nameText(self, filePath: str) -> str:
+        name = os.path.basename(filePath).lower()
+        metadata = self._metadata.get(filePath)
+        return f'{name} {metadata}' if metadata else name
+
+    def _addTrigrams(self, entryId: int, text: str):
+        postings = self._postings
+        for trigram in _trigrams(text):
+            posting = postings.get(trigram)
+            if posting is None:
+                # the ids in the lists are the ones the names are keyed by, not copies
+                posting = postings[trigram] = []
+            posting.append(entryId)
+
+    def _updateTrigrams(self, entryId: int, oldText: str, text: str):
+        postings = self._postings
+        oldTrigrams = _trigrams(oldText)
+        trigrams = _trigrams(text)
+        for trigram in oldTrigrams - trigrams:
+            posting = postings[trigram]
+            posting.remove(entryId)
+            if not posting:
+                del postings[trigram]
+        for trigram in trigrams - oldTrigrams:
+            postings.setdefault(trigram, []).append(entryId)
+
+    def _nameMatches(self, word: str) -> set:
+        names = self._names
+        if len(word) < 3:
+            return {entryId for entryId, name in names.items() if word in name}
+        postings = [self._postings.get(trigram) for trigram in _trigrams(word)]
+        if all(postings):
+            # the rarest trigram gives the candidates, the text decides
+            candidates = min(postings, key=len)
+            if len(word) == 3:
+                matches = set(candidates)
+                return matches.intersection(names) if self._removed else matches
+            matches = {entryId for entryId in candidates
+                       if word in names.get(entryId, '')}
+            if matches:
+                return matches
+        return self._fuzzyMatches(word, [posting for posting in postings if posting])
+
+    def _fuzzyMatches(self, word: str, postings: list) -> set:
+        # a typo breaks only the trigrams around it, most of the others still match
+        if len(word) < 4:
+            return set()
+        required = max(math.ceil((len(word) - 2) * self._fuzzyRatio), 2)
+        limit = max(len(self._names) * self._fuzzyPostingShare, 1)
+        hits = Counter()
+        for posting in postings:
+            if len(posting) <= limit:
+                hits.update(set(posting))
+        return {entryId for entryId, count in hits.items()
+                if count >= required and entryId in self._names}
+
+    def _compact(self):
+        removed = self._removed
+        for trigram, posting in list(self._postings.items()):
+            kept = [entryId for entryId in posting if entryId not in removed]
+            if kept:
+                self._postings[trigram] = kept
+            else:
+                del self._postings[trigram]
+        removed.clear()
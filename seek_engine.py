@@ -0,0 +1,215 @@
+import shutil
+import sqlite3
+import subprocess
+from array import array
+from bisect import bisect_left
+from time import monotonic
+from typing import Optional
+
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+from PyQt6.QtMultimedia import QMediaPlayer
+
+from media_probe import fileKey
+
+
+class KeyframeCache:
+    def __init__(self, path: str) -> None:
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript('''
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS keyframes (
+                path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, positions BLOB);
+        ''')
+
+    def get(self, key: tuple[str, int, int]) -> Optional[array]:
+        row = self._connection.execute(
+            'SELECT positions FROM keyframes WHERE path = ? AND mtime = ? AND size = ?',
+            key).fetchone()
+        if row is None:
+            return None
+        positions = array('q')
+        positions.frombytes(row[0])
+        return positions
+
+    def put(self, key: tuple[str, int, int], positions: array):
+        with self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO keyframes VALUES (?, ?, ?, ?)',
+                                     key + (positions.tobytes(),))
+
+    def close(self):
+        self._connection.close()
+
+
+class KeyframeIndexer(QThread):
+    indexReady = pyqtSignal(str, object)
+
+    def __init__(self, filePath: str, parent=None) -> None:
+        super().__init__(parent)
+        self.filePath = filePath
+        self._process: Optional[subprocess.Popen] = None
+
+    @staticmethod
+    def isAvailable() -> bool:
+        return shutil.which('ffprobe') is not None
+
+    def run(self) -> None:
+        # packets are only demuxed, not decoded, so this is fast even for long files
+        command = ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+                   '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', self.filePath]
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL, text=True)
+        except OSError:
+            return
+        self._process = process
+        if self.isInterruptionRequested():
+            process.kill()
+
+        positions = array('q')
+        with process:
+            for line in process.stdout:
+                if self.isInterruptionRequested():
+                    return
+                timestamp, _, flags = line.strip().partition(',')
+                if 'K' in flags and timestamp not in ('', 'N/A'):
+                    positions.append(int(float(timestamp) * 1000))
+        if process.returncode == 0 and not self.isInterruptionRequested():
+            self.indexReady.emit(self.filePath, array('q', sorted(positions)))
+
+    def cancel(self):
+        self.requestInterruption()
+        # killing ffprobe ends the read loop without waiting for its next line
+        if self._process is not None:
+            self._process.kill()
+
+
+class SeekEngine(QObject):
+    seekIssued = pyqtSignal(int)
+    # requests closer together than this are a burst and are snapped to keyframes
+    _burstInterval = 500
+    # while a seek is in flight later requests only replace its target
+    _throttleInterval = 80
+    _settleDelay = 400
+
+    def __init__(self, cache: KeyframeCache, parent=None) -> None:
+        super().__init__(parent)
+        self.cache = cache
+        self.player: Optional[QMediaPlayer] = None
+        self.filePath = ''
+        self.keyframes = array('q')
+        self.requestedSeeks = 0
+        self.issuedSeeks = 0
+        self.snappedSeeks = 0
+        self._indexer: Optional[KeyframeIndexer] = None
+        self._target = -1
+        self._issuedTarget = -1
+        self._isPending = False
+        self._snap = False
+        self._lastRequest = 0.0
+
+        self._throttleTimer = QTimer(self)
+        self._throttleTimer.setSingleShot(True)
+        self._throttleTimer.setInterval(self._throttleInterval)
+        self._throttleTimer.timeout.connect(self._throttleFinished)
+        self._settleTimer = QTimer(self)
+        self._settleTimer.setSingleShot(True)
+        self._settleTimer.setInterval(self._settleDelay)
+        self._settleTimer.timeout.connect(self._settle)
+
+    def setPlayer(self, player: QMediaPlayer):
+        self.player = player
+        self._reset()
+
+    def setFile(self, filePath: str):
+        if filePath == self.filePath:
+            return
+        self._reset()
+        self._stopIndexer()
+        self.filePath = filePath
+        self.keyframes = array('q')
+        key = fileKey(filePath)
+        if key is None:
+            return
+        keyframes = self.cache.get(key)
+        if keyframes is not None:
+            self.keyframes = keyframes
+        elif KeyframeIndexer.isAvailable():
+            self._indexer = KeyframeIndexer(filePath, self)
+            self._indexer.indexReady.connect(self._indexReady)
+            self._indexer.start(QThread.Priority.LowPriority)
+
+    def position(self) -> int:
+        # relative seeks build on the target that is still on its way
+        if self._target != -1 and (self._throttleTimer.isActive() or self._settleTimer.isActive()):
+            return self._target
+        return self.player.position()
+
+    def seek(self, position: int, coarse=False):
+        self.requestedSeeks += 1
+        now = monotonic()
+        isBurst = (now - self._lastRequest) * 1000 < self._burstInterval
+        self._lastRequest = now
+        self._target = min(max(position, 0), max(self.player.duration(), 0))
+        self._snap = bool(self.keyframes) and (isBurst or coarse)
+        if self._snap:
+            self._settleTimer.start()
+        else:
+            self._settleTimer.stop()
+
+        if self._throttleTimer.isActive():
+            self._isPending = True
+        else:
+            self._issue()
+
+    def close(self):
+        self._stopIndexer()
+        self.cache.close()
+
+    def nearestKeyframe(self, position: int) -> int:
+        index = bisect_left(self.keyframes, position)
+        candidates = self.keyframes[max(index - 1, 0):index + 1]
+        return min(candidates, key=lambda keyframe: abs(keyframe - position)) \
+            if candidates else position
+
+    def _issue(self):
+        target = self.nearestKeyframe(self._target) if self._snap else self._target
+        self._isPending = False
+        self._throttleTimer.start()
+        if target == self._issuedTarget and target == self.player.position():
+            return
+        self.issuedSeeks += 1
+        self.snappedSeeks += target != self._target
+        self._issuedTarget = target
+        self.seekIssued.emit(target)
+        self.player.setPosition(target)
+
+    def _throttleFinished(self):
+        if self._isPending:
+            self._issue()
+
+    def _settle(self):
+        # the user stopped, the last request is done exactly
+        if self._issuedTarget != self._target:
+            self._snap = False
+            self._issue()
+
+    def _reset(self):
+        self._throttleTimer.stop()
+        self._settleTimer.stop()
+        self._target = -1
+        self._issuedTarget = -1
+        self._isPending = False
+
+    def _indexReady(self, filePath: str, keyframes: array):
+        key = fileKey(filePath)
+        if key is not None:
+            self.cache.put(key, keyframes)
+        if filePath == self.filePath:
+            self.keyframes = keyframes
+
+    def _stopIndexer(self):
+        if self._indexer is not None:
+            self._indexer.cancel()
+            self._indexer.wait()
+            self._indexer.deleteLater()
+            self._indexer = None
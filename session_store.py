@@ -0,0 +1,199 @@
+import os
+import sqlite3
+from typing import Optional
+
+from PyQt6.QtCore import QObject, QTimer, QStandardPaths
+
+from playlist_model import PlaylistModel
+
+
+def getDataPath(fileName: str) -> str:
+    dataPath = QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.AppDataLocation)
+    os.makedirs(dataPath, exist_ok=True)
+    return os.path.join(dataPath, fileName)
+
+
+class SessionStore(QObject):
+    _saveDelay = 1000
+    _firstChunkSize = 500
+    _chunkSize = 5000
+
+    def __init__(self, path: str, parent=None) -> None:
+        super().__init__(parent)
+        self.model: Optional[PlaylistModel] = None
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript('''
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY, ord REAL NOT NULL, path TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS entries_ord ON entries (ord);
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value);
+            DROP TABLE IF EXISTS positions;
+        ''')
+        self._lastOrd = self._connection.execute(
+            'SELECT coalesce(max(ord), 0) FROM entries').fetchone()[0]
+        self._settings = dict(self._connection.execute('SELECT key, value FROM settings'))
+
+        # every change is queued here and written in one transaction by the save timer
+        self._pendingEntries = []
+        self._pendingSettings = {}
+        self._saveTimer = QTimer(self)
+        self._saveTimer.setSingleShot(True)
+        self._saveTimer.setInterval(self._saveDelay)
+        self._saveTimer.timeout.connect(self.flush)
+
+        self._restoring = False
+        self._restoreCursor = None
+        self._restoreTimer = QTimer(self)
+        self._restoreTimer.timeout.connect(self._restoreChunk)
+
+    def value(self, key: str, default=None):
+        return self._settings.get(key, default)
+
+    def setValue(self, key: str, value):
+        if self._settings.get(key) == value:
+            return
+        self._settings[key] = value
+        self._pendingSettings[key] = value
+        self._scheduleSave()
+
+    def attachModel(self, model: PlaylistModel):
+        self.model = model
+        model.rowsInserted.connect(self._rowsInserted)
+        model.rowsAboutToBeRemoved.connect(self._rowsAboutToBeRemoved)
+        model.rowsMoved.connect(self._rowsMoved)
+
+    def restoreEntries(self):
+        # the first rows are added right away, the rest is streamed from the event loop
+        maxEntryId = self._connection.execute('SELECT max(id) FROM entries').fetchone()[0]
+        if maxEntryId is None:
+            return
+        # ids of entries that are not loaded yet must not be handed out to new ones
+        self.model.reserveEntryIds(maxEntryId + 1)
+        self._restoreCursor = self._connection.execute(
+            'SELECT id, path FROM entries ORDER BY ord')
+        self._restoreChunk(self._firstChunkSize)
+        if self._restoreCursor is not None:
+            self._restoreTimer.start(0)
+
+    def flush(self):
+        self._saveTimer.stop()
+        if not (self._pendingEntries or self._pendingSettings):
+            return
+
+        with self._connection:
+            appended = []
+            for operation, entryId, path, previousId, nextId in self._pendingEntries:
+                # appends are the bulk of the changes, they are written together
+                if operation == 'insert' and nextId is None:
+                    self._lastOrd += 1
+                    appended.append((entryId, self._lastOrd, path))
+                    continue
+                self._insertEntries(appended)
+
+                if operation == 'delete':
+                    self._connection.execute('DELETE FROM entries WHERE id = ?', (entryId,))
+                elif operation == 'insert':
+                    self._insertEntries([(entryId, self._orderBetween(previousId, nextId), path)])
+                else:
+                    self._connection.execute(
+                        'UPDATE entries SET ord = ? WHERE id = ?',
+                        (self._orderBetween(previousId, nextId), entryId))
+            self._insertEntries(appended)
+
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)',
+                self._pendingSettings.items())
+
+        self._pendingEntries.clear()
+        self._pendingSettings.clear()
+
+    def close(self):
+        self._restoreTimer.stop()
+        self._restoreCursor = None
+        self.flush()
+        self._connection.close()
+
+    def _scheduleSave(self):
+        # not restarted on every change so a steady stream of changes still gets saved
+        if not self._saveTimer.isActive():
+            self._saveTimer.start()
+
+    def _restoreChunk(self, chunkSize=None):
+        rows = self._restoreCursor.fetchmany(chunkSize or self._chunkSize)
+        if rows:
+            # a path already in the playlist, opened again before it was restored or saved
+            # twice by an older version, only keeps its first entry
+            entries = {}
+            for entryId, path in rows:
+                if path in entries or self.model.entryIdOf(path) != -1:
+                    self._pendingEntries.append(('delete', entryId, None, None, None))
+                else:
+                    entries[path] = entryId
+            if len(entries) < len(rows):
+                self._scheduleSave()
+            self._restoring = True
+            self.model.addEntries((entryId, path) for path, entryId in entries.items())
+            self._restoring = False
+        if len(rows) < (chunkSize or self._chunkSize):
+            self._restoreTimer.stop()
+            self._restoreCursor = None
+
+    def _rowsInserted(self, _, first: int, last: int):
+        if not self._restoring:
+            self._queuePlacement('insert', first, last)
+
+    def _rowsAboutToBeRemoved(self, _, first: int, last: int):
+        for row in range(first, last + 1):
+            self._pendingEntries.append(('delete', self.model.entryId(row), None, None, None))
+        self._scheduleSave()
+
+    def _rowsMoved(self, _, start: int, end: int, __, destinationRow: int):
+        count = end - start + 1
+        first = destinationRow - count if destinationRow > start else destinationRow
+        self._queuePlacement('move', first, first + count - 1)
+
+    def _queuePlacement(self, operation: str, first: int, last: int):
+        previousId = self.model.entryId(first - 1) if first > 0 else None
+        nextId = self.model.entryId(last + 1) if last + 1 < self.model.rowCount() else None
+        for row in range(first, last + 1):
+            entryId = self.model.entryId(row)
+            self._pendingEntries.append(
+                (operation, entryId, self.model.filePath(row), previousId, nextId))
+            previousId = entryId
+        self._scheduleSave()
+
+    def _insertEntries(self, entries: list):
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO entries (id, ord, path) VALUES (?, ?, ?)', entries)
+        entries.clear()
+
+    def _orderBetween(self, previousId, nextId) -> float:
+        if nextId is None:
+            self._lastOrd += 1
+            return self._lastOrd
+
+        nextOrder = self._order(nextId)
+        previousOrder = self._order(previousId) if previousId is not None else nextOrder - 1
+        order = (previousOrder + nextOrder) / 2
+        if previousOrder < order < nextOrder:
+            return order
+
+        # the gap is exhausted after many moves to the same spot, spread everything out again
+        self._renumber()
+        return self._orderBetween(previousId, nextId)
+
+    def _order(self, entryId: int) -> float:
+        row = self._connection.execute(
+            'SELECT ord FROM entries WHERE id = ?', (entryId,)).fetchone()
+        return row[0] if row else self._lastOrd
+
+    def _renumber(self):
+        entryIds = [row[0] for row in self._connection.execute(
+            'SELECT id FROM entries ORDER BY ord')]
+        self._connection.executemany(
+            'UPDATE entries SET ord = ? WHERE id = ?',
+            ((float(order), entryId) for order, entryId in enumerate(entryIds, 1)))
+        self._lastOrd = float(len(entryIds))
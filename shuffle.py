@@ -0,0 +1,105 @@
+import random
+from collections import deque
+from typing import Iterable, Optional
+
+
+class ShuffleEngine:
+    # the permutation is drawn one entry at a time from a pool of entries not played this round
+    _historySize = 1000
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self._random = random.Random(seed)
+        self._entryIds = set()
+        self._pool = []
+        self._poolIndex = {}
+        self._candidate = -1
+        # entries played before the current one and the ones stepped back over
+        self._back = deque(maxlen=self._historySize)
+        self._forward = deque(maxlen=self._historySize)
+
+    def seed(self, seed: Optional[int]):
+        self._random.seed(seed)
+        self._candidate = -1
+
+    def add(self, entryIds: Iterable[int]):
+        for entryId in entryIds:
+            if entryId not in self._entryIds:
+                self._entryIds.add(entryId)
+                self._addToPool(entryId)
+
+    def remove(self, entryIds: Iterable[int]):
+        # history keeps removed entries, they are skipped when they come up
+        for entryId in entryIds:
+            self._entryIds.discard(entryId)
+            self._removeFromPool(entryId)
+            if entryId == self._candidate:
+                self._candidate = -1
+
+    def clear(self):
+        self._entryIds.clear()
+        self._pool.clear()
+        self._poolIndex.clear()
+        self._back.clear()
+        self._forward.clear()
+        self._candidate = -1
+
+    def peek(self, currentId: int) -> int:
+        # the candidate is kept until it is played so the preloaded entry is the one that comes
+        while self._forward and self._forward[-1] not in self._entryIds:
+            self._forward.pop()
+        if self._forward:
+            return self._forward[-1]
+        if self._candidate == -1:
+            self._candidate = self._draw(currentId)
+        return self._candidate
+
+    def next(self, currentId: int) -> int:
+        entryId = self.peek(currentId)
+        if entryId == -1:
+            return -1
+        if self._forward and self._forward[-1] == entryId:
+            self._forward.pop()
+        else:
+            self._candidate = -1
+            self._removeFromPool(entryId)
+        if currentId != -1:
+            self._back.append(currentId)
+        return entryId
+
+    def previous(self, currentId: int) -> int:
+        while self._back and self._back[-1] not in self._entryIds:
+            self._back.pop()
+        if not self._back:
+            return -1
+        if currentId != -1:
+            self._forward.append(currentId)
+        return self._back.pop()
+
+    def _draw(self, currentId: int) -> int:
+        # a played entry, double clicked or not, does not come again in the same round
+        self._removeFromPool(currentId)
+        isNewRound = not self._pool
+        if isNewRound:
+            for entryId in self._entryIds:
+                self._addToPool(entryId)
+        if not self._pool:
+            return -1
+        if isNewRound and currentId in self._poolIndex and len(self._pool) > 1:
+            # the entry that just played is not allowed to open the new round
+            index = self._random.randrange(len(self._pool) - 1)
+            return self._pool[-1] if self._pool[index] == currentId else self._pool[index]
+        return self._pool[self._random.randrange(len(self._pool))]
+
+    def _addToPool(self, entryId: int):
+        self._poolIndex[entryId] = len(self._pool)
+        self._pool.append(entryId)
+
+    def _removeFromPool(self, entryId: int):
+        # swap with the last entry and pop, so removal does not shift the pool
+        index = self._poolIndex.pop(entryId, None)
+        if index is None:
+            return
+        last = self._pool.pop()
+        if last != entryId:
+            self._pool[index] = last
+            self._poolIndex[last] = index
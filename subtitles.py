@@ -0,0 +1,309 @@
+import os
+import re
+import html
+from bisect import insort
+from collections import OrderedDict
+from typing import Iterator, NamedTuple, Optional
+
+from PyQt6.QtCore import QObject, QPointF, QRectF, QSizeF, QThread, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QPainter, QStaticText, QTextOption
+from PyQt6.QtWidgets import QGraphicsItem
+
+SUBTITLE_EXTENSIONS = ('.srt', '.vtt', '.ass', '.ssa')
+
+_timestampPattern = re.compile(r'(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{1,3})')
+_markupPattern = re.compile(r'&lt;(/?[ibu])(?:\.[^&]*)?&gt;')
+_tagPattern = re.compile(r'&lt;/?[a-zA-Z][^&]*?&gt;|&lt;\d[^&]*?&gt;')
+_assOverridePattern = re.compile(r'\{[^}]*\}')
+_assStylePattern = re.compile(r'\{\\([ibu])([01])\}')
+
+
+class Cue(NamedTuple):
+    start: int
+    end: int
+    text: str
+
+
+def _milliseconds(match: re.Match) -> int:
+    hours, minutes, seconds, fraction = match.groups()
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 \
+        + int(fraction.ljust(3, '0'))
+
+
+def _markup(text: str) -> str:
+    # italics, bold and underline survive as rich text, everything else is shown as written
+    text = html.escape(html.unescape(text), quote=False)
+    text = _markupPattern.sub(r'<\1>', text)
+    return _tagPattern.sub('', text).replace('\n', '<br>')
+
+
+def _assMarkup(text: str) -> str:
+    text = _assStylePattern.sub(lambda match: f'\0{"" if match[2] == "1" else "/"}{match[1]}\0',
+                                text)
+    text = _assOverridePattern.sub('', text).replace('\\N', '\n').replace('\\n', '\n') \
+        .replace('\\h', ' ')
+    text = html.escape(text, quote=False).replace('\n', '<br>')
+    return re.sub('\0(/?[ibu])\0', r'<\1>', text)
+
+
+def parseTimedText(lines: Iterator[str]) -> Iterator[Cue]:
+    # srt and webvtt differ in headers and cue settings, a cue is a timing line and its text
+    timing = None
+    text = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if timing is None:
+            if '-->' in line:
+                start, _, end = line.partition('-->')
+                startMatch = _timestampPattern.search(start)
+                endMatch = _timestampPattern.search(end)
+                if startMatch and endMatch:
+                    timing = (_milliseconds(startMatch), _milliseconds(endMatch))
+        elif line.strip():
+            text.append(line)
+        else:
+            if text:
+                yield Cue(*timing, _markup('\n'.join(text)))
+            timing = None
+            text = []
+    if timing is not None and text:
+        yield Cue(*timing, _markup('\n'.join(text)))
+
+
+def parseAss(lines: Iterator[str]) -> Iterator[Cue]:
+    fields = []
+    isEvents = False
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            isEvents = line.lower() == '[events]'
+        elif not isEvents:
+            continue
+        elif line.startswith('Format:'):
+            fields = [field.strip().lower() for field in line[7:].split(',')]
+        elif line.startswith('Dialogue:') and fields:
+            values = line[9:].split(',', len(fields) - 1)
+            if len(values) != len(fields):
+                continue
+            event = dict(zip(fields, values))
+            startMatch = _timestampPattern.search(event.get('start', ''))
+            endMatch = _timestampPattern.search(event.get('end', ''))
+            if startMatch and endMatch:
+                yield Cue(_milliseconds(startMatch), _milliseconds(endMatch),
+                          _assMarkup(event.get('text', '')))
+
+
+def findSidecar(videoPath: str) -> Optional[str]:
+    # movie.srt before movie.en.srt and the like, srt before the other formats
+    directory, fileName = os.path.split(videoPath)
+    stem = os.path.splitext(fileName)[0]
+    try:
+        names = os.listdir(directory or '.')
+    except OSError:
+        return None
+    candidates = {}
+    for name in names:
+        base, extension = os.path.splitext(name)
+        extension = extension.lower()
+        if extension in SUBTITLE_EXTENSIONS and (base == stem or base.startswith(stem + '.')):
+            rank = (base != stem, SUBTITLE_EXTENSIONS.index(extension), name)
+            candidates[rank] = name
+    if not candidates:
+        return None
+    return os.path.join(directory, candidates[min(candidates)])
+
+
+class CueIndex:
+    # time is cut into buckets holding every cue showing during them, a lookup only reads the
+    # bucket of the position, so a cue over the whole file costs memory and not lookup time
+    _bucketLength = 10_000
+
+    def __init__(self) -> None:
+        self._buckets = []
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self):
+        self._buckets.clear()
+        self._count = 0
+
+    def add(self, cues: list):
+        for cue in cues:
+            if cue.end <= cue.start or cue.end <= 0:
+                continue
+            first = max(cue.start, 0) // self._bucketLength
+            last = (cue.end - 1) // self._bucketLength
+            if last >= len(self._buckets):
+                self._buckets.extend([] for _ in range(last + 1 - len(self._buckets)))
+            # batches come sorted, so this is an append unless cues overlap across batches
+            for bucket in range(first, last + 1):
+                insort(self._buckets[bucket], cue)
+            self._count += 1
+
+    def at(self, position: int) -> list:
+        bucket = position // self._bucketLength
+        if position < 0 or bucket >= len(self._buckets):
+            return []
+        return [cue for cue in self._buckets[bucket] if cue.start <= position < cue.end]
+
+
+class SubtitleLoader(QThread):
+    cuesParsed = pyqtSignal(str, list)
+    _batchSize = 500
+    _encodings = ('utf-8-sig', 'cp1251', 'latin-1')
+
+    def __init__(self, filePath: str, parent=None) -> None:
+        super().__init__(parent)
+        self.filePath = filePath
+
+    def run(self) -> None:
+        # the first batch goes out as soon as it is parsed, the rest follows while playing
+        try:
+            with open(self.filePath, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return
+        for encoding in self._encodings:
+            try:
+                text = data.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        isAss = os.path.splitext(self.filePath)[1].lower() in ('.ass', '.ssa')
+        parser = parseAss if isAss else parseTimedText
+        batch = []
+        for cue in parser(iter(text.splitlines())):
+            if self.isInterruptionRequested():
+                return
+            batch.append(cue)
+            if len(batch) >= self._batchSize:
+                self._emitBatch(batch)
+                batch = []
+        if batch:
+            self._emitBatch(batch)
+
+    def _emitBatch(self, batch: list):
+        # sorted here so the index only appends on the gui thread
+        batch.sort()
+        self.cuesParsed.emit(self.filePath, batch)
+
+
+class SubtitleItem(QGraphicsItem):
+    # a cue is laid out once, a changed size or text is the only reason to lay it out again
+    _layoutCacheSize = 64
+    _outlineOffsets = ((-2, 0), (2, 0), (0, -2), (0, 2), (-1, -1), (1, 1), (-1, 1), (1, -1))
+    _marginFactor = 0.05
+    _fontFactor = 0.055
+    _minFontSize = 12
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.text = ''
+        self._area = QRectF()
+        self._font = QFont()
+        self._layouts = OrderedDict()
+        self._layout: Optional[QStaticText] = None
+        self._rect = QRectF()
+        self.setZValue(5)
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+
+    def setArea(self, area: QRectF):
+        if area == self._area:
+            return
+        self._area = area
+        self._font.setPixelSize(max(int(area.height() * self._fontFactor), self._minFontSize))
+        self._layouts.clear()
+        self._relayout()
+
+    def setText(self, text: str):
+        if text == self.text:
+            return
+        self.text = text
+        self._relayout()
+
+    def boundingRect(self) -> QRectF:
+        return self._rect
+
+    def paint(self, painter: QPainter, _option, _widget=None):
+        if self._layout is None:
+            return
+        painter.setFont(self._font)
+        topLeft = self._rect.topLeft() + QPointF(2, 2)
+        # the static text keeps its glyph layout, only the outline passes are drawn again
+        painter.setPen(QColor(0, 0, 0))
+        for dx, dy in self._outlineOffsets:
+            painter.drawStaticText(topLeft + QPointF(dx, dy), self._layout)
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawStaticText(topLeft, self._layout)
+
+    def _relayout(self):
+        self.prepareGeometryChange()
+        if not self.text or self._area.isEmpty():
+            self._layout = None
+            self._rect = QRectF()
+            return
+        layout = self._layouts.get(self.text)
+        if layout is None:
+            layout = QStaticText(self.text)
+            layout.setTextFormat(Qt.TextFormat.RichText)
+            layout.setTextWidth(self._area.width() * (1 - 2 * self._marginFactor))
+            layout.setTextOption(QTextOption(Qt.AlignmentFlag.AlignHCenter))
+            layout.prepare(font=self._font)
+            self._layouts[self.text] = layout
+            if len(self._layouts) > self._layoutCacheSize:
+                self._layouts.popitem(last=False)
+        else:
+            self._layouts.move_to_end(self.text)
+        self._layout = layout
+        size = layout.size()
+        size = QSizeF(size.width() + 4, size.height() + 4)
+        bottom = self._area.bottom() - self._area.height() * self._marginFactor
+        self._rect = QRectF(QPointF(self._area.center().x() - size.width() / 2,
+                                    bottom - size.height()), size)
+        self.update()
+
+
+class Subtitles(QObject):
+    def __init__(self, item: SubtitleItem, parent=None) -> None:
+        super().__init__(parent)
+        self.item = item
+        self.filePath = ''
+        self.index = CueIndex()
+        self._loader: Optional[SubtitleLoader] = None
+        self._position = 0
+
+    def load(self, videoPath: str):
+        self.setFile(findSidecar(videoPath) if videoPath else None)
+
+    def setFile(self, filePath: Optional[str]):
+        self._stopLoader()
+        self.index.clear()
+        self.item.setText('')
+        self.filePath = filePath or ''
+        if not filePath:
+            return
+        self._loader = SubtitleLoader(filePath, self)
+        self._loader.cuesParsed.connect(self._cuesParsed)
+        self._loader.start(QThread.Priority.LowPriority)
+
+    def update(self, position: int):
+        self._position = position
+        self.item.setText('<br>'.join(cue.text for cue in self.index.at(position)))
+
+    def close(self):
+        self._stopLoader()
+
+    def _cuesParsed(self, filePath: str, cues: list):
+        if filePath != self.filePath:
+            return
+        self.index.add(cues)
+        self.update(self._position)
+
+    def _stopLoader(self):
+        if self._loader is not None:
+            self._loader.requestInterruption()
+            self._loader.wait()
+            self._loader.deleteLater()
+            self._loader = None
@@ -0,0 +1,357 @@
+import os
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+from PyQt6.QtCore import QObject, QThread, QTimer, QUrl, QSize, QRect, QPoint, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter, QPixmap, QColor
+from PyQt6.QtMultimedia import QMediaPlayer, QVideoSink, QVideoFrame
+from PyQt6.QtWidgets import QWidget, QLabel, QVBoxLayout
+
+from media_probe import fileKey, formatDuration
+
+
+class FrameScaler(QThread):
+    # a sampled frame is converted from full resolution, that is kept off the gui thread
+    scaled = pyqtSignal(int, QImage)
+
+    def __init__(self, frame: QVideoFrame, position: int, size: QSize, parent=None) -> None:
+        super().__init__(parent)
+        self.frame = frame
+        self.position = position
+        self.size = size
+
+    def run(self) -> None:
+        image = self.frame.toImage().scaled(self.size, Qt.AspectRatioMode.KeepAspectRatio,
+                                            Qt.TransformationMode.SmoothTransformation)
+        self.frame = None
+        self.scaled.emit(self.position, image)
+
+
+class FrameSampler(QObject):
+    frameSampled = pyqtSignal(int, QImage)
+    finished = pyqtSignal()
+    _frameTimeout = 3000
+    _frameTolerance = 1000
+    # while the main player plays the samples are spaced out so playback keeps the decoder
+    _throttledDelay = 500
+
+    def __init__(self, frameSize: QSize, parent=None) -> None:
+        super().__init__(parent)
+        self.frameSize = frameSize
+        self.filePath = ''
+        self._interval = 0
+        self._positions = []
+        self._target = -1
+        self._lastFrame = None
+        self._isThrottled = False
+        self._scaler: Optional[FrameScaler] = None
+
+        # a player without audio that is only ever paused and seeked
+        self.player = QMediaPlayer(self)
+        self.videoSink = QVideoSink(self)
+        self.player.setVideoSink(self.videoSink)
+        self.player.mediaStatusChanged.connect(self._mediaStatusChanged)
+        self.videoSink.videoFrameChanged.connect(self._videoFrameChanged)
+        self._timeoutTimer = QTimer(self)
+        self._timeoutTimer.setSingleShot(True)
+        self._timeoutTimer.setInterval(self._frameTimeout)
+        self._timeoutTimer.timeout.connect(self._frameTimedOut)
+        # the next seek is started from the event loop so painting is not held up
+        self._nextTimer = QTimer(self)
+        self._nextTimer.setSingleShot(True)
+        self._nextTimer.timeout.connect(self._seekNext)
+
+    def start(self, filePath: str, interval: int):
+        self.stop()
+        self.filePath = filePath
+        self._interval = interval
+        self.player.setSource(QUrl.fromLocalFile(filePath))
+
+    def stop(self):
+        self._timeoutTimer.stop()
+        self._nextTimer.stop()
+        self._stopScaler()
+        self._positions = []
+        self._target = -1
+        self.filePath = ''
+        self.player.setSource(QUrl())
+
+    def isRunning(self) -> bool:
+        return self.filePath != ''
+
+    def setThrottled(self, throttled: bool):
+        # the frame already asked for still arrives, only the next seek is delayed
+        self._isThrottled = throttled
+        if self._nextTimer.isActive():
+            self._nextTimer.start(self._nextDelay())
+
+    def _mediaStatusChanged(self, status):
+        if status == QMediaPlayer.MediaStatus.LoadedMedia and self.isRunning() \
+                and self._target == -1:
+            self._positions = list(range(0, self.player.duration(), self._interval))
+            self._positions.reverse()
+            self.player.pause()
+            self._scheduleNext()
+        elif status == QMediaPlayer.MediaStatus.InvalidMedia and self.isRunning():
+            self._finish()
+
+    def _seekNext(self):
+        self._lastFrame = None
+        if not self._positions:
+            self._finish()
+            return
+        self._target = self._positions.pop()
+        self._timeoutTimer.start()
+        self.player.setPosition(self._target)
+
+    def _videoFrameChanged(self, frame: QVideoFrame):
+        if self._target == -1 or self._scaler is not None or not frame.isValid():
+            return
+        self._lastFrame = frame
+        # frames decoded before the seek landed are skipped
+        if abs(frame.startTime() // 1000 - self._target) <= self._frameTolerance:
+            self._emitFrame(frame)
+
+    def _frameTimedOut(self):
+        if self._lastFrame is not None:
+            self._emitFrame(self._lastFrame)
+        else:
+            self._scheduleNext()
+
+    def _emitFrame(self, frame: QVideoFrame):
+        self._timeoutTimer.stop()
+        self._scaler = FrameScaler(frame, self._target, self.frameSize, self)
+        self._scaler.scaled.connect(self._frameScaled)
+        self._scaler.start(QThread.Priority.LowPriority)
+
+    def _frameScaled(self, position: int, image: QImage):
+        # a result arriving after the sampler was stopped belongs to the previous file
+        if self._scaler is None or self.sender() is not self._scaler:
+            return
+        self._stopScaler()
+        self.frameSampled.emit(position, image)
+        self._scheduleNext()
+
+    def _stopScaler(self):
+        if self._scaler is not None:
+            self._scaler.wait()
+            self._scaler.deleteLater()
+            self._scaler = None
+
+    def _scheduleNext(self):
+        self._nextTimer.start(self._nextDelay())
+
+    def _nextDelay(self) -> int:
+        return self._throttledDelay if self._isThrottled else 0
+
+    def _finish(self):
+        self.stop()
+        self.finished.emit()
+
+
+class ThumbnailStore(QObject):
+    tileSize = QSize(160, 90)
+    interval = 10_000
+    _columns = 10
+    _rows = 10
+    _memoryBudget = 64 * 1024 * 1024
+    _diskBudget = 512 * 1024 * 1024
+
+    def __init__(self, directory: str, parent=None) -> None:
+        super().__init__(parent)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.filePath = ''
+        self._cacheName = ''
+        self._isComplete = False
+        self._samplingSheet = -1
+        self._sheets = OrderedDict()
+        self._memoryUsage = 0
+        self._missingSheets = set()
+        self.sampler = FrameSampler(self.tileSize, self)
+        self.sampler.frameSampled.connect(self._frameSampled)
+        self.sampler.finished.connect(self._samplingFinished)
+        # sheets of a sampled file are decoded ahead so the first hover does not hit the disk
+        self._preloadSheet = 0
+        self._preloadTimer = QTimer(self)
+        self._preloadTimer.timeout.connect(self._preloadNextSheet)
+
+    def prepare(self, filePath: str):
+        if filePath == self.filePath:
+            return
+        self._saveSheet(self._samplingSheet)
+        self.sampler.stop()
+        self.filePath = filePath
+        self._samplingSheet = -1
+        key = fileKey(filePath)
+        self._cacheName = hashlib.sha1(repr(key).encode()).hexdigest() if key else ''
+        self._isComplete = bool(key) and os.path.exists(self._markerPath())
+        self._preloadTimer.stop()
+        if self._isComplete:
+            self._preloadSheet = 0
+            self._preloadTimer.start(0)
+        elif key:
+            self.sampler.start(filePath, self.interval)
+
+    def thumbnail(self, filePath: str, position: int) -> Optional[QImage]:
+        if filePath != self.filePath or not self._cacheName:
+            return None
+        tile = position // self.interval
+        sheet = self._sheet(tile // self._tilesPerSheet())
+        if sheet is None:
+            return None
+        tileRect = self._tileRect(tile)
+        # tiles the sampler has not reached yet are still transparent
+        if sheet.pixelColor(tileRect.topLeft()).alpha() == 0:
+            return None
+        return sheet.copy(tileRect)
+
+    def setPlaybackActive(self, active: bool):
+        # sampling slows down while the main player plays, like the scene detection
+        self.sampler.setThrottled(active)
+
+    def clear(self):
+        self._preloadTimer.stop()
+        self._saveSheet(self._samplingSheet)
+        self._sheets.clear()
+        self._memoryUsage = 0
+
+    def release(self):
+        # the next prepare starts over, sheets of a finished file are still on disk
+        self.clear()
+        self.sampler.stop()
+        self.filePath = ''
+
+    def _tilesPerSheet(self) -> int:
+        return self._columns * self._rows
+
+    def _tileRect(self, tile: int) -> QRect:
+        tile %= self._tilesPerSheet()
+        return QRect(QPoint((tile % self._columns) * self.tileSize.width(),
+                            (tile // self._columns) * self.tileSize.height()),
+                     self.tileSize)
+
+    def _sheetPath(self, sheetNumber: int) -> str:
+        return os.path.join(self.directory, f'{self._cacheName}_{sheetNumber}.jpg')
+
+    def _markerPath(self) -> str:
+        return os.path.join(self.directory, f'{self._cacheName}.done')
+
+    def _sheet(self, sheetNumber: int, create=False) -> Optional[QImage]:
+        key = (self._cacheName, sheetNumber)
+        if key in self._sheets:
+            self._sheets.move_to_end(key)
+            return self._sheets[key]
+        if key in self._missingSheets:
+            return None
+
+        # sheets on disk are only trusted once the whole file has been sampled
+        sheet = QImage(self._sheetPath(sheetNumber)) if self._isComplete else QImage()
+        if not sheet.isNull():
+            sheet = sheet.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+        elif create:
+            sheet = QImage(self.tileSize.width() * self._columns,
+                           self.tileSize.height() * self._rows,
+                           QImage.Format.Format_ARGB32_Premultiplied)
+            sheet.fill(Qt.GlobalColor.transparent)
+        else:
+            if self._isComplete:
+                self._missingSheets.add(key)
+            return None
+
+        self._sheets[key] = sheet
+        self._memoryUsage += sheet.sizeInBytes()
+        while self._memoryUsage > self._memoryBudget and len(self._sheets) > 1:
+            evictedKey, evicted = self._sheets.popitem(last=False)
+            if evictedKey == (self._cacheName, self._samplingSheet):
+                self._saveSheet(self._samplingSheet, evicted)
+            self._memoryUsage -= evicted.sizeInBytes()
+        return sheet
+
+    def _preloadNextSheet(self):
+        # preloading stops before it would start evicting sheets
+        sheetBytes = self.tileSize.width() * self._columns * self.tileSize.height() * self._rows * 4
+        if self._memoryUsage + sheetBytes > self._memoryBudget \
+                or self._sheet(self._preloadSheet) is None:
+            self._preloadTimer.stop()
+        self._preloadSheet += 1
+
+    def _frameSampled(self, position: int, image: QImage):
+        tile = position // self.interval
+        sheetNumber = tile // self._tilesPerSheet()
+        if sheetNumber != self._samplingSheet:
+            self._saveSheet(self._samplingSheet)
+            self._samplingSheet = sheetNumber
+
+        tileRect = self._tileRect(tile)
+        painter = QPainter(self._sheet(sheetNumber, create=True))
+        painter.fillRect(tileRect, QColor(0, 0, 0))
+        painter.drawImage(
+            tileRect.topLeft() + QPoint((tileRect.width() - image.width()) // 2,
+                                        (tileRect.height() - image.height()) // 2),
+            image)
+        painter.end()
+
+    def _samplingFinished(self):
+        self._saveSheet(self._samplingSheet)
+        self._samplingSheet = -1
+        with open(self._markerPath(), 'w', encoding='utf-8'):
+            pass
+        self._isComplete = True
+        self._trimDisk()
+
+    def _saveSheet(self, sheetNumber: int, sheet: Optional[QImage] = None):
+        if sheet is None:
+            sheet = self._sheets.get((self._cacheName, sheetNumber))
+        if sheet is not None:
+            sheet.save(self._sheetPath(sheetNumber), 'JPG', 85)
+
+    def _trimDisk(self):
+        # whole files are dropped, least recently sampled first
+        groups = {}
+        with os.scandir(self.directory) as scanner:
+            for entry in scanner:
+                stat = entry.stat()
+                name = entry.name.split('_')[0].split('.')[0]
+                modified, size, paths = groups.get(name, (0, 0, []))
+                paths.append(entry.path)
+                groups[name] = (max(modified, stat.st_mtime), size + stat.st_size, paths)
+
+        usage = sum(size for _, size, _ in groups.values())
+        for name, (_, size, paths) in sorted(groups.items(), key=lambda group: group[1][0]):
+            if usage <= self._diskBudget:
+                break
+            if name == self._cacheName:
+                continue
+            for path in paths:
+                os.remove(path)
+            usage -= size
+
+
+class SeekPreview(QWidget):
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.imageLabel = QLabel('')
+        self.timeLabel = QLabel('')
+        self.timeLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(2, 2, 2, 2)
+        self.layout.setSpacing(0)
+        self.layout.addWidget(self.imageLabel)
+        self.layout.addWidget(self.timeLabel)
+        self.setLayout(self.layout)
+        self.hide()
+
+    def showPreview(self, image: Optional[QImage], position: int, anchor: QPoint):
+        self.imageLabel.setVisible(image is not None)
+        if image is not None:
+            self.imageLabel.setPixmap(QPixmap.fromImage(image))
+        self.timeLabel.setText(formatDuration(position))
+        self.adjustSize()
+        parentWidth = self.parentWidget().width()
+        x = min(max(anchor.x() - self.width() // 2, 0), parentWidth - self.width())
+        self.move(x, anchor.y() - self.height())
+        self.raise_()
+        self.show()
@@ -0,0 +1,184 @@
+import os
+from typing import Optional
+
+from PyQt6.QtCore import QObject
+from PyQt6.QtMultimedia import (
+    QAudioBuffer, QAudioBufferOutput, QAudioFormat, QAudioOutput, QAudioSink, QMediaPlayer
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def isTimeStretchAvailable() -> bool:
+    return np is not None and os.environ.get('VIDEOPLAYER_TIME_STRETCH', '1') != '0'
+
+
+class Wsola:
+    # windows are overlapped at half their length, each one is taken from where it continues the
+    # previous one best within the tolerance around its nominal position
+    _windowLength = 0.04
+    _tolerance = 0.01
+
+    def __init__(self, sampleRate: int, channels: int) -> None:
+        self.channels = channels
+        self._length = int(sampleRate * self._windowLength) // 2 * 2
+        self._hop = self._length // 2
+        self._delta = int(sampleRate * self._tolerance)
+        # a periodic hann window sums to one at half overlap
+        self._window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self._length) / self._length)) \
+            .astype(np.float32)[:, None]
+        self._fftSize = 1 << (2 * self._delta + 2 * self._length).bit_length()
+        self._rate = 1.0
+        self.reset()
+
+    def setRate(self, rate: float):
+        self._rate = rate
+
+    def reset(self):
+        self._input = np.zeros((0, self.channels), np.float32)
+        self._position = 0.0
+        self._template = None
+        self._tail = np.zeros((self._hop, self.channels), np.float32)
+
+    def process(self, samples: 'np.ndarray') -> 'np.ndarray':
+        length, hop, delta = self._length, self._hop, self._delta
+        data = np.concatenate((self._input, samples)) if len(self._input) else samples
+        mono = data.mean(axis=1)
+        output = []
+        while True:
+            nominal = int(self._position)
+            low = max(nominal - delta, 0)
+            if nominal + delta + length + hop > len(data):
+                break
+            if self._template is None:
+                start = nominal
+            else:
+                start = low + self._bestOffset(mono[low:nominal + delta + length])
+            segment = data[start:start + length] * self._window
+            output.append(self._tail + segment[:hop])
+            self._tail = segment[hop:]
+            # the samples that would have followed the chosen window, the next one should match them
+            self._template = mono[start + hop:start + hop + length]
+            self._position += hop * self._rate
+        consumed = max(int(self._position) - delta, 0)
+        self._input = data[consumed:]
+        self._position -= consumed
+        if not output:
+            return np.zeros((0, self.channels), np.float32)
+        return np.concatenate(output)
+
+    def _bestOffset(self, region: 'np.ndarray') -> int:
+        # cross correlation of every candidate at once through the spectrum
+        spectrum = np.fft.rfft(region, self._fftSize) \
+            * np.conj(np.fft.rfft(self._template, self._fftSize))
+        correlation = np.fft.irfft(spectrum, self._fftSize)[:len(region) - self._length + 1]
+        return int(np.argmax(correlation))
+
+
+class TimeStretcher(QObject):
+    # away from 1x the player hands its decoded audio over instead of playing it, the audio is
+    # stretched back to real time so the pitch stays where it was
+    _channels = 2
+    _defaultSampleRate = 48_000
+    # a buffer starting further than this from where the last one ended follows a seek
+    _gapTolerance = 100_000
+    # audio more than this ahead of the sink is dropped rather than drifting away from the video
+    _maxLatency = 0.3
+
+    def __init__(self, audioOutput: QAudioOutput, parent=None) -> None:
+        super().__init__(parent)
+        self.audioOutput = audioOutput
+        sampleRate = audioOutput.device().preferredFormat().sampleRate() \
+            if not audioOutput.device().isNull() else 0
+        self._format = QAudioFormat()
+        self._format.setSampleRate(sampleRate or self._defaultSampleRate)
+        self._format.setChannelCount(self._channels)
+        self._format.setSampleFormat(QAudioFormat.SampleFormat.Float)
+        self._frameBytes = self._format.bytesPerFrame()
+        self._bufferOutput = QAudioBufferOutput(self._format, self)
+        self._bufferOutput.audioBufferReceived.connect(self._audioBufferReceived)
+        self._wsola = Wsola(self._format.sampleRate(), self._channels)
+        self._rate = 1.0
+        self._player: Optional[QMediaPlayer] = None
+        self._sink: Optional[QAudioSink] = None
+        self._sinkDevice = None
+        self._pending = bytearray()
+        self._expectedStart = -1
+        audioOutput.volumeChanged.connect(self._updateVolume)
+        audioOutput.mutedChanged.connect(self._updateVolume)
+
+    def isActive(self) -> bool:
+        return self._rate != 1
+
+    def setRate(self, rate: float):
+        wasActive = self.isActive()
+        self._rate = rate
+        self._wsola.setRate(rate)
+        if self._player is not None and wasActive != self.isActive():
+            self._route(self._player)
+
+    def setPlayer(self, player: QMediaPlayer):
+        if self._player is not None and self._player is not player:
+            self._player.setAudioBufferOutput(None)
+            self._player.setAudioOutput(None)
+        self._player = player
+        self._route(player)
+
+    def close(self):
+        self._stopSink()
+
+    def _route(self, player: QMediaPlayer):
+        if self.isActive():
+            player.setAudioOutput(None)
+            player.setAudioBufferOutput(self._bufferOutput)
+            self._startSink()
+        else:
+            player.setAudioBufferOutput(None)
+            player.setAudioOutput(self.audioOutput)
+            self._stopSink()
+
+    def _startSink(self):
+        if self._sink is not None:
+            return
+        self._sink = QAudioSink(self.audioOutput.device(), self._format, self)
+        self._sinkDevice = self._sink.start()
+        self._updateVolume()
+        self._wsola.reset()
+        self._pending.clear()
+        self._expectedStart = -1
+
+    def _stopSink(self):
+        if self._sink is None:
+            return
+        self._sink.stop()
+        self._sink.deleteLater()
+        self._sink = None
+        self._sinkDevice = None
+
+    def _updateVolume(self):
+        if self._sink is not None:
+            self._sink.setVolume(0 if self.audioOutput.isMuted() else self.audioOutput.volume())
+
+    def _audioBufferReceived(self, buffer: QAudioBuffer):
+        if self._sinkDevice is None or not buffer.isValid():
+            return
+        if abs(buffer.startTime() - self._expectedStart) > self._gapTolerance:
+            self._wsola.reset()
+            self._pending.clear()
+        self._expectedStart = buffer.startTime() + buffer.duration()
+        data = buffer.constData()
+        data.setsize(buffer.byteCount())
+        samples = np.frombuffer(bytes(data), np.float32).reshape(-1, self._channels)
+        self._pending += self._wsola.process(samples).tobytes()
+
+        maxPending = int(self._maxLatency * self._format.sampleRate()) * self._frameBytes
+        if len(self._pending) > maxPending:
+            del self._pending[:len(self._pending) - maxPending]
+        size = min(self._sink.bytesFree(), len(self._pending))
+        size -= size % self._frameBytes
+        if size > 0:
+            written = self._sinkDevice.write(bytes(self._pending[:size]))
+            del self._pending[:max(written, 0)]
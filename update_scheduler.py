@@ -0,0 +1,35 @@
+from typing import Callable, Hashable
+
+from PyQt6.QtCore import QObject, QTimer
+
+
+class UpdateScheduler(QObject):
+    def __init__(self, rate: float, parent=None) -> None:
+        super().__init__(parent)
+        # only the latest update per key is kept, they are all applied on the next tick
+        self._updates = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self.setRate(rate)
+
+    def setRate(self, rate: float):
+        self._timer.setInterval(max(int(1000 / rate), 1))
+
+    def rate(self) -> float:
+        return 1000 / self._timer.interval()
+
+    def schedule(self, key: Hashable, callback: Callable, *args):
+        self._updates[key] = (callback, args)
+        # the timer is not restarted so a steady stream of updates still gets through
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def cancel(self, key: Hashable):
+        self._updates.pop(key, None)
+
+    def flush(self):
+        self._timer.stop()
+        updates, self._updates = self._updates, {}
+        for callback, args in updates.values():
+            callback(*args)
@@ -0,0 +1,235 @@
+import math
+from collections import deque
+from typing import Callable, List, Optional
+
+from PyQt6.QtCore import QObject, QRectF, QSizeF, QTimer, QUrl, Qt
+from PyQt6.QtGui import QColor, QKeyEvent, QMouseEvent, QPen
+from PyQt6.QtMultimedia import QAudioOutput, QMediaPlayer
+from PyQt6.QtMultimediaWidgets import QGraphicsVideoItem
+from PyQt6.QtWidgets import QGraphicsRectItem, QGraphicsScene, QGraphicsView, QMainWindow
+
+from media_import import MediaImporter
+from playlist_model import PlaylistModel
+from resources import getStyle
+
+
+class LoadScheduler(QObject):
+    # loads are started one by one so opening many streams does not hit the disk all at once
+    _maxActiveLoads = 2
+    _staggerInterval = 150
+    _loadTimeout = 5000
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self._queue = deque()
+        self._active = {}
+        self._staggerTimer = QTimer(self)
+        self._staggerTimer.setSingleShot(True)
+        self._staggerTimer.setInterval(self._staggerInterval)
+        self._staggerTimer.timeout.connect(self._startNext)
+
+    def schedule(self, player: QMediaPlayer, load: Callable[[], None]):
+        self._queue.append((player, load))
+        if not self._staggerTimer.isActive():
+            self._startNext()
+
+    def _startNext(self):
+        if not self._queue or len(self._active) >= self._maxActiveLoads:
+            return
+        player, load = self._queue.popleft()
+        # a player scheduled again while it loads gives up its previous load
+        self._endLoad(player)
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda: self._loadFinished(player))
+        self._active[player] = timer
+        player.mediaStatusChanged.connect(self._mediaStatusChanged)
+        timer.start(self._loadTimeout)
+        load()
+        self._staggerTimer.start()
+
+    def _mediaStatusChanged(self, status):
+        if status in (QMediaPlayer.MediaStatus.LoadedMedia, QMediaPlayer.MediaStatus.BufferedMedia,
+                      QMediaPlayer.MediaStatus.InvalidMedia):
+            self._loadFinished(self.sender())
+
+    def _loadFinished(self, player: QMediaPlayer):
+        if self._endLoad(player) and not self._staggerTimer.isActive():
+            self._startNext()
+
+    def _endLoad(self, player: QMediaPlayer) -> bool:
+        timer = self._active.pop(player, None)
+        if timer is None:
+            return False
+        timer.stop()
+        timer.deleteLater()
+        player.mediaStatusChanged.disconnect(self._mediaStatusChanged)
+        return True
+
+
+class WallTile(QObject):
+    _focusColor = QColor(66, 165, 245)
+
+    def __init__(self, scene: QGraphicsScene, scheduler: LoadScheduler, parent=None) -> None:
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.model = PlaylistModel(self)
+        self.player = QMediaPlayer(self)
+        self.videoItem = QGraphicsVideoItem()
+        self.player.setVideoOutput(self.videoItem)
+        self.player.mediaStatusChanged.connect(self._mediaStatusChanged)
+        self.frame = QGraphicsRectItem()
+        self.frame.setPen(QPen(self._focusColor, 3))
+        self.frame.setZValue(1)
+        self.frame.setVisible(False)
+        scene.addItem(self.videoItem)
+        scene.addItem(self.frame)
+        self._isLoading = False
+
+    def setGeometry(self, rect: QRectF):
+        self.videoItem.setPos(rect.topLeft())
+        self.videoItem.setSize(QSizeF(rect.size()))
+        self.frame.setRect(rect.adjusted(1, 1, -1, -1))
+
+    def contains(self, x: float, y: float) -> bool:
+        return self.frame.rect().contains(x, y)
+
+    def setFocused(self, isFocused: bool, audioOutput: QAudioOutput):
+        # only the focused tile is heard, the others decode video only
+        self.player.setAudioOutput(audioOutput if isFocused else None)
+        self.frame.setVisible(isFocused)
+
+    def addFiles(self, filePaths: List[str]):
+        self.model.addFiles(filePaths)
+        if self.model.currentRow() == -1 and not self._isLoading:
+            self.playNext()
+
+    def playNext(self):
+        count = self.model.rowCount()
+        if count == 0:
+            return
+        row = (self.model.currentRow() + 1) % count
+        self.model.setCurrentRow(row)
+        filePath = self.model.filePath(row)
+        self._isLoading = True
+        self.scheduler.schedule(self.player, lambda: self._load(filePath))
+
+    def triggerPlay(self):
+        if self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+            self.player.pause()
+        else:
+            self.player.play()
+
+    def _load(self, filePath: str):
+        self.player.setSource(QUrl.fromLocalFile(filePath))
+        self.player.play()
+
+    def _mediaStatusChanged(self, status):
+        if status in (QMediaPlayer.MediaStatus.LoadedMedia, QMediaPlayer.MediaStatus.BufferedMedia):
+            self._isLoading = False
+        elif status in (QMediaPlayer.MediaStatus.EndOfMedia, QMediaPlayer.MediaStatus.InvalidMedia):
+            self._isLoading = False
+            self.playNext()
+
+
+class VideoWall(QMainWindow):
+    _volumeStep = 10
+
+    def __init__(self, tileCount: int, parent=None) -> None:
+        super().__init__(parent)
+        self.setWindowTitle('Video Wall')
+        self.scene = QGraphicsScene(self)
+        self.graphicsView = QGraphicsView(self.scene)
+        self.graphicsView.setStyleSheet('background-color: black; border: none;')
+        self.graphicsView.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.graphicsView.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.graphicsView.viewport().installEventFilter(self)
+        self.setCentralWidget(self.graphicsView)
+        self.setStyleSheet(getStyle('main.qss'))
+
+        self.audioOutput = QAudioOutput(self)
+        self.scheduler = LoadScheduler(self)
+        self.tiles = [WallTile(self.scene, self.scheduler, self) for _ in range(max(tileCount, 1))]
+        self.focusedTile: Optional[WallTile] = None
+        self.setFocusedTile(self.tiles[0])
+        self._nextTile = 0
+        self._importers = []
+
+    def openPaths(self, paths: List[str]):
+        importer = MediaImporter(paths, self)
+        importer.batchReady.connect(self._distributeFiles)
+        importer.finished.connect(importer.deleteLater)
+        importer.finished.connect(lambda: self._importers.remove(importer))
+        self._importers.append(importer)
+        importer.start()
+
+    def setFocusedTile(self, tile: WallTile):
+        self.focusedTile = tile
+        for other in self.tiles:
+            other.setFocused(other is tile, self.audioOutput)
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        self._layoutTiles()
+
+    def closeEvent(self, event) -> None:
+        for importer in list(self._importers):
+            importer.cancel()
+            importer.wait()
+        super().closeEvent(event)
+
+    def eventFilter(self, _: QObject, event) -> bool:
+        if isinstance(event, QMouseEvent) and event.type() == QMouseEvent.Type.MouseButtonPress:
+            position = self.graphicsView.mapToScene(event.position().toPoint())
+            for tile in self.tiles:
+                if tile.contains(position.x(), position.y()):
+                    self.setFocusedTile(tile)
+                    break
+        return False
+
+    def keyPressEvent(self, event: QKeyEvent) -> None:
+        match event.key():
+            # play/pause the focused tile
+            case Qt.Key.Key_Space | Qt.Key.Key_K:
+                self.focusedTile.triggerPlay()
+            # move audio focus to the next tile
+            case Qt.Key.Key_Tab:
+                index = self.tiles.index(self.focusedTile)
+                self.setFocusedTile(self.tiles[(index + 1) % len(self.tiles)])
+            # skip to the next file of the focused tile
+            case Qt.Key.Key_N:
+                self.focusedTile.playNext()
+            case Qt.Key.Key_U:
+                self._changeVolume(-self._volumeStep)
+            case Qt.Key.Key_I:
+                self._changeVolume(self._volumeStep)
+            case Qt.Key.Key_F:
+                self.setWindowState(self.windowState() ^ Qt.WindowState.WindowFullScreen)
+
+    def focusNextPrevChild(self, _) -> bool:
+        # tab switches tiles instead of moving keyboard focus
+        return False
+
+    def _changeVolume(self, step: int):
+        self.audioOutput.setVolume(min(max(self.audioOutput.volume() + step / 100, 0), 1))
+
+    def _distributeFiles(self, filePaths: List[str]):
+        # files are dealt out round robin so every tile gets its own playlist
+        batches = [[] for _ in self.tiles]
+        for filePath in filePaths:
+            batches[self._nextTile].append(filePath)
+            self._nextTile = (self._nextTile + 1) % len(self.tiles)
+        for tile, batch in zip(self.tiles, batches):
+            if batch:
+                tile.addFiles(batch)
+
+    def _layoutTiles(self):
+        size = self.graphicsView.viewport().size()
+        columns = math.ceil(math.sqrt(len(self.tiles)))
+        rows = math.ceil(len(self.tiles) / columns)
+        width = size.width() / columns
+        height = size.height() / rows
+        for index, tile in enumerate(self.tiles):
+            row, column = divmod(index, columns)
+            tile.setGeometry(QRectF(column * width, row * height, width, height))
+        self.scene.setSceneRect(0, 0, size.width(), size.height())